@@ -2,32 +2,122 @@
 Cliente API para DevDocs
 Maneja las peticiones HTTP a la API de DevDocs
 """
+import hashlib
+import io
 import json
-from typing import Optional
+import os
+import posixpath
+import re
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
 import httpx
 
-from .cache import DevDocsCache
-from .utils import html_to_markdown
+from .cache import DevDocsCache, NegativeCache
+from .prefetch import Prefetcher
+from .scheduler import BULK, INTERACTIVE, FetchScheduler
+from .search import TOKENIZER_VERSION, CompletionIndex, TfidfIndex, document_features, vectors_available
+from .utils import (
+    CONVERTER_VERSION, ConversionPool, char_to_byte_offsets, chunk_ranges, convert_page
+)
 
 
-# URLs de la API de DevDocs
+# URLs de la API de DevDocs (sustituibles con variables de entorno del mismo nombre)
 DEVDOCS_DOCS_URL = "https://devdocs.io/docs.json"
 DEVDOCS_INDEX_URL = "https://documents.devdocs.io/{tech}/index.json"
 DEVDOCS_PAGE_URL = "https://documents.devdocs.io/{tech}/{path}.html"
+DEVDOCS_DB_URL = "https://documents.devdocs.io/{tech}/db.json"
+
+# Tecnologías usadas por search_across_docs cuando no se especifican
+POPULAR_TECHS = [
+    "javascript", "python~3.12", "react", "node",
+    "typescript", "html", "css", "vue~3", "angular"
+]
+
+
+def _content_hash(html: str) -> str:
+    """Hash del HTML original de una página (detecta cambios entre versiones)"""
+    return hashlib.sha1(html.encode('utf-8')).hexdigest()
+
+
+def _index_paths(index: dict) -> set[str]:
+    """Páginas (sin ancla) que aparecen en un índice"""
+    return {e.get('path', '').split('#')[0] for e in index.get('entries', [])} - {''}
+
+
+class CacheMissError(LookupError):
+    """Recurso que no está en caché cuando el modo offline estricto prohíbe la red"""
 
 
 class DevDocsAPI:
     """Cliente para la API de DevDocs con caché integrado"""
     
-    def __init__(self, cache: Optional[DevDocsCache] = None):
+    def __init__(
+        self,
+        cache: Optional[DevDocsCache] = None,
+        convert_workers: Optional[int] = None,
+        download_workers: int = 8,
+        keep_html: Optional[bool] = None,
+        scheduler: Optional[FetchScheduler] = None,
+        offline: Optional[bool] = None
+    ):
         self.cache = cache or DevDocsCache()
+        # Origen de los datos: devdocs.io, un mirror interno o un directorio (file://)
+        self.docs_url = os.environ.get("DEVDOCS_DOCS_URL", DEVDOCS_DOCS_URL)
+        self.index_url = os.environ.get("DEVDOCS_INDEX_URL", DEVDOCS_INDEX_URL)
+        self.page_url = os.environ.get("DEVDOCS_PAGE_URL", DEVDOCS_PAGE_URL)
+        self.db_url = os.environ.get("DEVDOCS_DB_URL", DEVDOCS_DB_URL)
+        # Modo offline estricto (DEVDOCS_OFFLINE=1): nunca abre un socket y
+        # un fallo de caché falla al instante con CacheMissError
+        if offline is None:
+            offline = os.environ.get("DEVDOCS_OFFLINE", "0").lower() in ("1", "true", "yes")
+        self.offline = offline
         # Habilitar seguimiento de redirects
         self.client = httpx.Client(timeout=60.0, follow_redirects=True)
+        # Toda petición saliente pasa por el planificador (prioridades y límites)
+        self.scheduler = scheduler or FetchScheduler()
+        # Operaciones masivas: descargas concurrentes + conversión en procesos
+        self.converter = ConversionPool(convert_workers)
+        self.download_workers = download_workers
+        # Trabajo que sigue tras responder (subpeticiones que no llegaron al plazo)
+        self._background = ThreadPoolExecutor(
+            max_workers=download_workers, thread_name_prefix="devdocs-background"
+        )
+        # Guardar el HTML original para reconvertir sin red (DEVDOCS_KEEP_HTML=0 lo desactiva)
+        if keep_html is None:
+            keep_html = os.environ.get("DEVDOCS_KEEP_HTML", "1").lower() not in ("0", "false", "no")
+        self.keep_html = keep_html
+        # Precarga de las páginas más enlazadas tras descargar una (DEVDOCS_PREFETCH_LINKS=N)
+        # y de los primeros resultados de cada búsqueda (DEVDOCS_PREFETCH_SEARCH=N)
+        self.prefetch_links = int(os.environ.get("DEVDOCS_PREFETCH_LINKS", 0))
+        self.prefetch_search = int(os.environ.get("DEVDOCS_PREFETCH_SEARCH", 0))
+        self.prefetcher: Optional[Prefetcher] = None
+        # Índices ya parseados y estructuras derivadas: {tech: (sello, valor)}
+        self._indexes: dict[str, tuple] = {}
+        self._completions: dict[str, tuple] = {}
+        self._vectors: dict[str, tuple] = {}
+        # Features por documento para reconstruir la matriz TF-IDF: {tech: (sello, ...)}
+        self._vector_features: dict[str, tuple] = {}
+        self._links: dict[str, tuple] = {}
+        # Respuestas 404/410 recientes por URL (DEVDOCS_NEGATIVE_TTL segundos, 0 = desactivado)
+        self.missing = NegativeCache(float(os.environ.get("DEVDOCS_NEGATIVE_TTL", 300)))
+        # Slugs del catálogo docs.json cacheado: (sello, slugs)
+        self._slugs: Optional[tuple] = None
     
     def __del__(self):
-        """Cerrar cliente HTTP al destruir"""
+        """Cerrar cliente HTTP y workers al destruir"""
         if hasattr(self, 'client'):
             self.client.close()
+        if hasattr(self, 'converter'):
+            self.converter.shutdown()
+        if getattr(self, 'prefetcher', None) is not None:
+            self.prefetcher.shutdown()
+        if hasattr(self, '_background'):
+            self._background.shutdown(wait=False)
     
     # ─────────────────────────────────────────────────────────
     # Lista de documentaciones
@@ -48,8 +138,7 @@ class DevDocsAPI:
                 return json.loads(cached)
         
         # Obtener de la API
-        response = self.client.get(DEVDOCS_DOCS_URL)
-        response.raise_for_status()
+        response = self._http_get(self.docs_url, miss="la lista de documentaciones (docs.json)")
         
         # Guardar en caché
         self.cache.save_docs_list(response.text)
@@ -79,31 +168,47 @@ class DevDocsAPI:
     # Índice de una tecnología
     # ─────────────────────────────────────────────────────────
     
-    def get_index(self, tech: str, force_refresh: bool = False) -> dict:
+    def get_index(self, tech: str, force_refresh: bool = False, priority: int = INTERACTIVE) -> dict:
         """
         Obtiene el índice completo de una documentación.
         
         Args:
             tech: Slug de la tecnología (ej: "python~3.10", "spring_boot")
+            priority: Prioridad de la descarga si no está en caché (ver scheduler)
         
         Returns:
             Diccionario con entries y types de la documentación
         """
-        # Intentar caché primero
+        # Intentar memoria y luego caché en disco
         if not force_refresh:
+            stamp = self.cache.index_stamp(tech)
+            memo = self._indexes.get(tech)
+            if memo and stamp is not None and memo[0] == stamp:
+                return memo[1]
+            
             cached = self.cache.get_index(tech)
             if cached:
-                return json.loads(cached)
-        
-        # Obtener de la API
-        url = DEVDOCS_INDEX_URL.format(tech=tech)
-        response = self.client.get(url)
-        response.raise_for_status()
+                index = json.loads(cached)
+                self._indexes[tech] = (stamp, index)
+                return index
         
-        # Guardar en caché
-        self.cache.save_index(tech, response.text)
+        # Obtener de la API (si otro proceso ya lo está descargando, esperar al suyo)
+        self._check_slug(tech)
+        if not force_refresh and not self._claim_or_wait(tech, None):
+            return self.get_index(tech, priority=priority)
+        try:
+            url = self.index_url.format(tech=tech)
+            response = self._http_get(url, priority, miss=f"el índice de '{tech}'")
+            
+            # Guardar en caché
+            self.cache.save_index(tech, response.text)
+        finally:
+            if not force_refresh:
+                self.cache.release_fetch(tech)
         
-        return response.json()
+        index = response.json()
+        self._indexes[tech] = (self.cache.index_stamp(tech), index)
+        return index
     
     def search_in_index(self, tech: str, query: str, limit: int = 20) -> list[dict]:
         """
@@ -134,6 +239,135 @@ class DevDocsAPI:
         
         return results
     
+    def complete_symbol(self, tech: str, prefix: str, limit: int = 10) -> list[dict]:
+        """
+        Autocompleta nombres de símbolos a partir de un prefijo.
+        
+        Args:
+            tech: Slug de la tecnología
+            prefix: Inicio del nombre (ej: "asyncio.ga")
+            limit: Máximo de resultados
+        
+        Returns:
+            Lista de entradas cuyo nombre empieza por el prefijo (sin distinguir mayúsculas)
+        """
+        index = self.get_index(tech)
+        stamp = self.cache.index_stamp(tech)
+        
+        memo = self._completions.get(tech)
+        if memo is None or memo[0] != stamp:
+            memo = (stamp, CompletionIndex(index.get('entries', [])))
+            self._completions[tech] = memo
+        
+        return memo[1].complete(prefix, limit)
+    
+    def similarity_search(self, query: str, techs: list[str] = None, limit: int = 10) -> list[dict]:
+        """
+        Busca por similitud TF-IDF sobre nombres del índice y páginas cacheadas.
+        Pensado para preguntas en lenguaje natural ("how do I cancel a running task").
+        
+        Args:
+            query: Pregunta o términos de búsqueda
+            techs: Tecnologías donde buscar (None = todas las que tienen índice en caché)
+            limit: Máximo de resultados en total
+        
+        Returns:
+            Lista de resultados ordenados por puntuación (coseno) descendente
+        """
+        if not vectors_available():
+            raise RuntimeError(
+                "La búsqueda por similitud requiere numpy y scipy: "
+                "pip install devdocs-mcp[vector]"
+            )
+        
+        if techs is None:
+            techs = self.cache.list_techs()
+        
+        results = []
+        for tech in techs:
+            vectors, rows = self._get_vector_index(tech)
+            for row, score in vectors.top(query, limit):
+                name, path, entry_type, kind = rows[row]
+                results.append({
+                    "tech": tech,
+                    "name": name,
+                    "path": path,
+                    "type": entry_type,
+                    "kind": kind,
+                    "score": round(score, 4)
+                })
+        
+        results.sort(key=lambda r: r['score'], reverse=True)
+        return results[:limit]
+    
+    def _get_vector_index(self, tech: str) -> tuple:
+        """
+        Devuelve (TfidfIndex, filas) de una tecnología.
+        
+        Se reconstruye solo si cambia el índice o el conjunto de páginas
+        cacheadas; si no, se usa la versión en memoria o la guardada en disco.
+        """
+        index = self.get_index(tech)
+        # Dos stat: el índice y la marca que tocan save_page/delete_page
+        signature = [self.cache.index_stamp(tech), self.cache.pages_stamp(tech), TOKENIZER_VERSION]
+        
+        memo = self._vectors.get(tech)
+        if memo and memo[0] == signature:
+            return memo[1], memo[2]
+        
+        meta = self.cache.get_vectors_meta(tech)
+        if meta and meta.get('signature') == signature:
+            vectors = TfidfIndex.load(io.BytesIO(self.cache.read_file(self.cache.get_vectors_path(tech))))
+            rows = meta['rows']
+        else:
+            rows, features = self._vector_documents(tech, index, signature[0])
+            vectors = TfidfIndex.from_features(features)
+            vectors.save(self.cache.get_vectors_path(tech))
+            self.cache.save_vectors_meta(tech, {"signature": signature, "rows": rows})
+        
+        self._vectors[tech] = (signature, vectors, rows)
+        return vectors, rows
+    
+    def _vector_documents(self, tech: str, index: dict, index_stamp: Optional[int]) -> tuple[list, list]:
+        """
+        Filas y features (ver document_features) de la matriz TF-IDF de una tecnología.
+        
+        Se recuerdan entre reconstrucciones: las de las entradas mientras no
+        cambie el índice y las de cada página mientras no cambie su archivo.
+        Guardar una página solo vuelve a tokenizar esa página.
+        """
+        memo = self._vector_features.get(tech)
+        if memo and memo[0] == index_stamp:
+            entry_rows, entry_features, known = memo[1], memo[2], memo[3]
+        else:
+            entry_rows, entry_features, known = [], [], {}
+            for entry in index.get('entries', []):
+                name = entry.get('name', '')
+                path = entry.get('path', '')
+                entry_type = entry.get('type', '')
+                entry_rows.append([name, path, entry_type, "entry"])
+                entry_features.append(document_features(f"{name} {entry_type} {path}"))
+        
+        rows, features = list(entry_rows), list(entry_features)
+        pages = {}
+        for page_file in self.cache.list_pages(tech):
+            mtime = self.cache.file_mtime(page_file)
+            page = known.get(page_file)
+            if page is None or page[0] != mtime:
+                text = self.cache.read_file(page_file)
+                if text is None:
+                    continue  # Borrada mientras se listaban
+                text = text.decode('utf-8')
+                # La primera línea de cada página cacheada es "# {path}"
+                page_path = text.split('\n', 1)[0].lstrip('# ').strip()
+                page = (mtime, [page_path, page_path, "", "page"], document_features(text))
+            pages[page_file] = page
+            rows.append(page[1])
+            features.append(page[2])
+        
+        self._vector_features[tech] = (index_stamp, entry_rows, entry_features, pages)
+        return rows, features
+    
     def get_index_stats(self, tech: str) -> dict:
         """
         Obtiene estadísticas del índice de una documentación.
@@ -180,56 +414,742 @@ class DevDocsAPI:
         
         # Intentar caché primero
         if not force_refresh:
+            if self._rerender_if_stale(tech, clean_path):
+                return self.cache.get_page(tech, clean_path)
             cached = self.cache.get_page(tech, clean_path)
             if cached:
                 return cached
         
-        # Obtener de la API
-        url = DEVDOCS_PAGE_URL.format(tech=tech, path=clean_path)
-        response = self.client.get(url)
-        response.raise_for_status()
+        # Obtener de la API y convertir HTML a Markdown
+        if not force_refresh and not self._claim_or_wait(tech, clean_path):
+            # Otro proceso (o hilo) la acaba de dejar en caché
+            return self.cache.get_page(tech, clean_path)
+        try:
+            html = self._fetch_page_html(tech, clean_path)
+            content = self._store_page(tech, clean_path, convert_page(html), html)
+        finally:
+            if not force_refresh:
+                self.cache.release_fetch(tech, clean_path)
+        if self.prefetch_links > 0:
+            self._prefetch_neighbors(tech, clean_path)
+        return content
+    
+    def _claim_or_wait(self, tech: str, clean_path: Optional[str]) -> bool:
+        """
+        True si este proceso debe descargar la página (o el índice si
+        clean_path es None) y ya tiene la marca; False si otro la dejó en caché
+        mientras esperábamos.
+        """
+        while not self.cache.claim_fetch(tech, clean_path):
+            if self.cache.wait_for_fetch(tech, clean_path):
+                return False
+        return True
+    
+    def _ensure_page(self, tech: str, clean_path: str) -> None:
+        """Garantiza que la página está en caché y convertida con el conversor actual"""
+        if self.cache.page_exists(tech, clean_path):
+            self._rerender_if_stale(tech, clean_path)
+        else:
+            self.get_page(tech, clean_path)
+    
+    def _rerender_if_stale(self, tech: str, clean_path: str) -> bool:
+        """
+        Reconvierte localmente una página cacheada por una versión anterior
+        del conversor, si se guardó su HTML original. Devuelve True si lo hizo.
+        """
+        meta = self.cache.get_page_sidecar(tech, clean_path, "meta")
+        if meta is not None and meta.get("converter") == CONVERTER_VERSION:
+            return False
+        html = self.cache.get_page_html(tech, clean_path)
+        if html is None:
+            return False
+        self._store_page(tech, clean_path, convert_page(html))
+        return True
+    
+    def rerender_cache(self, tech: Optional[str] = None,
+                       progress: Optional[Callable[[str, int, int], None]] = None) -> dict:
+        """
+        Reconvierte en bloque, sin red, las páginas cacheadas con una versión
+        anterior del conversor a partir de su HTML original.
+        
+        Args:
+            tech: Tecnología a procesar (None = todas las cacheadas)
+            progress: Se llama con (tech, páginas hechas, total) tras cada lote
+        
+        Returns:
+            Diccionario con páginas reconvertidas, al día y sin HTML guardado
+        """
+        stats = {"rerendered": 0, "up_to_date": 0, "missing_html": 0}
+        for slug in ([tech] if tech else self.cache.list_techs()):
+            stale = []
+            for meta in self.cache.list_page_meta(slug):
+                if meta.get("converter") == CONVERTER_VERSION:
+                    stats["up_to_date"] += 1
+                else:
+                    stale.append(meta["path"])
+            
+            step = self.converter.batch_size * self.converter.workers
+            for i in range(0, len(stale), step):
+                paths, batch_html = [], []
+                for path in stale[i:i + step]:
+                    html = self.cache.get_page_html(slug, path)
+                    if html is None:
+                        stats["missing_html"] += 1
+                    else:
+                        paths.append(path)
+                        batch_html.append(html)
+                for path, page in zip(paths, self.converter.convert_many(batch_html)):
+                    self._store_page(slug, path, page)
+                    stats["rerendered"] += 1
+                if progress is not None:
+                    progress(slug, min(i + step, len(stale)), len(stale))
+        return stats
+    
+    def update_documentation(self, tech: str,
+                             progress: Optional[Callable[[str, int, int], None]] = None) -> dict:
+        """
+        Actualiza una documentación cacheada tras una nueva versión de DevDocs.
         
-        # Convertir HTML a Markdown
-        markdown = html_to_markdown(response.text)
+        Descarga el índice nuevo y el HTML de las páginas cacheadas (de una vez
+        con db.json o, si el origen no lo ofrece, página a página), compara el
+        hash de cada una con el guardado y solo reescribe y reconvierte las que
+        cambiaron. Las que ya no existen se borran. Búsquedas, vectores y grafo
+        de enlaces se recalculan solos al cambiar el índice y las páginas.
         
-        # Agregar metadata
+        Args:
+            tech: Slug de la tecnología (debe estar en caché)
+            progress: Se llama con (tech, páginas reconvertidas, cambiadas) tras cada lote
+        
+        Returns:
+            Diccionario con páginas añadidas al índice, cambiadas, sin cambios,
+            eliminadas, desaparecidas que siguen en el paquete offline y fallidas
+        """
+        old_index = self.cache.get_index(tech)
+        if old_index is None:
+            raise ValueError(f"'{tech}' no está en caché: usa get_documentation_index para descargarla")
+        old_paths = _index_paths(json.loads(old_index))
+        new_paths = _index_paths(self.get_index(tech, force_refresh=True))
+        # Lo que antes daba 404 puede existir en la versión nueva
+        self.missing.clear()
+        
+        cached = {meta["path"]: meta for meta in self.cache.list_page_meta(tech)}
+        # Páginas sin meta.json: sin hash ni HTML guardado, se reconvierten si siguen existiendo
+        for path in self.cache.list_pages_without_meta(tech):
+            cached.setdefault(path, {"path": path})
+        stats = {
+            "added": len(new_paths - old_paths), "changed": 0, "unchanged": 0,
+            "removed": 0, "kept_in_bundle": 0, "failed": 0, "source": "db.json"
+        }
+        
+        fresh, failed = {}, set()
+        try:
+            db = self._http_get(self.db_url.format(tech=tech), BULK, miss=f"db.json de '{tech}'").json()
+            if not isinstance(db, dict):
+                raise ValueError(f"db.json de '{tech}' no es un objeto")
+            fresh = {path: db[path] for path in cached if path in db}
+        except (httpx.HTTPError, ValueError):
+            # Origen sin db.json (ej: un mirror parcial) o con uno malformado: página a página
+            stats["source"] = "pages"
+            with ThreadPoolExecutor(max_workers=self.download_workers) as downloads:
+                futures = {
+                    downloads.submit(self._fetch_page_html, tech, path, BULK): path
+                    for path in cached if path in new_paths
+                }
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        fresh[path] = future.result()
+                    except httpx.HTTPStatusError as e:
+                        if e.response.status_code not in (404, 410):
+                            failed.add(path)
+                    except Exception:
+                        failed.add(path)
+        
+        changed = []
+        for path, html in fresh.items():
+            meta = cached[path]
+            old_hash = meta.get("hash")
+            if old_hash is None:
+                # Páginas anteriores a los hashes: comparar con el HTML guardado
+                old_html = self.cache.get_page_html(tech, path)
+                old_hash = _content_hash(old_html) if old_html is not None else None
+            new_hash = _content_hash(html)
+            if old_hash != new_hash:
+                changed.append(path)
+            else:
+                stats["unchanged"] += 1
+                if "hash" not in meta:
+                    self.cache.save_page_sidecar(tech, path, "meta", {**meta, "hash": new_hash})
+        
+        step = self.converter.batch_size * self.converter.workers
+        for i in range(0, len(changed), step):
+            paths = changed[i:i + step]
+            batch_html = [fresh[path] for path in paths]
+            for path, html, page in zip(paths, batch_html, self.converter.convert_many(batch_html)):
+                self._store_page(tech, path, page, html)
+                stats["changed"] += 1
+            if progress is not None:
+                progress(tech, stats["changed"], len(changed))
+        
+        for path in cached:
+            if path in fresh or path in failed:
+                continue
+            if self.cache.page_in_bundle(tech, path):
+                # El paquete offline es de solo lectura: la página se seguiría sirviendo
+                # desde él, así que se deja como está (con su versión del disco, si la hay)
+                stats["kept_in_bundle"] += 1
+                continue
+            self.cache.delete_page(tech, path)
+            stats["removed"] += 1
+        stats["failed"] = len(failed)
+        return stats
+    
+    def get_page_section(self, tech: str, path: str) -> Optional[str]:
+        """
+        Obtiene solo la sección de una página que corresponde a su ancla
+        (ej: "library/asyncio-task#asyncio.gather").
+        
+        El rango de cada ancla se calcula al convertir la página y se guarda
+        junto a ella, así que basta con leer ese trozo del fichero cacheado.
+        
+        Returns:
+            La sección en Markdown, o None si el path no tiene ancla o
+            la página no tiene esa sección registrada
+        """
+        clean_path, _, anchor = path.partition('#')
+        if not anchor:
+            return None
+        self._ensure_page(tech, clean_path)
+        
+        sections = self.cache.get_page_sidecar(tech, clean_path, "sections")
+        if not sections or anchor not in sections:
+            return None
+        start, end = sections[anchor]
+        body = self.cache.read_page_range(tech, clean_path, start, end)
+        if body is None:
+            return None
+        
+        web_url = f"https://devdocs.io/{tech}/{clean_path}#{anchor}"
+        return f"""# {clean_path}#{anchor}
+
+**Fuente:** [{web_url}]({web_url})
+
+---
+
+{body}
+"""
+    
+    def get_page_chunk(self, tech: str, path: str, chunk: Optional[int] = None,
+                       offset: Optional[int] = None) -> dict:
+        """
+        Lee un fragmento de una página sin cargarla entera.
+        
+        Los fragmentos se calculan al convertir la página (cortando en
+        títulos o párrafos) y se guardan como rangos de bytes, así que leer
+        el fragmento N es un seek + read de ese rango.
+        
+        Args:
+            tech: Slug de la tecnología
+            path: Path de la página (se ignora el ancla)
+            chunk: Número de fragmento (desde 0)
+            offset: Token de continuación devuelto en una lectura anterior
+        
+        Returns:
+            Diccionario con content, chunk, chunks y next_offset
+            (None en el último fragmento)
+        """
+        clean_path = path.split('#')[0]
+        self._ensure_page(tech, clean_path)
+        chunks = self._get_page_chunks(tech, clean_path)
+        
+        if offset is not None:
+            if not 0 <= offset < chunks[-1][1]:
+                raise ValueError(f"Offset fuera de la página (0-{chunks[-1][1] - 1})")
+            index = bisect_right([start for start, _ in chunks], offset) - 1
+            start = offset
+        else:
+            index = chunk or 0
+            if not 0 <= index < len(chunks):
+                raise ValueError(f"La página tiene {len(chunks)} fragmentos (0-{len(chunks) - 1})")
+            start = chunks[index][0]
+        
+        content = self.cache.read_page_range(tech, clean_path, start, chunks[index][1])
+        return {
+            'content': content or "",
+            'chunk': index,
+            'chunks': len(chunks),
+            'next_offset': chunks[index + 1][0] if index + 1 < len(chunks) else None
+        }
+    
+    def _get_page_chunks(self, tech: str, clean_path: str) -> list:
+        """Rangos de los fragmentos de una página cacheada"""
+        chunks = self.cache.get_page_sidecar(tech, clean_path, "chunks")
+        if chunks:
+            return chunks
+        
+        # Página cacheada sin sidecar: partir en párrafos una vez y guardarlo
+        content = self.cache.get_page(tech, clean_path) or ""
+        breaks = [(m.end(), 0) for m in re.finditer(r'\n\n+', content)]
+        ranges = chunk_ranges(content, breaks)
+        offsets = char_to_byte_offsets(content, [n for bounds in ranges for n in bounds])
+        chunks = [[offsets[start], offsets[end]] for start, end in ranges]
+        self.cache.save_page_sidecar(tech, clean_path, "chunks", chunks)
+        return chunks
+    
+    def get_page_outline(self, tech: str, path: str) -> list[dict]:
+        """
+        Obtiene el índice de títulos de una página sin leer su contenido.
+        
+        Returns:
+            Lista de títulos con level, title, anchor (o None), offset
+            (en bytes, usable como offset de get_page_chunk) y size en bytes
+        """
+        clean_path = path.split('#')[0]
+        self._ensure_page(tech, clean_path)
+        
+        outline = self.cache.get_page_sidecar(tech, clean_path, "outline")
+        if outline is None:
+            outline = self._outline_from_markdown(self.cache.get_page(tech, clean_path) or "")
+            self.cache.save_page_sidecar(tech, clean_path, "outline", outline)
+        return outline
+    
+    def _outline_from_markdown(self, content: str) -> list[dict]:
+        """Índice de una página cacheada sin sidecar, a partir de sus títulos Markdown"""
+        headings = []
+        position = 0
+        fence = None
+        for line in content.splitlines(keepends=True):
+            stripped = line.lstrip()
+            if stripped.startswith('```'):
+                marker = stripped[:len(stripped) - len(stripped.lstrip('`'))]
+                if fence is None:
+                    fence = marker
+                elif marker == fence:
+                    fence = None
+            elif fence is None and position > 0:
+                match = re.match(r'(#{1,6}) (.+)', line)
+                if match:
+                    headings.append((len(match.group(1)), match.group(2).strip(), position))
+            position += len(line.encode('utf-8'))
+        
+        outline = []
+        for i, (level, title, offset) in enumerate(headings):
+            end = next((o for lv, _, o in headings[i + 1:] if lv <= level), position)
+            outline.append({
+                "level": level,
+                "title": re.sub(r'\[([^\]]*)\]\([^)]*\)', r'\1', title),
+                "anchor": None,
+                "offset": offset,
+                "size": end - offset
+            })
+        return outline
+    
+    def _http_get(self, url: str, priority: int = INTERACTIVE,
+                  miss: Optional[str] = None) -> httpx.Response:
+        """
+        GET a través del planificador de peticiones.
+        Los 404/410 se recuerdan un rato y se repiten sin ir a la red.
+        Las URLs file:// se leen del disco (mirror local, sin red).
+        
+        Args:
+            url: URL a descargar
+            priority: Prioridad de la petición (ver scheduler)
+            miss: Qué se estaba buscando, para el error del modo offline
+        """
+        if url.startswith("file://"):
+            return self._file_get(url)
+        if self.offline:
+            raise CacheMissError(
+                f"Modo offline estricto: {miss or url} no está en caché y no se accede a la red"
+            )
+        
+        missing = self.missing.get(url)
+        if missing is not None:
+            raise httpx.HTTPStatusError(
+                f"{missing.status_code} {missing.reason_phrase} (caché negativa): {url}",
+                request=missing.request, response=missing
+            )
+        
+        with self.scheduler.slot(url, priority):
+            response = self.client.get(url)
+        if response.status_code in (404, 410):
+            self.missing.put(url, response)
+        response.raise_for_status()
+        return response
+    
+    def _file_get(self, url: str) -> httpx.Response:
+        """Lee una URL file:// como si fuera una respuesta HTTP (404 si no existe)"""
+        request = httpx.Request("GET", url)
+        try:
+            content = Path(url2pathname(urlsplit(url).path)).read_bytes()
+        except OSError:
+            response = httpx.Response(404, request=request)
+        else:
+            response = httpx.Response(200, content=content, request=request)
+        response.raise_for_status()
+        return response
+    
+    def _check_slug(self, tech: str) -> None:
+        """
+        Rechaza sin red los slugs que no están en el catálogo docs.json cacheado.
+        Sin catálogo en caché, o con el índice de tech ya descargado, no comprueba nada.
+        """
+        stamp = self.cache.docs_list_stamp()
+        if stamp is None or self.cache.index_stamp(tech) is not None:
+            return
+        if self._slugs is None or self._slugs[0] != stamp:
+            try:
+                docs = json.loads(self.cache.get_docs_list())
+            except (TypeError, ValueError):
+                return
+            self._slugs = (stamp, frozenset(doc.get('slug') for doc in docs))
+        if tech not in self._slugs[1]:
+            raise ValueError(
+                f"Documentación desconocida: '{tech}'. "
+                "Usa list_documentations para ver los slugs disponibles"
+            )
+    
+    def _fetch_page_html(self, tech: str, clean_path: str, priority: int = INTERACTIVE) -> str:
+        """Descarga el HTML de una página (sin ancla)"""
+        self._check_slug(tech)
+        url = self.page_url.format(tech=tech, path=clean_path)
+        return self._http_get(url, priority, miss=f"la página '{tech}/{clean_path}'").text
+    
+    def _store_page(self, tech: str, clean_path: str, page: dict, html: Optional[str] = None) -> str:
+        """
+        Agrega la cabecera a una página convertida (ver convert_page) y la
+        guarda en caché junto con sus sidecars y, si se pasa, su HTML original.
+        """
         web_url = f"https://devdocs.io/{tech}/{clean_path}"
-        content = f"""# {clean_path}
+        header = f"""# {clean_path}
 
 **Fuente:** [{web_url}]({web_url})
 
 ---
 
-{markdown}
 """
+        markdown = page["markdown"]
+        content = f"{header}{markdown}\n"
         
-        # Guardar en caché
-        self.cache.save_page(tech, clean_path, content)
+        # Los sidecars guardan rangos en bytes del fichero final
+        base = len(header.encode('utf-8'))
+        offsets = char_to_byte_offsets(markdown, [
+            n for ranges in (
+                page["sections"].values(),
+                page["chunks"],
+                ((entry["start"], entry["end"]) for entry in page["outline"])
+            )
+            for bounds in ranges for n in bounds
+        ])
+        sections = {
+            anchor: [base + offsets[start], base + offsets[end]]
+            for anchor, (start, end) in page["sections"].items()
+        }
+        chunks = [[base + offsets[start], base + offsets[end]] for start, end in page["chunks"]]
+        # El primer fragmento incluye la cabecera y el último el salto final
+        chunks[0][0] = 0
+        chunks[-1][1] = len(content.encode('utf-8'))
+        outline = [
+            {
+                "level": entry["level"],
+                "title": entry["title"],
+                "anchor": entry["anchor"],
+                "offset": base + offsets[entry["start"]],
+                "size": offsets[entry["end"]] - offsets[entry["start"]]
+            }
+            for entry in page["outline"]
+        ]
+        
+        # Guardar en caché (bloqueo compartido: una limpieza no deja la página a medias).
+        # El .md va el último: si existe, sus sidecars ya están escritos
+        with self.cache.lock(shared=True):
+            self.cache.save_page_sidecar(tech, clean_path, "sections", sections)
+            self.cache.save_page_sidecar(tech, clean_path, "chunks", chunks)
+            self.cache.save_page_sidecar(tech, clean_path, "outline", outline)
+            self.cache.save_page_sidecar(tech, clean_path, "examples", page["examples"])
+            self.cache.save_page_sidecar(tech, clean_path, "links", {
+                "path": clean_path, "links": self._resolve_links(tech, clean_path, page["links"])
+            })
+            if html is not None and self.keep_html:
+                self.cache.save_page_html(tech, clean_path, html)
+            meta = {"path": clean_path, "converter": CONVERTER_VERSION}
+            if html is not None:
+                meta["hash"] = _content_hash(html)
+            else:
+                # Reconversión desde el HTML cacheado: el contenido no cambió
+                previous = self.cache.get_page_sidecar(tech, clean_path, "meta") or {}
+                if "hash" in previous:
+                    meta["hash"] = previous["hash"]
+            self.cache.save_page_sidecar(tech, clean_path, "meta", meta)
+            self.cache.save_page(tech, clean_path, content)
         
         return content
     
+    # ─────────────────────────────────────────────────────────
+    # Grafo de enlaces
+    # ─────────────────────────────────────────────────────────
+    
+    def _resolve_links(self, tech: str, clean_path: str, hrefs: list[str]) -> dict:
+        """
+        Convierte los href de una página en paths de la misma documentación.
+        Devuelve {path destino: número de enlaces}.
+        """
+        links = {}
+        base = posixpath.dirname(clean_path)
+        for href in hrefs:
+            if '://' in href or href.startswith(('//', 'mailto:', 'javascript:')):
+                continue
+            target = href.split('#')[0].split('?')[0]
+            if not target:
+                continue
+            if target.startswith('/'):
+                # Absoluto dentro de devdocs: solo si es de la misma tecnología
+                if not target.startswith(f"/{tech}/"):
+                    continue
+                target = target[len(tech) + 2:]
+            else:
+                target = posixpath.normpath(posixpath.join(base, target))
+            if target.startswith('..') or target in ('.', clean_path):
+                continue
+            links[target] = links.get(target, 0) + 1
+        return links
+    
+    def _get_link_graph(self, tech: str) -> tuple:
+        """
+        Devuelve (enlaces salientes, enlaces entrantes) de las páginas
+        cacheadas de una tecnología: {página: {página: número de enlaces}}.
+        
+        El grafo se guarda en links.json y solo se reconstruye cuando
+        cambia alguna página (los sidecars de enlaces se escriben junto
+        con ella).
+        """
+        # Un stat de la marca que tocan save_page/delete_page, sin listar sidecars
+        signature = [self.cache.pages_stamp(tech)]
+        
+        memo = self._links.get(tech)
+        if memo and memo[0] == signature:
+            return memo[1], memo[2]
+        
+        stored = self.cache.get_links(tech)
+        if stored and stored.get('signature') == signature:
+            outgoing = stored['graph']
+        else:
+            outgoing = {}
+            for sidecar in self.cache.list_page_sidecars(tech, "links"):
+                try:
+                    data = json.loads(self.cache.read_file(sidecar))
+                except (TypeError, ValueError):
+                    continue
+                outgoing[data['path']] = data['links']
+            self.cache.save_links(tech, {"signature": signature, "graph": outgoing})
+        
+        incoming: dict[str, dict] = {}
+        for source, targets in outgoing.items():
+            for target, count in targets.items():
+                incoming.setdefault(target, {})[source] = count
+        
+        self._links[tech] = (signature, outgoing, incoming)
+        return outgoing, incoming
+    
+    def get_related_pages(self, tech: str, path: str, limit: int = 10) -> list[dict]:
+        """
+        Páginas relacionadas con una página según el grafo de enlaces.
+        
+        Puntúa cada vecina por los enlaces que la página le hace (peso 2)
+        y los que recibe de ella (peso 1). Solo se devuelven páginas que
+        existen en el índice de la tecnología.
+        
+        Returns:
+            Lista de {path, name, score, outgoing, incoming, cached}
+        """
+        clean_path = path.split('#')[0]
+        self._ensure_page(tech, clean_path)
+        outgoing, incoming = self._get_link_graph(tech)
+        
+        names = {}
+        for entry in self.get_index(tech).get('entries', []):
+            names.setdefault(entry.get('path', '').split('#')[0], entry.get('name', ''))
+        
+        links_out = outgoing.get(clean_path, {})
+        links_in = incoming.get(clean_path, {})
+        related = []
+        for neighbor in links_out.keys() | links_in.keys():
+            if neighbor not in names or neighbor == clean_path:
+                continue
+            related.append({
+                "path": neighbor,
+                "name": names[neighbor],
+                "score": 2 * links_out.get(neighbor, 0) + links_in.get(neighbor, 0),
+                "outgoing": links_out.get(neighbor, 0),
+                "incoming": links_in.get(neighbor, 0),
+                "cached": self.cache.page_exists(tech, neighbor)
+            })
+        related.sort(key=lambda r: (-r["score"], r["path"]))
+        return related[:limit]
+    
+    def _prefetch_neighbors(self, tech: str, clean_path: str) -> None:
+        """Precarga en segundo plano las páginas más enlazadas desde una página"""
+        links = (self.cache.get_page_sidecar(tech, clean_path, "links") or {}).get("links", {})
+        if not links or self.offline:
+            return
+        try:
+            known = {e.get('path', '').split('#')[0] for e in self.get_index(tech).get('entries', [])}
+        except Exception:
+            return
+        neighbors = sorted(
+            (target for target in links if target in known),
+            key=lambda target: -links[target]
+        )[:self.prefetch_links]
+        if neighbors:
+            self._get_prefetcher().schedule([(tech, path) for path in neighbors])
+    
+    def prefetch_search_results(self, results: list[dict], tech: Optional[str] = None) -> int:
+        """
+        Precarga especulativa de las páginas de los primeros resultados de
+        una búsqueda, que es lo que el agente suele pedir a continuación.
+        
+        Se encolan las primeras DEVDOCS_PREFETCH_SEARCH páginas distintas
+        (sin ancla); lo que quedara en cola de la búsqueda anterior se cancela.
+        
+        Args:
+            results: Resultados con 'path' (y 'tech' si son de varias tecnologías)
+            tech: Tecnología de los resultados que no la indiquen
+        
+        Returns:
+            Número de páginas encoladas
+        """
+        if self.prefetch_search <= 0 or self.offline:
+            return 0
+        pages = []
+        for result in results:
+            page = (result.get('tech', tech), result.get('path', '').split('#')[0])
+            if page[0] and page[1] and page not in pages:
+                pages.append(page)
+                if len(pages) >= self.prefetch_search:
+                    break
+        return self._get_prefetcher().schedule(pages, group="search")
+    
+    def _get_prefetcher(self) -> Prefetcher:
+        if self.prefetcher is None:
+            self.prefetcher = Prefetcher(self)
+        return self.prefetcher
+    
     def get_page_raw_html(self, tech: str, path: str) -> str:
         """
-        Obtiene el HTML raw de una página (sin convertir ni cachear).
+        Obtiene el HTML original de una página (sin convertir).
+        Se sirve desde caché si se guardó; si no, se descarga y se guarda.
         Útil para debugging.
         """
         clean_path = path.split('#')[0]
-        url = DEVDOCS_PAGE_URL.format(tech=tech, path=clean_path)
-        response = self.client.get(url)
-        response.raise_for_status()
-        return response.text
+        html = self.cache.get_page_html(tech, clean_path)
+        if html is None:
+            html = self._fetch_page_html(tech, clean_path)
+            if self.keep_html:
+                self.cache.save_page_html(tech, clean_path, html)
+        return html
+    
+    def fetch_pages(self, tech: str, paths: list[str], priority: int = BULK) -> dict:
+        """
+        Descarga y convierte en bloque las páginas que no estén en caché.
+        
+        Las descargas se hacen en paralelo (hilos) y, a medida que llegan,
+        se agrupan en lotes que se convierten en el pool de procesos, de
+        modo que red y CPU trabajan a la vez.
+        
+        Args:
+            tech: Slug de la tecnología
+            paths: Paths de páginas (se ignoran las anclas y los duplicados)
+            priority: Prioridad de las descargas (ver scheduler)
+        
+        Returns:
+            Diccionario {path limpio: mensaje de error} con las páginas que fallaron
+        """
+        missing = []
+        for path in dict.fromkeys(p.split('#')[0] for p in paths):
+            if path and not self.cache.page_exists(tech, path):
+                missing.append(path)
+        
+        errors = {}
+        if not missing:
+            return errors
+        
+        conversions = []
+        batch_paths, batch_html = [], []
+        claimed = set()
+        
+        def release(path: str) -> None:
+            claimed.discard(path)
+            self.cache.release_fetch(tech, path)
+        
+        def download(path: str) -> Optional[str]:
+            # None: otro proceso la estaba descargando y ya está en caché
+            if not self._claim_or_wait(tech, path):
+                return None
+            claimed.add(path)
+            try:
+                return self._fetch_page_html(tech, path, priority)
+            except BaseException:
+                release(path)
+                raise
+        
+        def store(batch_paths: list[str], batch_html: list[str], future) -> None:
+            # Cada marca se libera en cuanto su página está guardada, no al final del bloque
+            try:
+                for clean_path, html, page in zip(batch_paths, batch_html, future.result()):
+                    self._store_page(tech, clean_path, page, html)
+                    release(clean_path)
+            except Exception as e:
+                for clean_path in batch_paths:
+                    if clean_path in claimed:
+                        errors[clean_path] = str(e)
+                        release(clean_path)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.download_workers) as downloads:
+                futures = {downloads.submit(download, path): path for path in missing}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        html = future.result()
+                    except Exception as e:
+                        errors[path] = str(e)
+                        continue
+                    if html is not None:
+                        batch_html.append(html)
+                        batch_paths.append(path)
+                    
+                    if len(batch_html) >= self.converter.batch_size:
+                        conversions.append((batch_paths, batch_html, self.converter.submit(batch_html)))
+                        batch_paths, batch_html = [], []
+                    # Guardar los lotes ya convertidos sin esperar al resto de descargas
+                    while conversions and conversions[0][2].done():
+                        store(*conversions.pop(0))
+            
+            if batch_html:
+                conversions.append((batch_paths, batch_html, self.converter.submit(batch_html)))
+            for conversion in conversions:
+                store(*conversion)
+        finally:
+            # Lo que quede (p. ej. una excepción a medias) también se libera
+            for path in list(claimed):
+                release(path)
+        
+        return errors
 
     # ─────────────────────────────────────────────────────────
     # NUEVAS FUNCIONALIDADES
     # ─────────────────────────────────────────────────────────
     
-    def get_multiple_pages(self, tech: str, paths: list[str]) -> dict:
+    def get_multiple_pages(self, tech: str, paths: list[str], deadline: Optional[float] = None) -> dict:
         """
         Obtiene múltiples páginas de una documentación.
         
         Args:
             tech: Slug de la tecnología
             paths: Lista de paths a obtener
+            deadline: Segundos máximos de espera (None = esperar a todas). Las
+                páginas que no lleguen se marcan como pendientes y siguen
+                descargándose en segundo plano, así un reintento sale de caché.
         
         Returns:
             Diccionario con páginas y estadísticas
@@ -237,11 +1157,43 @@ class DevDocsAPI:
         results = {}
         successful = 0
         failed = 0
+        pending = 0
+        
+        if deadline is None:
+            # Descargar y convertir en bloque lo que falte en caché (el agente espera)
+            errors = self.fetch_pages(tech, paths, priority=INTERACTIVE)
+            unfinished = set()
+        else:
+            futures = {
+                path: self._background.submit(self._ensure_page, tech, path)
+                for path in dict.fromkeys(p.split('#')[0] for p in paths)
+            }
+            done, _ = wait(futures.values(), timeout=deadline)
+            errors = {
+                path: str(future.exception())
+                for path, future in futures.items()
+                if future in done and future.exception() is not None
+            }
+            unfinished = {path for path, future in futures.items() if future not in done}
         
         for path in paths:
+            if path.split('#')[0] in unfinished:
+                results[path] = {'pending': True}
+                pending += 1
+                continue
+            error = errors.get(path.split('#')[0])
+            if error:
+                results[path] = {'error': error}
+                failed += 1
+                continue
             try:
-                content = self.get_page(tech, path)
-                results[path] = {'content': content}
+                # Solo el primer fragmento: el resto se lee con get_page_chunk
+                first = self.get_page_chunk(tech, path, chunk=0)
+                results[path] = {
+                    'content': first['content'],
+                    'chunks': first['chunks'],
+                    'next_offset': first['next_offset']
+                }
                 successful += 1
             except Exception as e:
                 results[path] = {'error': str(e)}
@@ -250,34 +1202,47 @@ class DevDocsAPI:
         return {
             'pages': results,
             'successful': successful,
-            'failed': failed
+            'failed': failed,
+            'pending': pending
         }
     
-    def search_across_docs(self, query: str, techs: list[str] = None, limit_per_tech: int = 5) -> dict:
+    def search_across_docs(self, query: str, techs: list[str] = None, limit_per_tech: int = 5,
+                           deadline: Optional[float] = None) -> dict:
         """
-        Busca en múltiples documentaciones a la vez.
+        Busca en múltiples documentaciones a la vez (en paralelo).
         
         Args:
             query: Término de búsqueda
             techs: Lista de tecnologías donde buscar (None = las más populares)
             limit_per_tech: Máximo de resultados por tecnología
+            deadline: Segundos máximos de espera (None = esperar a todas). Las
+                tecnologías que no respondan se marcan como pendientes y su
+                índice se sigue descargando en segundo plano.
         
         Returns:
             Diccionario con resultados por tecnología
         """
         # Si no se especifican techs, usar las más populares
         if techs is None:
-            techs = [
-                "javascript", "python~3.12", "react", "node", 
-                "typescript", "html", "css", "vue~3", "angular"
-            ]
+            techs = POPULAR_TECHS
         
         results = {}
         total_results = 0
+        pending = 0
         
-        for tech in techs:
+        futures = {
+            tech: self._background.submit(self.search_in_index, tech, query, limit_per_tech)
+            for tech in dict.fromkeys(techs)
+        }
+        done, _ = wait(futures.values(), timeout=deadline)
+        
+        for tech, future in futures.items():
+            if future not in done:
+                results[tech] = {'pending': True}
+                pending += 1
+                continue
             try:
-                tech_results = self.search_in_index(tech, query, limit=limit_per_tech)
+                tech_results = future.result()
                 if tech_results:
                     results[tech] = {'entries': tech_results}
                     total_results += len(tech_results)
@@ -287,7 +1252,8 @@ class DevDocsAPI:
         return {
             'results': results,
             'searched_count': len(techs),
-            'total_results': total_results
+            'total_results': total_results,
+            'pending_count': pending
         }
     
     def get_type_entries(self, tech: str, entry_type: str, limit: int = 50) -> dict:
@@ -335,7 +1301,8 @@ class DevDocsAPI:
         index = self.get_index(tech)
         return index.get('types', [])
     
-    def export_documentation(self, tech: str, output_dir: str, max_pages: int = None) -> dict:
+    def export_documentation(self, tech: str, output_dir: str, max_pages: int = None,
+                             progress: Optional[Callable[[str, int, int], None]] = None) -> dict:
         """
         Exporta toda la documentación de una tecnología a archivos locales.
         
@@ -343,13 +1310,11 @@ class DevDocsAPI:
             tech: Slug de la tecnología
             output_dir: Directorio de salida
             max_pages: Máximo de páginas a exportar (None = todas)
+            progress: Se llama con (tech, páginas hechas, total) tras cada lote
         
         Returns:
             Estadísticas de la exportación
         """
-        import os
-        from pathlib import Path
-        
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
@@ -369,24 +1334,37 @@ class DevDocsAPI:
         if max_pages:
             pages_to_export = pages_to_export[:max_pages]
         
-        # Exportar cada página
         exported = 0
         failed = 0
         total_size = 0
         
-        for page_path in pages_to_export:
-            try:
-                content = self.get_page(tech, page_path)
-                
-                # Crear nombre de archivo seguro
-                safe_name = page_path.replace('/', '_').replace('\\', '_')
-                file_path = output_path / f"{safe_name}.md"
-                
-                file_path.write_text(content, encoding='utf-8')
-                exported += 1
-                total_size += len(content)
-            except Exception:
-                failed += 1
+        # Lotes para informar del progreso; dentro de cada lote, descargas concurrentes
+        step = self.download_workers * 8
+        for i in range(0, len(pages_to_export), step):
+            batch = pages_to_export[i:i + step]
+            # Descargar y convertir en bloque lo que falte en caché
+            errors = self.fetch_pages(tech, batch)
+            failed += len(errors)
+            
+            # Exportar cada página
+            for page_path in batch:
+                if page_path in errors:
+                    continue
+                try:
+                    content = self.get_page(tech, page_path)
+                    
+                    # Crear nombre de archivo seguro
+                    safe_name = page_path.replace('/', '_').replace('\\', '_')
+                    file_path = output_path / f"{safe_name}.md"
+                    
+                    file_path.write_text(content, encoding='utf-8')
+                    exported += 1
+                    total_size += len(content)
+                except Exception:
+                    failed += 1
+            
+            if progress is not None:
+                progress(tech, i + len(batch), len(pages_to_export))
         
         return {
             "tech": tech,
@@ -397,38 +1375,117 @@ class DevDocsAPI:
             "total_size_mb": round(total_size / 1024 / 1024, 2)
         }
     
-    def get_examples_from_page(self, tech: str, path: str) -> dict:
+    def warm_cache(self, techs: list[str], pages: bool = False,
+                   progress: Optional[Callable[[str, int, int], None]] = None) -> dict:
         """
-        Extrae bloques de código de una página de documentación.
+        Precalienta el caché: docs.json, los índices de techs (en paralelo)
+        y, opcionalmente, todas sus páginas.
+        
+        Args:
+            techs: Tecnologías a precalentar
+            pages: Descargar también todas las páginas de cada índice
+            progress: Se llama con (tech, páginas hechas, total) tras cada lote
+        
+        Returns:
+            Diccionario con el resultado por tecnología, bytes guardados y segundos
+        """
+        start = time.monotonic()
+        # Primero el catálogo: los slugs mal escritos fallan sin ir a la red
+        self.get_docs_list()
+        
+        results = {}
+        total_bytes = 0
+        # Los índices que falten se descargan como trabajo masivo: no adelantan a lo interactivo
+        futures = {tech: self._background.submit(self.get_index, tech, priority=BULK) for tech in techs}
+        for tech, future in futures.items():
+            try:
+                index = future.result()
+            except Exception as e:
+                results[tech] = {"error": str(e)}
+                continue
+            results[tech] = {"entries": len(index.get('entries', [])), "pages": 0, "fetched": 0, "failed": 0}
+            total_bytes += len(self.cache.get_index(tech).encode('utf-8'))
+        
+        if pages:
+            for tech, info in results.items():
+                if "error" in info:
+                    continue
+                paths = list(dict.fromkeys(
+                    e.get('path', '').split('#')[0] for e in self.get_index(tech).get('entries', [])
+                ))
+                paths = [p for p in paths if p]
+                info["pages"] = len(paths)
+                missing = [p for p in paths if not self.cache.page_exists(tech, p)]
+                done = len(paths) - len(missing)
+                
+                # Lotes para informar del progreso; dentro de cada lote, descargas concurrentes
+                step = self.download_workers * 8
+                for i in range(0, len(missing), step):
+                    batch = missing[i:i + step]
+                    errors = self.fetch_pages(tech, batch)
+                    info["failed"] += len(errors)
+                    for path in batch:
+                        if path not in errors:
+                            info["fetched"] += 1
+                            total_bytes += self.cache.page_size(tech, path)
+                    done += len(batch)
+                    if progress is not None:
+                        progress(tech, done, len(paths))
+        
+        return {
+            "techs": results,
+            "bytes": total_bytes,
+            "elapsed": time.monotonic() - start
+        }
+    
+    def get_examples_from_page(self, tech: str, path: str, language: Optional[str] = None,
+                               section: Optional[str] = None) -> dict:
+        """
+        Obtiene los bloques de código de una página de documentación.
+        
+        Los bloques se extraen al convertir el HTML y se guardan aparte,
+        así que no hace falta leer la página.
         
         Args:
             tech: Slug de la tecnología
-            path: Path de la página
+            path: Path de la página (un #ancla equivale a section)
+            language: Solo bloques de este lenguaje (ej: "python")
+            section: Solo bloques bajo esta ancla o título (coincidencia parcial)
         
         Returns:
             Diccionario con ejemplos de código encontrados
         """
-        import re
+        clean_path, _, anchor = path.partition('#')
+        section = section or anchor or None
         
         try:
-            # Obtener contenido
-            content = self.get_page(tech, path)
+            self._ensure_page(tech, clean_path)
             
-            # Buscar bloques de código markdown
-            code_pattern = r'```(\w*)\n(.*?)```'
-            matches = re.findall(code_pattern, content, re.DOTALL)
-            
-            examples = []
-            for i, (language, code) in enumerate(matches, 1):
-                examples.append({
-                    "index": i,
-                    "language": language or "text",
-                    "code": code.strip()
-                })
-            
-            return {'examples': examples}
+            examples = self.cache.get_page_sidecar(tech, clean_path, "examples")
+            if examples is None:
+                examples = self._examples_from_markdown(self.cache.get_page(tech, clean_path) or "")
+                self.cache.save_page_sidecar(tech, clean_path, "examples", examples)
         except Exception as e:
             return {'error': str(e), 'examples': []}
+        
+        if language:
+            language = language.lower()
+            examples = [e for e in examples if e['language'].lower() == language]
+        if section:
+            wanted = section.lower()
+            examples = [
+                e for e in examples
+                if e['anchor'] == section or wanted in (e['heading'] or '').lower()
+            ]
+        
+        return {'examples': [{"index": i, **e} for i, e in enumerate(examples, 1)]}
+    
+    def _examples_from_markdown(self, content: str) -> list[dict]:
+        """Bloques de código de una página cacheada sin sidecar"""
+        return [
+            {"language": language or "text", "code": code.strip(), "heading": None, "anchor": None}
+            for language, code in re.findall(r'```(\w*)\n(.*?)```', content, re.DOTALL)
+        ]
     
     def get_offline_status(self) -> dict:
         """
@@ -454,6 +1511,12 @@ class DevDocsAPI:
             "total_size_mb": stats['total_size_mb'],
             "available_offline_count": len(technologies),
             "docs_list_cached": self.cache.get_docs_list() is not None,
+            "strict_offline": self.offline,
+            "upstream": {
+                "docs": self.docs_url,
+                "index": self.index_url,
+                "page": self.page_url
+            },
             "technologies": technologies
         }
 
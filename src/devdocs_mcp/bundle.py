@@ -0,0 +1,211 @@
+"""
+Paquetes offline para DevDocs MCP
+Empaqueta un caché ya construido en un único archivo y lo sirve con mmap
+"""
+import json
+import mmap
+import os
+import struct
+import uuid
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable, Optional
+
+
+# Formato: MAGIC | contenidos de los archivos | tabla JSON | trailer
+#   tabla:   {"version": 1, "files": {ruta relativa: [offset, tamaño, mtime_ns]}}
+#   trailer: offset de la tabla (u64) | tamaño de la tabla (u64) | MAGIC
+MAGIC = b"DDMCPBN1"
+BUNDLE_VERSION = 1
+_TRAILER = struct.Struct("<QQ8s")
+
+
+class Bundle:
+    """
+    Paquete offline abierto en solo lectura.
+
+    Los archivos se leen del mmap sin extraerlos: un contenedor nuevo está
+    listo en cuanto el paquete está montado. Las rutas son las relativas al
+    directorio de caché ("docs.json", "python~3.12/index.json", ...).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mmap[:len(MAGIC)] != MAGIC or len(self._mmap) < len(MAGIC) + _TRAILER.size:
+                raise ValueError(f"No es un paquete de DevDocs MCP: {self.path}")
+            toc_offset, toc_size, magic = _TRAILER.unpack(self._mmap[-_TRAILER.size:])
+            if magic != MAGIC:
+                raise ValueError(f"Paquete truncado o corrupto: {self.path}")
+            toc = json.loads(self._mmap[toc_offset:toc_offset + toc_size])
+        except BaseException:
+            self.close()
+            raise
+        if toc.get("version") != BUNDLE_VERSION:
+            self.close()
+            raise ValueError(f"Versión de paquete no soportada: {toc.get('version')}")
+        self._files: dict[str, list[int]] = toc["files"]
+        self.techs = sorted({name.split('/', 1)[0] for name in self._files if '/' in name})
+
+    def names(self) -> list[str]:
+        """Rutas relativas de todos los archivos del paquete"""
+        return list(self._files)
+
+    def contains(self, name: str) -> bool:
+        return name in self._files
+
+    def stat(self, name: str) -> Optional[tuple[int, int]]:
+        """(tamaño, mtime_ns original) de un archivo, None si no está"""
+        entry = self._files.get(name)
+        if entry is None:
+            return None
+        return entry[1], entry[2]
+
+    def read(self, name: str) -> Optional[bytes]:
+        """Contenido completo de un archivo, None si no está"""
+        entry = self._files.get(name)
+        if entry is None:
+            return None
+        offset, size = entry[0], entry[1]
+        return self._mmap[offset:offset + size]
+
+    def read_range(self, name: str, start: int, end: int) -> Optional[bytes]:
+        """Solo los bytes [start, end) de un archivo"""
+        entry = self._files.get(name)
+        if entry is None:
+            return None
+        offset, size = entry[0], entry[1]
+        start = min(max(0, start), size)
+        end = min(max(start, end), size)
+        return self._mmap[offset + start:offset + end]
+
+    def glob(self, directory: str, pattern: str) -> list[str]:
+        """Archivos directamente dentro de directory cuyo nombre cumple pattern"""
+        prefix = directory.rstrip('/') + '/'
+        return sorted(
+            name for name in self._files
+            if name.startswith(prefix) and '/' not in name[len(prefix):]
+            and fnmatch(name[len(prefix):], pattern)
+        )
+
+    def close(self) -> None:
+        """Libera el mmap y el archivo"""
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+def _collect(cache_dir: Path, techs: Optional[Iterable[str]], include_html: bool) -> list[Path]:
+    """Archivos del caché que entran en el paquete"""
+    files = []
+    docs_list = cache_dir / "docs.json"
+    if docs_list.exists():
+        files.append(docs_list)
+
+    if techs is None:
+        tech_dirs = sorted(d for d in cache_dir.iterdir() if d.is_dir() and not d.name.startswith('.'))
+    else:
+        tech_dirs = [cache_dir / tech for tech in techs]
+    for tech_dir in tech_dirs:
+        if not tech_dir.is_dir():
+            raise FileNotFoundError(f"No hay caché para '{tech_dir.name}' en {cache_dir}")
+        for path in sorted(tech_dir.iterdir()):
+            # Temporales de escritura y marcas de descarga en curso no viajan
+            if not path.is_file() or path.name.endswith(('.tmp', '.fetching')):
+                continue
+            if not include_html and path.name.endswith('.html.gz'):
+                continue
+            files.append(path)
+    return files
+
+
+def pack(cache_dir: Path, output: Path, techs: Optional[Iterable[str]] = None,
+         include_html: bool = True) -> dict:
+    """
+    Empaqueta docs.json y los índices, estructuras de búsqueda y páginas de
+    las tecnologías elegidas en un único archivo.
+
+    Args:
+        cache_dir: Directorio de caché de origen
+        output: Archivo de paquete a crear
+        techs: Tecnologías a incluir (None = todas las cacheadas)
+        include_html: Incluir el HTML original (.html.gz) para reconvertir offline
+
+    Returns:
+        Diccionario con archivos, tecnologías y tamaño del paquete
+    """
+    cache_dir = Path(cache_dir)
+    output = Path(output)
+    files = _collect(cache_dir, techs, include_html)
+
+    table = {}
+    tmp = output.with_name(output.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        for path in files:
+            data = path.read_bytes()
+            name = path.relative_to(cache_dir).as_posix()
+            # mtime original: los sellos y firmas guardados siguen cuadrando
+            table[name] = [f.tell(), len(data), path.stat().st_mtime_ns]
+            f.write(data)
+
+        toc = json.dumps({"version": BUNDLE_VERSION, "files": table}, ensure_ascii=False).encode('utf-8')
+        toc_offset = f.tell()
+        f.write(toc)
+        f.write(_TRAILER.pack(toc_offset, len(toc), MAGIC))
+    os.replace(tmp, output)
+
+    return {
+        "output": str(output),
+        "files": len(table),
+        "techs": sorted({name.split('/', 1)[0] for name in table if '/' in name}),
+        "size_mb": round(output.stat().st_size / 1024 / 1024, 2)
+    }
+
+
+def unpack(bundle_path: Path, cache_dir: Path, techs: Optional[Iterable[str]] = None,
+           overwrite: bool = False) -> dict:
+    """
+    Extrae un paquete en un directorio de caché.
+
+    Args:
+        bundle_path: Paquete creado con pack()
+        cache_dir: Directorio de caché de destino
+        techs: Tecnologías a extraer (None = todas)
+        overwrite: Sobrescribir archivos que ya existan
+
+    Returns:
+        Diccionario con archivos extraídos y omitidos
+    """
+    cache_dir = Path(cache_dir)
+    selected = set(techs) if techs is not None else None
+    stats = {"extracted": 0, "skipped": 0}
+
+    bundle = Bundle(bundle_path)
+    try:
+        for name in bundle.names():
+            tech = name.split('/', 1)[0] if '/' in name else None
+            if selected is not None and tech is not None and tech not in selected:
+                continue
+            target = cache_dir / name
+            if target.exists() and not overwrite:
+                stats["skipped"] += 1
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # Temporal único + rename: nadie que use el caché ve archivos a medias
+            tmp = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                tmp.write_bytes(bundle.read(name))
+                _, mtime_ns = bundle.stat(name)
+                os.utime(tmp, ns=(mtime_ns, mtime_ns))
+                os.replace(tmp, target)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            stats["extracted"] += 1
+    finally:
+        bundle.close()
+    return stats
@@ -2,21 +2,130 @@
 Sistema de caché en disco para DevDocs MCP
 Almacena documentación localmente para acceso offline y rápido
 """
+import gzip
+import json
+import os
 import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Hashable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+from .bundle import Bundle
 
 
 # Directorio de caché por defecto
 DEFAULT_CACHE_DIR = Path.home() / ".cache" / "devdocs-mcp"
 
+# Ficheros auxiliares que acompañan a cada página ({página}.{kind}.json)
+SIDECAR_KINDS = ("sections", "chunks", "outline", "examples", "links", "meta")
+
+# Segundos tras los que una marca de descarga se considera abandonada
+# (el proceso que la creó murió y ya no la refresca)
+FETCH_MARKER_TTL = 90
+
+# Cada cuántos segundos se refrescan las marcas de las descargas en curso
+FETCH_MARKER_REFRESH = FETCH_MARKER_TTL / 3
+
 
 class DevDocsCache:
-    """Caché simple en disco para documentación de DevDocs"""
+    """
+    Caché simple en disco para documentación de DevDocs.
+    
+    Opcionalmente se apoya en un paquete offline de solo lectura (ver
+    bundle.py, DEVDOCS_BUNDLE): lo que no está en disco se sirve del
+    paquete vía mmap. Lo que se escribe va siempre al disco y tiene
+    prioridad sobre el paquete.
     
-    def __init__(self, cache_dir: Optional[Path] = None):
+    Varios procesos pueden compartir el mismo directorio:
+    - Cada archivo se escribe en un temporal y se renombra, así un lector
+      nunca ve un archivo a medias.
+    - Las limpiezas toman el bloqueo exclusivo del caché (.lock) y renombran
+      antes de borrar; las escrituras de páginas toman el compartido.
+    - Una marca "{página}.fetching" avisa de que otro proceso ya está
+      descargando esa página, para no repetir la descarga.
+    """
+    
+    def __init__(self, cache_dir: Optional[Path] = None, bundle: Optional[Path] = None):
         self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if bundle is None and os.environ.get("DEVDOCS_BUNDLE"):
+            bundle = Path(os.environ["DEVDOCS_BUNDLE"])
+        self.bundle: Optional[Bundle] = Bundle(bundle) if bundle is not None else None
+        # Marcas de descarga tomadas por este proceso (las refresca un hilo aparte)
+        self._claimed: set[Path] = set()
+        self._claimed_lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+    
+    # ─────────────────────────────────────────────────────────
+    # Acceso a archivos (disco y, si falta, paquete offline)
+    # ─────────────────────────────────────────────────────────
+    
+    def _bundle_name(self, path: Path) -> Optional[str]:
+        """Ruta de path dentro del paquete (None sin paquete)"""
+        if self.bundle is None:
+            return None
+        try:
+            return path.relative_to(self.cache_dir).as_posix()
+        except ValueError:
+            return None
+    
+    def read_file(self, path: Path) -> Optional[bytes]:
+        """Contenido de un archivo del caché, None si no existe"""
+        try:
+            return path.read_bytes()
+        except OSError:
+            name = self._bundle_name(path)
+            return self.bundle.read(name) if name else None
+    
+    def _read_text(self, path: Path) -> Optional[str]:
+        data = self.read_file(path)
+        return data.decode('utf-8') if data is not None else None
+    
+    def _stat(self, path: Path) -> Optional[tuple[int, int]]:
+        """(tamaño, mtime_ns) de un archivo del caché, None si no existe"""
+        try:
+            st = path.stat()
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            name = self._bundle_name(path)
+            return self.bundle.stat(name) if name else None
+    
+    def file_mtime(self, path: Path) -> int:
+        """mtime (ns) de un archivo del caché, 0 si no existe"""
+        stat = self._stat(path)
+        return stat[1] if stat else 0
+    
+    def _exists(self, path: Path) -> bool:
+        return self._stat(path) is not None
+    
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        """Escribe en un temporal del mismo directorio y lo renombra encima de path"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+    
+    def _glob(self, tech: str, pattern: str) -> list[Path]:
+        """Archivos de una tecnología que cumplen pattern, en disco o en el paquete"""
+        tech_dir = self.cache_dir / tech
+        files = set(tech_dir.glob(pattern)) if tech_dir.is_dir() else set()
+        if self.bundle is not None:
+            files.update(self.cache_dir / name for name in self.bundle.glob(tech, pattern))
+        return sorted(files)
     
     def _sanitize_filename(self, name: str) -> str:
         """Convierte un path en nombre de archivo válido"""
@@ -45,15 +154,16 @@ class DevDocsCache:
     
     def get_docs_list(self) -> Optional[str]:
         """Obtiene la lista de documentaciones desde caché"""
-        path = self._get_docs_list_path()
-        if path.exists():
-            return path.read_text(encoding='utf-8')
-        return None
+        return self._read_text(self._get_docs_list_path())
     
     def save_docs_list(self, content: str) -> None:
         """Guarda la lista de documentaciones en caché"""
-        path = self._get_docs_list_path()
-        path.write_text(content, encoding='utf-8')
+        self._write_atomic(self._get_docs_list_path(), content.encode('utf-8'))
+    
+    def docs_list_stamp(self) -> Optional[int]:
+        """Sello de versión de docs.json (mtime en ns), None si no está en caché"""
+        stat = self._stat(self._get_docs_list_path())
+        return stat[1] if stat else None
     
     # ─────────────────────────────────────────────────────────
     # Índice de tecnología (index.json)
@@ -61,16 +171,19 @@ class DevDocsCache:
     
     def get_index(self, tech: str) -> Optional[str]:
         """Obtiene el índice de una tecnología desde caché"""
-        path = self._get_index_path(tech)
-        if path.exists():
-            return path.read_text(encoding='utf-8')
-        return None
+        return self._read_text(self._get_index_path(tech))
     
     def save_index(self, tech: str, content: str) -> None:
         """Guarda el índice de una tecnología en caché"""
-        path = self._get_index_path(tech)
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(content, encoding='utf-8')
+        self._write_atomic(self._get_index_path(tech), content.encode('utf-8'))
+    
+    def index_stamp(self, tech: str) -> Optional[int]:
+        """
+        Sello de versión del índice cacheado (mtime en ns).
+        Devuelve None si el índice no está en caché.
+        """
+        stat = self._stat(self._get_index_path(tech))
+        return stat[1] if stat else None
     
     # ─────────────────────────────────────────────────────────
     # Páginas de documentación (.md)
@@ -78,20 +191,198 @@ class DevDocsCache:
     
     def get_page(self, tech: str, page_path: str) -> Optional[str]:
         """Obtiene una página de documentación desde caché"""
-        path = self._get_page_path(tech, page_path)
-        if path.exists():
-            return path.read_text(encoding='utf-8')
-        return None
+        return self._read_text(self._get_page_path(tech, page_path))
     
     def save_page(self, tech: str, page_path: str, content: str) -> None:
         """Guarda una página de documentación en caché"""
-        path = self._get_page_path(tech, page_path)
+        # En bytes, sin traducir saltos: los rangos de bytes de los sidecars deben cuadrar
+        self._write_atomic(self._get_page_path(tech, page_path), content.encode('utf-8'))
+        self._bump_pages_stamp(tech)
+    
+    def _get_pages_stamp_path(self, tech: str) -> Path:
+        """Marca que se toca cada vez que cambia alguna página de la tecnología"""
+        return self.cache_dir / tech / "pages.stamp"
+    
+    def pages_stamp(self, tech: str) -> Optional[int]:
+        """
+        Sello de versión del conjunto de páginas (mtime en ns de pages.stamp).
+        Cuesta un stat, frente a recorrer y consultar todas las páginas.
+        None si nunca se guardó ni borró una página (p. ej. solo paquete offline).
+        """
+        stat = self._stat(self._get_pages_stamp_path(tech))
+        return stat[1] if stat else None
+    
+    def _bump_pages_stamp(self, tech: str) -> None:
+        path = self._get_pages_stamp_path(tech)
+        # Siempre creciente, aunque dos cambios caigan en el mismo tic del reloj
+        stamp = max(time.time_ns(), self.file_mtime(path) + 1)
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(content, encoding='utf-8')
+        path.touch()
+        os.utime(path, ns=(stamp, stamp))
+    
+    def page_size(self, tech: str, page_path: str) -> int:
+        """Tamaño en bytes de una página cacheada (0 si no existe)"""
+        stat = self._stat(self._get_page_path(tech, page_path))
+        return stat[0] if stat else 0
+    
+    def read_page_range(self, tech: str, page_path: str, start: int, end: int) -> Optional[str]:
+        """
+        Lee solo un rango de bytes [start, end) de una página cacheada.
+        Los rangos salen de los sidecars y caen siempre entre caracteres UTF-8.
+        """
+        path = self._get_page_path(tech, page_path)
+        try:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                data = f.read(max(0, end - start))
+        except OSError:
+            # Del paquete offline: solo se copia el rango pedido del mmap
+            name = self._bundle_name(path)
+            data = self.bundle.read_range(name, start, end) if name else None
+            if data is None:
+                return None
+        return data.decode('utf-8', errors='replace')
+    
+    def _get_html_path(self, tech: str, page_path: str) -> Path:
+        """Ruta al HTML original comprimido de una página"""
+        safe_name = self._sanitize_filename(page_path)
+        return self.cache_dir / tech / f"{safe_name}.html.gz"
+    
+    def get_page_html(self, tech: str, page_path: str) -> Optional[str]:
+        """Obtiene el HTML original de una página desde caché"""
+        data = self.read_file(self._get_html_path(tech, page_path))
+        if data is None:
+            return None
+        try:
+            return gzip.decompress(data).decode('utf-8')
+        except (OSError, EOFError):
+            return None
+    
+    def save_page_html(self, tech: str, page_path: str, html: str) -> None:
+        """Guarda el HTML original de una página (gzip) para poder reconvertirla"""
+        self._write_atomic(
+            self._get_html_path(tech, page_path),
+            gzip.compress(html.encode('utf-8'), compresslevel=6)
+        )
+    
+    def list_page_meta(self, tech: str) -> list[dict]:
+        """Sidecars "meta" (path y versión del conversor) de las páginas de una tecnología"""
+        metas = []
+        for path in self.list_page_sidecars(tech, "meta"):
+            try:
+                metas.append(json.loads(self.read_file(path)))
+            except (TypeError, ValueError):
+                continue
+        return metas
+    
+    def list_pages_without_meta(self, tech: str) -> list[str]:
+        """
+        Paths de las páginas cacheadas sin sidecar "meta" (anteriores a los
+        sidecars), leídos de su primera línea "# {path}".
+        """
+        with_meta = {p.name[:-len(".meta.json")] for p in self.list_page_sidecars(tech, "meta")}
+        paths = []
+        for page_file in self.list_pages(tech):
+            if page_file.stem in with_meta:
+                continue
+            data = self.read_file(page_file)
+            header = data.split(b'\n', 1)[0].decode('utf-8', errors='replace') if data else ''
+            if header.startswith('# '):
+                paths.append(header[2:].strip())
+        return paths
+    
+    def _get_sidecar_path(self, tech: str, page_path: str, kind: str) -> Path:
+        """Ruta a un fichero auxiliar de una página ({página}.{kind}.json)"""
+        safe_name = self._sanitize_filename(page_path)
+        return self.cache_dir / tech / f"{safe_name}.{kind}.json"
+    
+    def list_page_sidecars(self, tech: str, kind: str) -> list[Path]:
+        """Ficheros de un tipo de sidecar de todas las páginas de una tecnología"""
+        return self._glob(tech, f"*.{kind}.json")
+    
+    def get_page_sidecar(self, tech: str, page_path: str, kind: str) -> Optional[Any]:
+        """Obtiene un sidecar de una página (secciones, etc.)"""
+        try:
+            return json.loads(self.read_file(self._get_sidecar_path(tech, page_path, kind)))
+        except (TypeError, ValueError):
+            return None
+    
+    def save_page_sidecar(self, tech: str, page_path: str, kind: str, data: Any) -> None:
+        """Guarda un sidecar de una página"""
+        path = self._get_sidecar_path(tech, page_path, kind)
+        self._write_atomic(path, json.dumps(data, ensure_ascii=False).encode('utf-8'))
     
     def page_exists(self, tech: str, page_path: str) -> bool:
         """Verifica si una página existe en caché"""
-        return self._get_page_path(tech, page_path).exists()
+        return self._exists(self._get_page_path(tech, page_path))
+    
+    def page_in_bundle(self, tech: str, page_path: str) -> bool:
+        """Verifica si una página está en el paquete offline (de solo lectura)"""
+        name = self._bundle_name(self._get_page_path(tech, page_path))
+        return name is not None and self.bundle.contains(name)
+    
+    def delete_page(self, tech: str, page_path: str) -> None:
+        """Borra una página del caché en disco junto con su HTML y sus sidecars"""
+        paths = [self._get_page_path(tech, page_path), self._get_html_path(tech, page_path)]
+        paths += [self._get_sidecar_path(tech, page_path, kind) for kind in SIDECAR_KINDS]
+        with self.lock(shared=True):
+            for path in paths:
+                path.unlink(missing_ok=True)
+        self._bump_pages_stamp(tech)
+    
+    def list_pages(self, tech: str) -> list[Path]:
+        """Lista los archivos de páginas cacheadas de una tecnología"""
+        return self._glob(tech, "*.md")
+    
+    def list_techs(self) -> list[str]:
+        """Lista las tecnologías con índice en caché"""
+        techs = {
+            tech_dir.name for tech_dir in self.cache_dir.iterdir()
+            if not tech_dir.name.startswith('.') and (tech_dir / "index.json").exists()
+        }
+        if self.bundle is not None:
+            techs.update(tech for tech in self.bundle.techs if self.bundle.contains(f"{tech}/index.json"))
+        return sorted(techs)
+    
+    # ─────────────────────────────────────────────────────────
+    # Grafo de enlaces entre páginas
+    # ─────────────────────────────────────────────────────────
+    
+    def get_links(self, tech: str) -> Optional[dict]:
+        """Obtiene el grafo de enlaces de una tecnología (links.json)"""
+        try:
+            return json.loads(self.read_file(self.cache_dir / tech / "links.json"))
+        except (TypeError, ValueError):
+            return None
+    
+    def save_links(self, tech: str, graph: dict) -> None:
+        """Guarda el grafo de enlaces de una tecnología"""
+        path = self.cache_dir / tech / "links.json"
+        self._write_atomic(path, json.dumps(graph, ensure_ascii=False).encode('utf-8'))
+    
+    # ─────────────────────────────────────────────────────────
+    # Vectores TF-IDF (búsqueda por similitud)
+    # ─────────────────────────────────────────────────────────
+    
+    def get_vectors_path(self, tech: str) -> Path:
+        """Ruta a la matriz TF-IDF de una tecnología (.npz)"""
+        return self.cache_dir / tech / "vectors.npz"
+    
+    def get_vectors_meta(self, tech: str) -> Optional[dict]:
+        """Obtiene los metadatos (firma y filas) de la matriz TF-IDF"""
+        path = self.cache_dir / tech / "vectors.json"
+        if not self._exists(self.get_vectors_path(tech)):
+            return None
+        try:
+            return json.loads(self.read_file(path))
+        except (TypeError, ValueError):
+            # Ausente, truncado o corrupto: se trata como si no existiera y se reconstruye
+            return None
+    
+    def save_vectors_meta(self, tech: str, meta: dict) -> None:
+        """Guarda los metadatos de la matriz TF-IDF"""
+        path = self.cache_dir / tech / "vectors.json"
+        self._write_atomic(path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
     
     # ─────────────────────────────────────────────────────────
     # Utilidades
@@ -103,36 +394,290 @@ class DevDocsCache:
         total_size = 0
         techs = {}
         
-        for tech_dir in self.cache_dir.iterdir():
-            if tech_dir.is_dir():
-                tech_files = list(tech_dir.glob("*.md"))
-                tech_size = sum(f.stat().st_size for f in tech_files)
-                techs[tech_dir.name] = {
-                    "files": len(tech_files),
-                    "size_mb": round(tech_size / 1024 / 1024, 2)
-                }
-                total_files += len(tech_files)
-                total_size += tech_size
+        names = {
+            tech_dir.name for tech_dir in self.cache_dir.iterdir()
+            if tech_dir.is_dir() and not tech_dir.name.startswith('.')
+        }
+        if self.bundle is not None:
+            names.update(self.bundle.techs)
+        
+        for tech in sorted(names):
+            tech_files = self.list_pages(tech)
+            tech_size = sum(self._stat(f)[0] for f in tech_files)
+            techs[tech] = {
+                "files": len(tech_files),
+                "size_mb": round(tech_size / 1024 / 1024, 2)
+            }
+            total_files += len(tech_files)
+            total_size += tech_size
         
         return {
             "cache_dir": str(self.cache_dir),
             "total_files": total_files,
             "total_size_mb": round(total_size / 1024 / 1024, 2),
+            "bundle": str(self.bundle.path) if self.bundle is not None else None,
             "technologies": techs
         }
     
     def clear_cache(self, tech: Optional[str] = None) -> dict:
-        """Limpia el caché (todo o una tecnología específica)"""
-        import shutil
-        
-        if tech:
-            tech_dir = self.cache_dir / tech
-            if tech_dir.exists():
-                shutil.rmtree(tech_dir)
-                return {"cleared": tech, "status": "ok"}
-            return {"cleared": tech, "status": "not_found"}
+        """
+        Limpia el caché (todo o una tecnología específica).
+        El paquete offline es de solo lectura y no se toca.
+        """
+        with self.lock():
+            if tech:
+                tech_dir = self.cache_dir / tech
+                if tech_dir.exists():
+                    self._discard_dir(tech_dir)
+                    return {"cleared": tech, "status": "ok"}
+                return {"cleared": tech, "status": "not_found"}
+            else:
+                for child in self.cache_dir.iterdir():
+                    if child.name != ".lock":
+                        self._discard_dir(child)
+                return {"cleared": "all", "status": "ok"}
+    
+    def _discard_dir(self, path: Path) -> None:
+        """
+        Renombra y luego borra: los demás procesos ven la tecnología entera o
+        nada, y los archivos que ya tenían abiertos siguen siendo legibles.
+        """
+        if path.is_dir():
+            trash = self.cache_dir / f".trash-{uuid.uuid4().hex}"
+            os.replace(path, trash)
+            shutil.rmtree(trash, ignore_errors=True)
         else:
-            if self.cache_dir.exists():
-                shutil.rmtree(self.cache_dir)
-                self.cache_dir.mkdir(parents=True, exist_ok=True)
-            return {"cleared": "all", "status": "ok"}
+            path.unlink(missing_ok=True)
+    
+    # ─────────────────────────────────────────────────────────
+    # Coordinación entre procesos
+    # ─────────────────────────────────────────────────────────
+    
+    @contextmanager
+    def lock(self, shared: bool = False) -> Iterator[None]:
+        """
+        Bloqueo del caché entre procesos (flock sobre {cache_dir}/.lock).
+        Exclusivo para limpiezas, compartido para escrituras de páginas.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.cache_dir / ".lock", 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    
+    def _get_marker_path(self, tech: str, page_path: Optional[str]) -> Path:
+        """Marca de descarga en curso de una página (o del índice si page_path es None)"""
+        if page_path is None:
+            return self.cache_dir / tech / "index.json.fetching"
+        safe_name = self._sanitize_filename(page_path)
+        return self.cache_dir / tech / f"{safe_name}.fetching"
+    
+    def claim_fetch(self, tech: str, page_path: Optional[str] = None) -> bool:
+        """
+        Intenta quedarse con la descarga de una página (o del índice).
+        False si otro proceso o hilo la tiene en curso.
+        """
+        marker = self._get_marker_path(tech, page_path)
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                # Marca abandonada: quien la creó ya no la va a liberar
+                try:
+                    if time.time() - marker.stat().st_mtime < FETCH_MARKER_TTL:
+                        return False
+                    marker.unlink()
+                except FileNotFoundError:
+                    pass
+                continue
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            self._track_claim(marker)
+            return True
+        return False
+    
+    def release_fetch(self, tech: str, page_path: Optional[str] = None) -> None:
+        """Libera la marca de descarga tomada con claim_fetch"""
+        marker = self._get_marker_path(tech, page_path)
+        with self._claimed_lock:
+            self._claimed.discard(marker)
+        marker.unlink(missing_ok=True)
+    
+    def _track_claim(self, marker: Path) -> None:
+        with self._claimed_lock:
+            self._claimed.add(marker)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(
+                    target=self._refresh_markers, name="devdocs-fetch-markers", daemon=True
+                )
+                self._heartbeat.start()
+    
+    def _refresh_markers(self) -> None:
+        """
+        Toca las marcas tomadas mientras sus descargas siguen en curso, para
+        que una descarga en cola o convirtiéndose más de FETCH_MARKER_TTL
+        segundos no parezca abandonada. Termina cuando no queda ninguna.
+        """
+        while True:
+            time.sleep(FETCH_MARKER_REFRESH)
+            with self._claimed_lock:
+                if not self._claimed:
+                    self._heartbeat = None
+                    return
+                markers = list(self._claimed)
+            for marker in markers:
+                try:
+                    os.utime(marker)
+                except FileNotFoundError:
+                    pass
+    
+    def wait_for_fetch(self, tech: str, page_path: Optional[str] = None,
+                       poll: float = 0.05) -> bool:
+        """
+        Espera a que termine la descarga que otro tiene en curso.
+        True si la página (o el índice) quedó en caché; False si la marca
+        desapareció o caducó sin ella (hay que descargarla).
+        """
+        marker = self._get_marker_path(tech, page_path)
+        target = self._get_index_path(tech) if page_path is None else self._get_page_path(tech, page_path)
+        while True:
+            if target.exists():
+                return True
+            try:
+                if time.time() - marker.stat().st_mtime >= FETCH_MARKER_TTL:
+                    return False
+            except FileNotFoundError:
+                return target.exists()
+            time.sleep(poll)
+
+
+class QueryResultCache:
+    """
+    Caché en memoria (LRU) de resultados de las búsquedas.
+    
+    Cada entrada guarda los sellos de los índices de los que depende
+    (ver DevDocsCache.index_stamp); si alguno cambia, la entrada se
+    descarta al consultarla. Está limitada por número de entradas y bytes.
+    """
+    
+    def __init__(self, max_entries: int = 256, max_bytes: int = 4 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable, stamps: tuple) -> Optional[Any]:
+        """Devuelve el resultado cacheado si sus sellos siguen vigentes"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        value, entry_stamps, size = entry
+        if entry_stamps != stamps:
+            # El índice cambió desde que se calculó el resultado
+            self._discard(key)
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def put(self, key: Hashable, stamps: tuple, value: Any, size: Optional[int] = None) -> None:
+        """
+        Guarda un resultado, desalojando los menos usados si hace falta.
+        
+        size son los bytes que cuenta para el límite; por defecto, los del
+        texto (value debe ser entonces un str).
+        """
+        if size is None:
+            size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        
+        self._discard(key)
+        self._entries[key] = (value, stamps, size)
+        self._bytes += size
+        
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, _, old_size) = self._entries.popitem(last=False)
+            self._bytes -= old_size
+    
+    def clear(self) -> None:
+        """Vacía la caché de resultados"""
+        self._entries.clear()
+        self._bytes = 0
+    
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+    
+    def get_stats(self) -> dict:
+        """Estadísticas de uso de la caché de resultados"""
+        return {
+            "entries": len(self._entries),
+            "size_kb": round(self._bytes / 1024, 1),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class NegativeCache:
+    """
+    Caché en memoria de recursos que no existen (404/410).
+    
+    Evita que un path mal escrito o una página retirada vuelva a la red en
+    cada reintento. Las entradas caducan a los ttl segundos, por si el
+    recurso aparece más tarde. Es segura entre hilos.
+    """
+    
+    def __init__(self, ttl: float = 300, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devuelve lo guardado para key si sigue vigente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self.hits += 1
+            return value
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """Marca key como inexistente durante ttl segundos"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Olvida todos los recursos marcados"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> dict:
+        """Estadísticas de la caché negativa"""
+        with self._lock:
+            now = time.monotonic()
+            live = sum(1 for expires, _ in self._entries.values() if expires > now)
+        return {"entries": live, "hits": self.hits, "ttl": self.ttl}
@@ -0,0 +1,145 @@
+"""
+Ejecución de trabajo bloqueante para el servidor MCP
+Pools de hilos separados para red, disco y CPU, límites por tool y contrapresión
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Optional
+
+
+# Clases de trabajo (cada una con su pool)
+NETWORK = "network"   # Puede descargar de DevDocs si falta en caché
+DISK = "disk"         # Recorridos y operaciones sobre el caché en disco
+CPU = "cpu"           # Conversión y búsqueda por similitud sobre datos locales
+
+# Llamadas simultáneas de las tools más pesadas (el resto usa el límite por defecto)
+TOOL_LIMITS = {
+    "export_documentation": 1,
+    "update_documentation": 1,
+    "rerender_cache": 1,
+    "clear_cache": 1,
+    "get_multiple_pages": 4,
+    "search_across_docs": 4,
+}
+
+
+class Executors:
+    """
+    Pools de hilos dimensionados por clase de trabajo.
+
+    Una exportación que satura la red no deja sin hilos a get_cache_stats,
+    y la conversión en CPU no compite con las esperas de red.
+
+    Configuración: DEVDOCS_NETWORK_THREADS (16), DEVDOCS_DISK_THREADS (4)
+    y DEVDOCS_CPU_THREADS (núcleos disponibles).
+    """
+
+    def __init__(self, network: Optional[int] = None, disk: Optional[int] = None,
+                 cpu: Optional[int] = None):
+        sizes = {
+            NETWORK: network or int(os.environ.get("DEVDOCS_NETWORK_THREADS", 16)),
+            DISK: disk or int(os.environ.get("DEVDOCS_DISK_THREADS", 4)),
+            CPU: cpu or int(os.environ.get("DEVDOCS_CPU_THREADS", os.cpu_count() or 1)),
+        }
+        self._pools = {
+            kind: ThreadPoolExecutor(max_workers=max(1, size), thread_name_prefix=f"devdocs-{kind}")
+            for kind, size in sizes.items()
+        }
+        self._sizes = sizes
+        self._in_flight = {kind: 0 for kind in sizes}
+
+    async def run(self, kind: str, fn: Callable, *args, **kwargs) -> Any:
+        """Ejecuta fn en el pool de su clase sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        self._in_flight[kind] += 1
+        try:
+            return await loop.run_in_executor(self._pools[kind], partial(fn, *args, **kwargs))
+        finally:
+            self._in_flight[kind] -= 1
+
+    def get_stats(self) -> dict:
+        """Hilos y tareas en curso (o en cola) por pool"""
+        return {
+            kind: {"threads": self._sizes[kind], "in_flight": self._in_flight[kind]}
+            for kind in self._pools
+        }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Detiene los pools"""
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+class Overloaded(RuntimeError):
+    """La tool tiene demasiadas llamadas en curso y en cola"""
+
+    def __init__(self, tool: str, running: int, waiting: int):
+        self.tool = tool
+        self.running = running
+        self.waiting = waiting
+        super().__init__(
+            f"Servidor ocupado: '{tool}' tiene {running} llamadas en curso y {waiting} en cola. "
+            "Reintenta en unos segundos"
+        )
+
+
+class ToolLimiter:
+    """
+    Límite de llamadas simultáneas por tool con cola acotada.
+
+    Las llamadas que superan el límite esperan su turno; si la cola de esa
+    tool ya está llena, se rechazan al momento con Overloaded en lugar de
+    acumular trabajo que el cliente probablemente ya no espere.
+
+    Configuración: DEVDOCS_TOOL_CONCURRENCY (8, salvo las de TOOL_LIMITS)
+    y DEVDOCS_TOOL_QUEUE (32 llamadas en cola por tool).
+    """
+
+    def __init__(self, default_limit: Optional[int] = None, max_queue: Optional[int] = None,
+                 limits: Optional[dict] = None):
+        self.default_limit = default_limit or int(os.environ.get("DEVDOCS_TOOL_CONCURRENCY", 8))
+        if max_queue is None:
+            max_queue = int(os.environ.get("DEVDOCS_TOOL_QUEUE", 32))
+        self.max_queue = max_queue
+        self.limits = TOOL_LIMITS if limits is None else limits
+        self._tools: dict[str, dict] = {}
+
+    def _state(self, tool: str) -> dict:
+        state = self._tools.get(tool)
+        if state is None:
+            limit = self.limits.get(tool, self.default_limit)
+            state = self._tools[tool] = {
+                "semaphore": asyncio.Semaphore(limit), "limit": limit,
+                "running": 0, "waiting": 0, "rejected": 0
+            }
+        return state
+
+    @asynccontextmanager
+    async def slot(self, tool: str) -> AsyncIterator[None]:
+        """Espera turno para ejecutar tool (o lanza Overloaded si la cola está llena)"""
+        state = self._state(tool)
+        if state["running"] >= state["limit"] and state["waiting"] >= self.max_queue:
+            state["rejected"] += 1
+            raise Overloaded(tool, state["running"], state["waiting"])
+
+        state["waiting"] += 1
+        try:
+            await state["semaphore"].acquire()
+        finally:
+            state["waiting"] -= 1
+        state["running"] += 1
+        try:
+            yield
+        finally:
+            state["running"] -= 1
+            state["semaphore"].release()
+
+    def get_stats(self) -> dict:
+        """Llamadas en curso, en cola y rechazadas de las tools usadas"""
+        return {
+            tool: {key: state[key] for key in ("limit", "running", "waiting", "rejected")}
+            for tool, state in self._tools.items()
+        }
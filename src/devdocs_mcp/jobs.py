@@ -0,0 +1,177 @@
+"""
+Trabajos en segundo plano para DevDocs MCP
+Las operaciones largas (exportar, precalentar, actualizar, reconvertir) siguen
+corriendo aunque la llamada que las lanzó ya haya respondido
+"""
+import asyncio
+import itertools
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+
+# Estados de un trabajo
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Se canceló el trabajo (se lanza desde el callback de progreso)"""
+
+
+class Job:
+    """
+    Un trabajo en segundo plano.
+
+    report() se pasa como callback de progreso a los métodos de la API
+    (firma (etiqueta, hechas, total)): actualiza el avance, avisa a los
+    oyentes y, si se pidió cancelar, lanza JobCancelled para cortar la
+    operación en el siguiente lote.
+    """
+
+    def __init__(self, job_id: str, tool: str, description: str,
+                 render: Optional[Callable[[Any], str]] = None):
+        self.id = job_id
+        self.tool = tool
+        self.description = description
+        self.render = render
+        self.status = QUEUED
+        self.progress = 0
+        self.total: Optional[int] = None
+        self.message = ""
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._cancel = threading.Event()
+        self._listeners: list[Callable[[int, Optional[int], str], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        """Lanza JobCancelled si se pidió cancelar"""
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def report(self, label: str, done: int, total: int) -> None:
+        """Callback de progreso (se llama desde los hilos de trabajo)"""
+        self.check()
+        self.progress, self.total = done, total
+        self.message = f"{label}: {done}/{total}"
+        for listener in list(self._listeners):
+            listener(done, total, self.message)
+
+    def add_listener(self, listener: Callable[[int, Optional[int], str], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int, Optional[int], str], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def rendered(self) -> str:
+        """Resultado en Markdown"""
+        return self.render(self.result) if self.render is not None else str(self.result)
+
+    def snapshot(self) -> dict:
+        """Estado del trabajo en un diccionario"""
+        end = self.finished or time.time()
+        return {
+            "id": self.id,
+            "tool": self.tool,
+            "description": self.description,
+            "status": self.status,
+            "progress": self.progress,
+            "total": self.total,
+            "message": self.message,
+            "elapsed": round(end - self.created, 1),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Registro de trabajos en segundo plano del proceso.
+
+    Como mucho DEVDOCS_MAX_JOBS (2) corren a la vez; el resto espera en
+    estado "queued". Se conservan los últimos trabajos terminados para
+    poder consultar su resultado con job_status.
+    """
+
+    def __init__(self, max_running: Optional[int] = None, keep_finished: int = 50):
+        self.max_running = max_running or int(os.environ.get("DEVDOCS_MAX_JOBS", 2))
+        self.keep_finished = keep_finished
+        self._jobs: dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def start(self, tool: str, description: str, work: Callable[[Job], Awaitable[Any]],
+              render: Optional[Callable[[Any], str]] = None) -> Job:
+        """
+        Lanza work(job) como trabajo en segundo plano (debe llamarse desde el event loop).
+
+        work devuelve el resultado como datos (lo que devuelva la API) y
+        render lo convierte en Markdown; para poder cancelarse, work debe
+        pasar job.report como callback de progreso a la API.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running)
+        job = Job(f"job-{next(self._ids)}", tool, description, render)
+        self._jobs[job.id] = job
+        job.task = asyncio.ensure_future(self._run(job, work))
+        self._prune()
+        return job
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[Any]]) -> None:
+        try:
+            async with self._slots:
+                job.check()
+                job.status = RUNNING
+                job.result = await work(job)
+                job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        """Trabajos conocidos, del más reciente al más antiguo"""
+        return sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Pide cancelar un trabajo. Uno en cola no llega a empezar; uno en
+        curso se detiene al terminar el lote que esté procesando.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and job.status not in FINISHED:
+            job._cancel.set()
+        return job
+
+    async def wait(self, job: Job, timeout: float) -> bool:
+        """Espera hasta timeout segundos a que termine (sin cancelarlo); True si terminó"""
+        if job.status in FINISHED:
+            return True
+        if timeout > 0:
+            await asyncio.wait({job.task}, timeout=timeout)
+        return job.status in FINISHED
+
+    def _prune(self) -> None:
+        finished = [job for job in self.list() if job.status in FINISHED]
+        for job in finished[self.keep_finished:]:
+            del self._jobs[job.id]
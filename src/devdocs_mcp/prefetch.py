@@ -0,0 +1,123 @@
+"""
+Precarga en segundo plano para DevDocs MCP
+Descarga páginas que probablemente se pidan a continuación
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Optional
+
+from .scheduler import PREFETCH
+
+
+class Prefetcher:
+    """
+    Descarga y convierte páginas en segundo plano para que la siguiente
+    petición del agente sea un acierto de caché.
+
+    - Las páginas ya cacheadas o ya en cola se ignoran. Las descargas usan
+      DevDocsAPI.fetch_pages, que no vuelve a disparar precargas.
+    - Presupuesto por proceso de peticiones y bytes guardados; agotado,
+      no se encola nada más.
+    - Las precargas de un grupo (ej: "search") quedan obsoletas cuando llega
+      otra del mismo grupo: las que aún no empezaron se cancelan.
+
+    Configuración: DEVDOCS_PREFETCH_MAX_REQUESTS (200) y DEVDOCS_PREFETCH_MAX_MB (50).
+    """
+
+    def __init__(self, api, workers: int = 2, max_requests: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.api = api
+        if max_requests is None:
+            max_requests = int(os.environ.get("DEVDOCS_PREFETCH_MAX_REQUESTS", 200))
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("DEVDOCS_PREFETCH_MAX_MB", 50)) * 1024 * 1024)
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="devdocs-prefetch"
+        )
+        self._pending: set[tuple[str, str]] = set()
+        self._groups: dict[str, tuple[int, list[Future]]] = {}
+        self._lock = threading.RLock()  # cancel() ejecuta los callbacks con el lock tomado
+        self.stats = {
+            "scheduled": 0, "fetched": 0, "failed": 0, "cancelled": 0,
+            "requests": 0, "bytes": 0
+        }
+
+    def _over_budget(self) -> bool:
+        return (self.stats["requests"] >= self.max_requests
+                or self.stats["bytes"] >= self.max_bytes)
+
+    def schedule(self, pages: list[tuple[str, str]], group: Optional[str] = None) -> int:
+        """
+        Encola páginas (tech, path) para precargar.
+        Devuelve cuántas se encolaron.
+        """
+        with self._lock:
+            generation = 0
+            if group is not None:
+                # Lo que quedaba en cola de la búsqueda anterior ya no interesa
+                previous, futures = self._groups.get(group, (0, []))
+                for future in futures:
+                    if future.cancel():
+                        self.stats["cancelled"] += 1
+                generation = previous + 1
+                self._groups[group] = (generation, [])
+
+            queued = []
+            for tech, path in pages:
+                key = (tech, path)
+                if self._over_budget() or len(queued) + self.stats["requests"] >= self.max_requests:
+                    break
+                if key in self._pending or self.api.cache.page_exists(tech, path):
+                    continue
+                self._pending.add(key)
+                queued.append(key)
+            self.stats["scheduled"] += len(queued)
+
+            for key in queued:
+                future = self._executor.submit(self._fetch, key, group, generation)
+                future.add_done_callback(partial(self._on_done, key))
+                if group is not None:
+                    self._groups[group][1].append(future)
+        return len(queued)
+
+    def _on_done(self, key: tuple[str, str], future: Future) -> None:
+        # Cancelada antes de empezar: liberar la página
+        if future.cancelled():
+            self._release(key)
+
+    def _release(self, key: tuple[str, str]) -> None:
+        with self._lock:
+            self._pending.discard(key)
+
+    def _fetch(self, key: tuple[str, str], group: Optional[str], generation: int) -> None:
+        tech, path = key
+        try:
+            with self._lock:
+                stale = group is not None and self._groups[group][0] != generation
+                if stale or self._over_budget():
+                    self.stats["cancelled"] += 1
+                    return
+                if self.api.cache.page_exists(tech, path):
+                    return
+                self.stats["requests"] += 1
+
+            errors = self.api.fetch_pages(tech, [path], priority=PREFETCH)
+            with self._lock:
+                if errors:
+                    self.stats["failed"] += 1
+                else:
+                    self.stats["fetched"] += 1
+                    self.stats["bytes"] += self.api.cache.page_size(tech, path)
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+        finally:
+            self._release(key)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Detiene los hilos de precarga"""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,140 @@
+"""
+Planificador de peticiones HTTP para DevDocs MCP
+Prioridades, límite global de concurrencia y ritmo máximo por host
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from urllib.parse import urlsplit
+
+
+# Clases de prioridad (menor = antes)
+INTERACTIVE = 0   # Lo que el agente está esperando
+PREFETCH = 1      # Precarga especulativa
+BULK = 2          # Exportaciones y descargas masivas
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PREFETCH: "prefetch", BULK: "bulk"}
+
+
+class FetchScheduler:
+    """
+    Puerta por la que pasa toda petición saliente de DevDocsAPI.
+
+    - Las peticiones esperan en una cola de prioridad: cuando queda un hueco
+      libre entra primero la interactiva, luego la precarga y por último la masiva.
+    - Límite global de peticiones simultáneas. Parte de los huecos quedan
+      reservados para las interactivas, así una exportación en curso no
+      las deja esperando detrás de sus descargas.
+    - Ritmo máximo por host: entre dos arranques al mismo host pasa al
+      menos 1/host_rate segundos. Las masivas llevan su propio ritmo
+      (bulk_rate), para que exportar o precalentar no vaya a 10 por segundo.
+    - La espera por ritmo es de cada host: una petición frenada por el suyo
+      no retiene a las de otros hosts que vienen detrás en la cola.
+
+    Configuración: DEVDOCS_MAX_CONNECTIONS (8), DEVDOCS_HOST_RATE
+    (peticiones/s por host, 10; 0 = sin límite) y DEVDOCS_BULK_HOST_RATE
+    (lo mismo para las masivas, 0 = solo el límite de conexiones).
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, host_rate: Optional[float] = None,
+                 reserved: Optional[int] = None, bulk_rate: Optional[float] = None):
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get("DEVDOCS_MAX_CONNECTIONS", 8))
+        if host_rate is None:
+            host_rate = float(os.environ.get("DEVDOCS_HOST_RATE", 10))
+        if bulk_rate is None:
+            bulk_rate = float(os.environ.get("DEVDOCS_BULK_HOST_RATE", 0))
+        self.max_concurrency = max(1, max_concurrency)
+        self.host_rate = max(0.0, host_rate)
+        self.bulk_rate = max(0.0, bulk_rate)
+        if reserved is None:
+            reserved = max(1, self.max_concurrency // 4)
+        # Huecos solo para peticiones interactivas
+        self.reserved = min(reserved, self.max_concurrency - 1)
+
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []   # Heap de (prioridad, orden de llegada)
+        self._hosts: dict[tuple[int, int], str] = {}  # Host de cada petición en cola
+        self._order = itertools.count()
+        self._active = 0
+        self._next_start: dict[tuple[str, bool], float] = {}
+        self.stats = {
+            name: {"requests": 0, "wait_ms": 0.0} for name in PRIORITY_NAMES.values()
+        }
+
+    def _rate(self, priority: int) -> float:
+        return self.bulk_rate if priority == BULK else self.host_rate
+
+    def _rate_delay(self, ticket: tuple[int, int], host: str, now: float) -> float:
+        """Segundos que faltan para que el ritmo del host deje arrancar la petición"""
+        if not self._rate(ticket[0]):
+            return 0.0
+        return self._next_start.get((host, ticket[0] == BULK), 0.0) - now
+
+    def _admission_delay(self, ticket: tuple[int, int], host: str) -> Optional[float]:
+        """
+        0 si la petición puede arrancar ya; segundos a esperar si solo la
+        frena el ritmo del host; None si debe esperar a que cambie la cola.
+        """
+        limit = self.max_concurrency
+        if ticket[0] != INTERACTIVE:
+            limit -= self.reserved
+        if self._active >= limit:
+            return None
+        now = time.monotonic()
+        delay = self._rate_delay(ticket, host, now)
+        if delay > 0:
+            return delay
+        # Las de delante tienen preferencia, salvo las que frena el ritmo de su host
+        for other in self._waiting:
+            if other < ticket and self._rate_delay(other, self._hosts[other], now) <= 0:
+                return None
+        return 0
+
+    @contextmanager
+    def slot(self, url: str, priority: int = INTERACTIVE) -> Iterator[None]:
+        """Espera turno para hacer una petición a url y lo libera al terminar"""
+        host = urlsplit(url).netloc
+        ticket = (priority, next(self._order))
+        queued_at = time.monotonic()
+
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._hosts[ticket] = host
+            try:
+                while True:
+                    delay = self._admission_delay(ticket, host)
+                    if delay == 0:
+                        break
+                    self._cond.wait(delay)
+            except BaseException:
+                self._cond.notify_all()
+                raise
+            finally:
+                # Puede no ser la primera de la cola: otra frenada por su host quedó delante
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                del self._hosts[ticket]
+
+            self._active += 1
+            now = time.monotonic()
+            rate = self._rate(priority)
+            if rate:
+                key = (host, priority == BULK)
+                self._next_start[key] = max(now, self._next_start.get(key, 0.0)) + 1 / rate
+            stats = self.stats[PRIORITY_NAMES.get(priority, "bulk")]
+            stats["requests"] += 1
+            stats["wait_ms"] += (now - queued_at) * 1000
+            # La siguiente de la cola puede tener hueco
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
@@ -0,0 +1,223 @@
+"""
+Estructuras de búsqueda en memoria para DevDocs MCP
+Se construyen a partir del índice de cada tecnología
+"""
+import math
+import os
+import re
+import uuid
+import zlib
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import BinaryIO, Union
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # Dependencias opcionales (pip install devdocs-mcp[vector])
+    np = None
+    sparse = None
+
+
+class CompletionIndex:
+    """
+    Autocompletado por prefijo sobre los nombres de un índice.
+    
+    Guarda los nombres normalizados (casefold) en un array ordenado;
+    cada consulta es un bisect más un recorrido de los `limit` siguientes.
+    """
+    
+    def __init__(self, entries: list[dict]):
+        keyed = sorted(
+            (entry.get('name', '').casefold(), i)
+            for i, entry in enumerate(entries)
+            if entry.get('name')
+        )
+        self._keys = [key for key, _ in keyed]
+        self._entries = [entries[i] for _, i in keyed]
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def complete(self, prefix: str, limit: int = 10) -> list[dict]:
+        """Devuelve las entradas cuyo nombre empieza por `prefix`"""
+        key = prefix.casefold()
+        keys = self._keys
+        results = []
+        
+        for i in range(bisect_left(keys, key), len(keys)):
+            if not keys[i].startswith(key) or len(results) >= limit:
+                break
+            results.append(self._entries[i])
+        
+        return results
+
+
+# ─────────────────────────────────────────────────────────
+# Búsqueda por similitud (TF-IDF con hashing)
+# ─────────────────────────────────────────────────────────
+
+# Dimensión del espacio de features (hashing trick: sin vocabulario)
+N_FEATURES = 2 ** 18
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Versión de tokenize(). Subirla cuando cambien los términos para que los
+# índices guardados se reconstruyan
+TOKENIZER_VERSION = 2
+
+_STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it its my of on
+or that the this to use using what when where which with you your
+""".split())
+
+
+def vectors_available() -> bool:
+    """Indica si están instaladas las dependencias de la búsqueda por similitud"""
+    return np is not None
+
+
+def tokenize(text: str) -> list[str]:
+    """Tokeniza texto en términos normalizados (minúsculas, sin stopwords, stem ligero)"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        # Stem muy ligero: "cancelled", "cancels", "cancelling" → "cancel"
+        for suffix in ('ing', 'ed', 'es', 's'):
+            if len(token) > len(suffix) + 3 and token.endswith(suffix):
+                token = token[:-len(suffix)]
+                break
+        # Consonante final doble ("cancell" → "cancel"). Se aplica a toda raíz,
+        # no solo tras quitar el sufijo, para que "call" y "called" coincidan
+        last = token[-1]
+        if len(token) > 3 and last == token[-2] and last.isalpha() and last not in 'aeiou':
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _features(text: str) -> Counter:
+    """Cuenta de features (términos hasheados) de un texto"""
+    return Counter(zlib.crc32(token.encode()) % N_FEATURES for token in tokenize(text))
+
+
+def document_features(text: str) -> tuple:
+    """
+    Features de un documento sin ponderar por idf: (columnas, 1 + log(tf)).
+    
+    No dependen del resto de documentos, así que se pueden guardar y volver
+    a combinar con from_features() sin tokenizar de nuevo.
+    """
+    counts = _features(text)
+    cols = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+    weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    return cols, weights.astype(np.float32)
+
+
+class TfidfIndex:
+    """
+    Matriz TF-IDF dispersa (filas = documentos, L2-normalizadas).
+    
+    Las features se obtienen con hashing (crc32), así que no hace falta
+    guardar vocabulario y las consultas se vectorizan sin estado extra.
+    """
+    
+    def __init__(self, matrix, idf):
+        self.matrix = matrix
+        self.idf = idf
+    
+    @classmethod
+    def build(cls, documents: list[str]) -> "TfidfIndex":
+        """Construye el índice a partir de los textos de los documentos"""
+        return cls.from_features([document_features(text) for text in documents])
+    
+    @classmethod
+    def from_features(cls, features: list[tuple]) -> "TfidfIndex":
+        """Construye el índice a partir de las features de cada documento (ver document_features)"""
+        cols = np.concatenate([np.zeros(0, dtype=np.int32), *(cols for cols, _ in features)])
+        weights = np.concatenate([np.zeros(0, dtype=np.float32), *(weights for _, weights in features)])
+        indptr = np.zeros(len(features) + 1, dtype=np.int64)
+        np.cumsum([len(cols) for cols, _ in features], out=indptr[1:])
+        
+        df = np.bincount(cols, minlength=N_FEATURES)
+        idf = (np.log((1 + len(features)) / (1 + df)) + 1.0).astype(np.float32)
+        
+        matrix = sparse.csr_matrix(
+            (weights * idf[cols], cols, indptr),
+            shape=(len(features), N_FEATURES),
+            dtype=np.float32
+        )
+        return cls(_normalize_rows(matrix), idf)
+    
+    def query(self, queries: list[str]):
+        """
+        Puntúa varias consultas a la vez con un único producto matricial.
+        
+        Returns:
+            Array denso (documentos × consultas) con la similitud coseno
+        """
+        rows, cols, data = [], [], []
+        for row, text in enumerate(queries):
+            for feature, count in _features(text).items():
+                rows.append(row)
+                cols.append(feature)
+                data.append((1.0 + math.log(count)) * self.idf[feature])
+        
+        vectors = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), (rows, cols)),
+            shape=(len(queries), N_FEATURES),
+            dtype=np.float32
+        )
+        vectors = _normalize_rows(vectors)
+        return (self.matrix @ vectors.T).toarray()
+    
+    def top(self, query: str, limit: int = 10) -> list[tuple[int, float]]:
+        """Devuelve [(fila, puntuación)] de los `limit` documentos más similares"""
+        scores = self.query([query])[:, 0]
+        if not len(scores):
+            return []
+        
+        top = min(limit, len(scores))
+        best = np.argpartition(-scores, top - 1)[:top]
+        return [(int(i), float(scores[i])) for i in best if scores[i] > 0]
+    
+    def save(self, path: Path) -> None:
+        """Guarda el índice en un único .npz (temporal único + rename: nadie lo ve a medias)"""
+        # La tecnología puede vivir solo en el paquete offline, sin directorio en disco.
+        # El temporal lleva un uuid: dos hilos del mismo proceso pueden guardar a la vez
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez(
+                    f,
+                    data=self.matrix.data,
+                    indices=self.matrix.indices,
+                    indptr=self.matrix.indptr,
+                    shape=np.asarray(self.matrix.shape),
+                    idf=self.idf
+                )
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+    
+    @classmethod
+    def load(cls, path: Union[Path, BinaryIO]) -> "TfidfIndex":
+        """Carga un índice guardado con save() (ruta o archivo abierto)"""
+        with np.load(path) as stored:
+            matrix = sparse.csr_matrix(
+                (stored['data'], stored['indices'], stored['indptr']),
+                shape=tuple(stored['shape'])
+            )
+            return cls(matrix, stored['idf'])
+
+
+def _normalize_rows(matrix):
+    """Normaliza cada fila a norma L2 unitaria (las filas vacías quedan a cero)"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags((1.0 / norms).astype(np.float32)) @ matrix
+
@@ -2,24 +2,61 @@
 DevDocs MCP Server
 Expone herramientas para acceder a documentación de DevDocs desde Claude
 """
+import argparse
+import hmac
+import ipaddress
 import json
 import asyncio
-from typing import Any
+import os
+import re
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-from .api import DevDocsAPI
-from .cache import DevDocsCache
+from .api import DevDocsAPI, POPULAR_TECHS
+from .bundle import pack, unpack
+from .cache import DevDocsCache, QueryResultCache
+from .executors import CPU, DISK, NETWORK, Executors, Overloaded, ToolLimiter
+from .jobs import CANCELLED, DONE, FAILED, Job, JobManager
 from .utils import truncate_text
 
 
 # Crear instancias globales
 cache = DevDocsCache()
 api = DevDocsAPI(cache)
+query_cache = QueryResultCache()
 server = Server("devdocs-mcp")
 
+# Pools de hilos por clase de trabajo y límite de llamadas por tool
+executors = Executors()
+tool_limiter = ToolLimiter()
+
+# Operaciones largas (exportar, precalentar, actualizar...) como trabajos en segundo plano
+jobs = JobManager()
+
+# Operaciones por llamada a batch
+MAX_BATCH_OPERATIONS = 20
+
+# Formato de las respuestas: "markdown" (para leer) o "json" (compacto, con structuredContent)
+output_format = os.environ.get("DEVDOCS_OUTPUT_FORMAT", "markdown")
+
+# Segundos que esperan las tools de abanico antes de responder con lo que haya
+DEFAULT_DEADLINE = 20
+
+# Transporte HTTP: llamadas simultáneas por cliente (None = sin límite, stdio)
+client_concurrency: Optional[int] = None
+_client_slots: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+async def _index_stamps(techs: list[str]) -> tuple:
+    """Sellos de los índices de los que depende un resultado cacheado (un stat por índice, en el pool de disco)"""
+    return await executors.run(DISK, lambda: tuple(cache.index_stamp(tech) for tech in techs))
+
 
 # ═══════════════════════════════════════════════════════════════
 #                         TOOLS
@@ -60,7 +97,8 @@ Usa list_documentations para encontrarlo.
 Ejemplos:
 - tech="python~3.10", query="asyncio" → encuentra módulo asyncio
 - tech="spring_boot", query="actuator" → encuentra docs de actuator
-- tech="javascript", query="Promise" → encuentra Promise API""",
+- tech="javascript", query="Promise" → encuentra Promise API
+- tech="python~3.12", query="how do I cancel a running task", mode="similarity" → búsqueda por similitud""",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -76,6 +114,12 @@ Ejemplos:
                         "type": "integer",
                         "description": "Máximo de resultados (default: 20)",
                         "default": 20
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["text", "similarity"],
+                        "description": "'text' (default): coincidencia por subcadena. 'similarity': búsqueda TF-IDF para preguntas en lenguaje natural",
+                        "default": "text"
                     }
                 },
                 "required": ["tech", "query"]
@@ -89,8 +133,13 @@ Devuelve el contenido en formato Markdown.
 IMPORTANTE: Necesitas el path exacto de la página.
 Usa search_documentation para encontrarlo.
 
+Si el path incluye un ancla (#...), devuelve solo esa sección de la página.
+Las páginas largas se devuelven por fragmentos: al final se indica el
+offset con el que continuar la lectura.
+
 Ejemplos:
 - tech="python~3.10", path="library/asyncio" → documentación de asyncio
+- tech="python~3.10", path="library/asyncio-task#asyncio.gather" → solo la sección de asyncio.gather
 - tech="spring_boot", path="actuator" → documentación de actuator
 - tech="javascript", path="global_objects/promise" → documentación de Promise""",
             inputSchema={
@@ -102,7 +151,17 @@ Ejemplos:
                     },
                     "path": {
                         "type": "string",
-                        "description": "Path de la página (obtenido de search_documentation)"
+                        "description": "Path de la página (obtenido de search_documentation), con o sin #ancla"
+                    },
+                    "chunk": {
+                        "type": "integer",
+                        "description": "Número de fragmento a leer (desde 0)",
+                        "minimum": 0
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "Token de continuación (next offset) de una lectura anterior",
+                        "minimum": 0
                     }
                 },
                 "required": ["tech", "path"]
@@ -176,6 +235,11 @@ Ejemplos:
                         "type": "array",
                         "items": {"type": "string"},
                         "description": "Lista de paths de páginas a obtener"
+                    },
+                    "deadline": {
+                        "type": "number",
+                        "description": "Segundos máximos de espera (default: 20). Lo que no termine se marca como pendiente y sigue descargándose en segundo plano",
+                        "default": DEFAULT_DEADLINE
                     }
                 },
                 "required": ["tech", "paths"]
@@ -191,7 +255,9 @@ JavaScript, Python, React, Node, TypeScript, HTML, CSS, Vue, Angular.
 
 Ejemplos:
 - query="websocket" → busca en todas las populares
-- query="async", techs=["python~3.10", "javascript", "rust"] → busca en específicas""",
+- query="async", techs=["python~3.10", "javascript", "rust"] → busca en específicas
+
+Con mode="similarity" y sin techs, busca en todas las documentaciones cacheadas.""",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -208,6 +274,17 @@ Ejemplos:
                         "type": "integer",
                         "description": "Máximo de resultados por tecnología (default: 5)",
                         "default": 5
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["text", "similarity"],
+                        "description": "'text' (default): coincidencia por subcadena. 'similarity': búsqueda TF-IDF para preguntas en lenguaje natural",
+                        "default": "text"
+                    },
+                    "deadline": {
+                        "type": "number",
+                        "description": "Segundos máximos de espera (default: 20). Lo que no termine se marca como pendiente y sigue descargándose en segundo plano",
+                        "default": DEFAULT_DEADLINE
                     }
                 },
                 "required": ["query"]
@@ -246,10 +323,12 @@ Ejemplos:
             name="get_examples",
             description="""Extrae solo los bloques de código/ejemplos de una página de documentación.
 Útil cuando solo necesitas ver ejemplos de uso, no toda la documentación.
+Cada ejemplo indica la sección en la que aparece; se puede filtrar por lenguaje o sección.
 
 Ejemplos:
 - tech="python~3.10", path="library/asyncio" → ejemplos de asyncio
-- tech="javascript", path="global_objects/promise" → ejemplos de Promise""",
+- tech="python~3.10", path="library/asyncio-task#asyncio.gather" → solo los de gather
+- tech="javascript", path="global_objects/promise", language="js" → ejemplos de Promise""",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -260,6 +339,14 @@ Ejemplos:
                     "path": {
                         "type": "string",
                         "description": "Path de la página"
+                    },
+                    "language": {
+                        "type": "string",
+                        "description": "Solo ejemplos de este lenguaje (ej: python, js)"
+                    },
+                    "section": {
+                        "type": "string",
+                        "description": "Solo ejemplos bajo esta ancla o título"
                     }
                 },
                 "required": ["tech", "path"]
@@ -270,7 +357,8 @@ Ejemplos:
             description="""Exporta toda la documentación de una tecnología a archivos locales.
 Los archivos se guardan como Markdown en el directorio especificado.
 
-ADVERTENCIA: Puede tomar varios minutos para documentaciones grandes.
+Puede tomar varios minutos para documentaciones grandes: si no termina en
+unos segundos sigue como trabajo en segundo plano (consulta con job_status).
 Usa max_pages para limitar la cantidad de páginas a exportar.
 
 Ejemplos:
@@ -290,11 +378,213 @@ Ejemplos:
                     "max_pages": {
                         "type": "integer",
                         "description": "Máximo de páginas a exportar (opcional, None = todas)"
+                    },
+                    "background": {
+                        "type": "boolean",
+                        "description": "Devolver el id del trabajo al momento sin esperar (default: espera hasta 20 s)"
                     }
                 },
                 "required": ["tech", "output_dir"]
             }
         ),
+        Tool(
+            name="complete_symbol",
+            description="""Autocompleta nombres de símbolos a partir de un prefijo.
+Muy rápido: úsalo para resolver el nombre exacto antes de pedir una página.
+
+Ejemplos:
+- tech="python~3.12", prefix="asyncio.ga" → asyncio.gather()
+- tech="javascript", prefix="Array.prototype.fl" → flat(), flatMap()""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "tech": {
+                        "type": "string",
+                        "description": "Slug de la tecnología"
+                    },
+                    "prefix": {
+                        "type": "string",
+                        "description": "Inicio del nombre del símbolo"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Máximo de resultados (default: 10)",
+                        "default": 10
+                    }
+                },
+                "required": ["tech", "prefix"]
+            }
+        ),
+        Tool(
+            name="get_page_outline",
+            description="""Obtiene el índice (árbol de títulos) de una página sin descargar su contenido.
+Cada título incluye su ancla y el tamaño de su sección.
+
+Úsalo antes de get_page_content para pedir solo la sección que interesa (path#ancla).
+
+Ejemplos:
+- tech="python~3.12", path="library/asyncio-task" → Coroutines, Creating Tasks, ...
+- tech="javascript", path="global_objects/array/flat" → Syntax, Examples, ...""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "tech": {
+                        "type": "string",
+                        "description": "Slug de la tecnología"
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "Path de la página"
+                    }
+                },
+                "required": ["tech", "path"]
+            }
+        ),
+        Tool(
+            name="get_related_pages",
+            description="""Lista las páginas más relacionadas con una página según los enlaces entre ellas.
+Útil para saber qué leer a continuación (ej: asyncio → asyncio-task → asyncio-stream).
+
+Ejemplos:
+- tech="python~3.12", path="library/asyncio" → library/asyncio-task, library/asyncio-stream, ...""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "tech": {
+                        "type": "string",
+                        "description": "Slug de la tecnología"
+                    },
+                    "path": {
+                        "type": "string",
+                        "description": "Path de la página"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Máximo de resultados (default: 10)",
+                        "default": 10
+                    }
+                },
+                "required": ["tech", "path"]
+            }
+        ),
+        Tool(
+            name="rerender_cache",
+            description="""Reconvierte las páginas cacheadas con una versión anterior del conversor.
+Usa el HTML original guardado en caché: no hace ninguna petición de red.
+Si no termina en unos segundos sigue como trabajo en segundo plano.
+
+Ejemplos:
+- Sin parámetros: reconvierte todas las tecnologías cacheadas
+- tech="python~3.10": solo Python 3.10""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "tech": {
+                        "type": "string",
+                        "description": "Tecnología a reconvertir (opcional)"
+                    },
+                    "background": {
+                        "type": "boolean",
+                        "description": "Devolver el id del trabajo al momento sin esperar (default: espera hasta 20 s)"
+                    }
+                },
+                "required": []
+            }
+        ),
+        Tool(
+            name="update_documentation",
+            description="""Actualiza una documentación cacheada cuando DevDocs publica una versión nueva.
+Descarga el índice nuevo, compara el hash de cada página cacheada y solo
+reescribe y reconvierte las que cambiaron; las eliminadas se borran.
+Mucho más barato que clear_cache + volver a descargar todo.
+Si no termina en unos segundos sigue como trabajo en segundo plano.
+
+Ejemplo:
+- tech="python~3.12" tras una nueva versión de Python en DevDocs""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "tech": {
+                        "type": "string",
+                        "description": "Slug de la tecnología a actualizar"
+                    },
+                    "background": {
+                        "type": "boolean",
+                        "description": "Devolver el id del trabajo al momento sin esperar (default: espera hasta 20 s)"
+                    }
+                },
+                "required": ["tech"]
+            }
+        ),
+        Tool(
+            name="warm_cache",
+            description="""Precalienta el caché: descarga los índices (y opcionalmente todas las páginas)
+de varias tecnologías para consultarlas después sin esperas ni red.
+Si no termina en unos segundos sigue como trabajo en segundo plano.
+
+Ejemplos:
+- techs=["python~3.12", "javascript"] → solo los índices
+- techs=["python~3.12"], pages=true → también todas las páginas""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "techs": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Slugs de las tecnologías a precalentar"
+                    },
+                    "pages": {
+                        "type": "boolean",
+                        "description": "Descargar también todas las páginas (default: false)"
+                    },
+                    "background": {
+                        "type": "boolean",
+                        "description": "Devolver el id del trabajo al momento sin esperar (default: espera hasta 20 s)"
+                    }
+                },
+                "required": ["techs"]
+            }
+        ),
+        Tool(
+            name="job_status",
+            description="""Consulta los trabajos en segundo plano (exportaciones, precalentado,
+actualizaciones y reconversiones): estado, avance y resultado.
+
+Ejemplos:
+- Sin parámetros: lista los trabajos recientes
+- job_id="job-3" → estado y, si terminó, resultado
+- job_id="job-3", wait=30 → espera hasta 30 s a que termine (con notificaciones de progreso)""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "Id del trabajo (opcional)"
+                    },
+                    "wait": {
+                        "type": "integer",
+                        "description": "Segundos a esperar a que termine (default: 0, máximo 60)"
+                    }
+                },
+                "required": []
+            }
+        ),
+        Tool(
+            name="cancel_job",
+            description="""Cancela un trabajo en segundo plano. Uno en cola no llega a empezar;
+uno en curso se detiene al terminar el lote de páginas que esté procesando
+(lo ya descargado o escrito se conserva).""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "job_id": {
+                        "type": "string",
+                        "description": "Id del trabajo a cancelar"
+                    }
+                },
+                "required": ["job_id"]
+            }
+        ),
         Tool(
             name="offline_mode_status",
             description="""Muestra qué documentaciones están disponibles offline (en caché).
@@ -306,13 +596,173 @@ Indica qué tecnologías tienen el índice cacheado y cuántas páginas.
                 "properties": {},
                 "required": []
             }
+        ),
+        Tool(
+            name="batch",
+            description="""Ejecuta varias herramientas en una sola llamada y devuelve una respuesta combinada.
+Las operaciones independientes se ejecutan en paralelo. Un argumento puede referirse
+a los resultados de una operación anterior (de búsqueda, tipos, completado o relacionadas):
+- "$1" → path del primer resultado de la operación 1
+- "$1[2].name" → campo name del tercer resultado de la operación 1
+- ["$1[*].path"] → dentro de una lista, los paths de todos sus resultados
+
+Ejemplo (buscar, leer el mejor resultado y sus ejemplos en un viaje):
+operations=[
+  {"tool": "search_documentation", "arguments": {"tech": "python~3.12", "query": "gather"}},
+  {"tool": "get_page_content", "arguments": {"tech": "python~3.12", "path": "$1"}},
+  {"tool": "get_examples", "arguments": {"tech": "python~3.12", "path": "$1"}}
+]""",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "operations": {
+                        "type": "array",
+                        "description": f"Operaciones (máximo {MAX_BATCH_OPERATIONS}), numeradas desde 1",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "tool": {"type": "string", "description": "Nombre de la herramienta"},
+                                "arguments": {"type": "object", "description": "Argumentos de la herramienta"}
+                            },
+                            "required": ["tool"]
+                        }
+                    }
+                },
+                "required": ["operations"]
+            }
         )
     ]
 
 
+def _client_slot() -> Optional[asyncio.Semaphore]:
+    """
+    Semáforo de la sesión que hace la petición actual. Con muchos clientes
+    sobre el mismo servidor, uno solo no puede acaparar los hilos y la red.
+    """
+    if client_concurrency is None:
+        return None
+    try:
+        session = server.request_context.session
+    except LookupError:
+        return None
+    slot = _client_slots.get(session)
+    if slot is None:
+        slot = _client_slots[session] = asyncio.Semaphore(client_concurrency)
+    return slot
+
+
 @server.call_tool()
-async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
-    """Ejecuta una herramienta"""
+async def call_tool(name: str, arguments: dict[str, Any]) -> Any:
+    """Ejecuta una herramienta (respetando el límite por cliente y por tool)"""
+    slot = _client_slot()
+    if slot is None:
+        return await _limited_call(name, arguments)
+    async with slot:
+        return await _limited_call(name, arguments)
+
+
+async def _limited_call(name: str, arguments: dict[str, Any]) -> Any:
+    """Espera turno en el límite de la tool; con la cola llena responde ocupado"""
+    try:
+        async with tool_limiter.slot(name):
+            return await _call_tool(name, arguments)
+    except Overloaded as e:
+        return _respond(_busy(e))
+
+
+async def _limited_result(name: str, arguments: dict[str, Any]) -> Any:
+    """Como _limited_call, pero devuelve el resultado del handler sin presentar (para batch)"""
+    try:
+        async with tool_limiter.slot(name):
+            return await _run_tool(name, arguments)
+    except Overloaded as e:
+        return _busy(e)
+
+
+def _busy(error: Overloaded) -> Any:
+    if output_format == "json":
+        return {"error": str(error), "busy": True}
+    return f"⏳ {error}"
+
+
+class ToolResult:
+    """
+    Resultado de una tool como datos, que se presenta al responder.
+
+    render(data) lo convierte en Markdown y compact(data) en el objeto del
+    modo json. rows son los resultados a los que otra operación de un batch
+    puede hacer referencia ("$1.path"): batch los toma de la misma ejecución
+    que muestra, y la caché de búsquedas sirve la misma entrada en los dos
+    formatos.
+    """
+
+    __slots__ = ('data', 'render', 'compact', 'rows')
+
+    def __init__(self, data: dict, render: Callable[[dict], str], compact: Callable[[dict], dict],
+                 rows: list[dict]):
+        self.data = data
+        self.render = render
+        self.compact = compact
+        self.rows = rows
+
+    def present(self) -> Any:
+        """Markdown o, en modo json, el objeto compacto"""
+        if output_format == "json":
+            return self.compact(self.data)
+        return self.render(self.data)
+
+
+def _present(result: Any) -> Any:
+    return result.present() if isinstance(result, ToolResult) else result
+
+
+def _payload(result: Any) -> Any:
+    """En modo json, los mensajes de texto de los handlers se envuelven en un objeto"""
+    if not isinstance(result, str):
+        return result
+    if result.startswith("Error"):
+        return {"error": result.removeprefix("Error: ")}
+    return {"message": result}
+
+
+def _respond(result: Any) -> Any:
+    """
+    Respuesta MCP del resultado de un handler: Markdown o, en modo json,
+    el mismo objeto como JSON compacto y como structuredContent.
+    """
+    result = _present(result)
+    if output_format != "json":
+        return [TextContent(type="text", text=result)]
+    payload = _payload(result)
+    text = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str)
+    return [TextContent(type="text", text=text)], payload
+
+
+def _table(entries: list[dict], *columns: str) -> dict:
+    """
+    Entradas como tabla (columnas + filas), sin repetir las claves en cada
+    una. Las columnas con el mismo valor en todas las filas (ej: el tipo en
+    una búsqueda dentro de un módulo) van una sola vez en "common".
+    """
+    values = {column: [entry.get(column) or None for entry in entries] for column in columns}
+    common = {
+        column: column_values[0] for column, column_values in values.items()
+        if len(entries) > 1 and len(set(column_values)) == 1
+    }
+    varying = [column for column in columns if column not in common]
+    table = {"columns": varying, "rows": [[values[c][i] for c in varying] for i in range(len(entries))]}
+    if common:
+        table["common"] = common
+    return table
+
+
+async def _call_tool(name: str, arguments: dict[str, Any]) -> Any:
+    """Ejecuta una herramienta y devuelve su respuesta MCP"""
+    return _respond(await _run_tool(name, arguments))
+
+
+async def _run_tool(name: str, arguments: dict[str, Any]) -> Any:
+    """Despacha la llamada a su handler"""
     
     try:
         if name == "list_documentations":
@@ -340,30 +790,51 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
             result = await handle_export_documentation(arguments)
         elif name == "offline_mode_status":
             result = await handle_offline_mode_status(arguments)
+        elif name == "complete_symbol":
+            result = await handle_complete_symbol(arguments)
+        elif name == "get_page_outline":
+            result = await handle_get_page_outline(arguments)
+        elif name == "get_related_pages":
+            result = await handle_get_related_pages(arguments)
+        elif name == "rerender_cache":
+            result = await handle_rerender_cache(arguments)
+        elif name == "update_documentation":
+            result = await handle_update_documentation(arguments)
+        elif name == "warm_cache":
+            result = await handle_warm_cache(arguments)
+        elif name == "job_status":
+            result = await handle_job_status(arguments)
+        elif name == "cancel_job":
+            result = await handle_cancel_job(arguments)
+        elif name == "batch":
+            result = await handle_batch(arguments)
         else:
             result = f"Error: Herramienta '{name}' no encontrada"
         
-        return [TextContent(type="text", text=result)]
+        return result
     
     except Exception as e:
-        return [TextContent(type="text", text=f"Error: {str(e)}")]
+        return f"Error: {str(e)}"
 
 
 # ═══════════════════════════════════════════════════════════════
 #                    HANDLERS DE TOOLS
 # ═══════════════════════════════════════════════════════════════
 
-async def handle_list_documentations(args: dict) -> str:
+async def handle_list_documentations(args: dict) -> Any:
     """Lista documentaciones disponibles"""
     filter_text = args.get('filter', '')
     
-    # Ejecutar en thread pool para no bloquear
-    loop = asyncio.get_event_loop()
-    
     if filter_text:
-        docs = await loop.run_in_executor(None, api.search_docs, filter_text)
+        docs = await executors.run(NETWORK, api.search_docs, filter_text)
     else:
-        docs = await loop.run_in_executor(None, api.get_docs_list)
+        docs = await executors.run(NETWORK, api.get_docs_list)
+    
+    if output_format == "json":
+        return {
+            "total": len(docs),
+            "docs": _table(docs[:50], 'slug', 'name', 'version', 'release')
+        }
     
     if not docs:
         return f"No se encontraron documentaciones{f' para: {filter_text}' if filter_text else ''}"
@@ -388,7 +859,7 @@ async def handle_list_documentations(args: dict) -> str:
     return '\n'.join(lines)
 
 
-async def handle_search_documentation(args: dict) -> str:
+async def handle_search_documentation(args: dict) -> Any:
     """Busca en el índice de una documentación"""
     tech = args.get('tech', '')
     query = args.get('query', '')
@@ -397,20 +868,37 @@ async def handle_search_documentation(args: dict) -> str:
     if not tech or not query:
         return "Error: Se requiere 'tech' y 'query'"
     
-    loop = asyncio.get_event_loop()
+    if args.get('mode') == 'similarity':
+        return await _similarity_search(query, [tech], limit)
+    
+    key = ('search_documentation', tech, query, limit)
+    cached = query_cache.get(key, await _index_stamps([tech]))
+    if cached is not None:
+        return cached
     
     try:
-        results = await loop.run_in_executor(
-            None, 
-            lambda: api.search_in_index(tech, query, limit)
-        )
+        results = await executors.run(NETWORK, api.search_in_index, tech, query, limit)
     except Exception as e:
         return f"Error buscando en {tech}: {str(e)}\n\n💡 Verifica que el slug sea correcto usando list_documentations"
     
+    if results:
+        await executors.run(DISK, api.prefetch_search_results, results, tech)
+    
+    result = ToolResult(
+        {"tech": tech, "query": query, "results": results}, _format_search,
+        lambda data: {**data, "results": _table(data['results'], 'name', 'path', 'type')},
+        [{'tech': tech, **entry} for entry in results]
+    )
+    await _remember(key, [tech], result)
+    return result
+
+
+def _format_search(data: dict) -> str:
+    """Formatea el resultado de search_documentation en Markdown"""
+    tech, query, results = data['tech'], data['query'], data['results']
     if not results:
         return f"No se encontraron resultados para '{query}' en {tech}"
     
-    # Formatear resultado
     lines = [f"## Resultados para '{query}' en {tech} ({len(results)} encontrados)\n"]
     
     for entry in results:
@@ -418,11 +906,9 @@ async def handle_search_documentation(args: dict) -> str:
         path = entry.get('path', '')
         entry_type = entry.get('type', '')
         
-        # Limpiar path de anclas para mostrar
-        clean_path = path.split('#')[0]
-        
+        # Con ancla: get_page_content devuelve solo esa sección
         lines.append(f"- **{name}**")
-        lines.append(f"  - Path: `{clean_path}`")
+        lines.append(f"  - Path: `{path}`")
         if entry_type:
             lines.append(f"  - Tipo: {entry_type}")
         lines.append("")
@@ -432,7 +918,48 @@ async def handle_search_documentation(args: dict) -> str:
     return '\n'.join(lines)
 
 
-async def handle_get_page_content(args: dict) -> str:
+async def _remember(key: tuple, techs: list[str], result: ToolResult) -> None:
+    """Guarda un resultado en la caché de búsquedas (su tamaño es el de sus datos)"""
+    size = len(json.dumps(result.data, ensure_ascii=False, default=str).encode('utf-8'))
+    query_cache.put(key, await _index_stamps(techs), result, size)
+
+
+async def _similarity_search(query: str, techs: list[str], limit: int) -> Any:
+    """Búsqueda TF-IDF sobre índices y páginas cacheadas"""
+    try:
+        results = await executors.run(CPU, api.similarity_search, query, techs, limit)
+    except Exception as e:
+        return f"Error en la búsqueda por similitud: {str(e)}"
+    
+    if results:
+        await executors.run(DISK, api.prefetch_search_results, results)
+    
+    return ToolResult({"query": query, "results": results}, _format_similar, _compact_similar, results)
+
+
+def _format_similar(data: dict) -> str:
+    """Formatea el resultado de la búsqueda por similitud en Markdown"""
+    query, results = data['query'], data['results']
+    if not results:
+        return f"No se encontraron resultados similares a '{query}'"
+    
+    lines = [f"## Resultados similares a '{query}' ({len(results)} encontrados)\n"]
+    
+    for result in results:
+        kind = "📄 página" if result['kind'] == 'page' else result['type'] or "entrada"
+        lines.append(f"- **{result['name']}** [{result['tech']} · {kind}] → `{result['path']}` ({result['score']:.2f})")
+    
+    lines.append("\n💡 Usa `get_page_content` con la tecnología y el path deseado para ver el contenido")
+    
+    return '\n'.join(lines)
+
+
+def _compact_similar(data: dict) -> dict:
+    rounded = [{**result, 'score': round(result['score'], 3)} for result in data['results']]
+    return {"query": data['query'], "results": _table(rounded, 'tech', 'name', 'path', 'type', 'kind', 'score')}
+
+
+async def handle_get_page_content(args: dict) -> Any:
     """Obtiene contenido de una página"""
     tech = args.get('tech', '')
     path = args.get('path', '')
@@ -440,37 +967,48 @@ async def handle_get_page_content(args: dict) -> str:
     if not tech or not path:
         return "Error: Se requiere 'tech' y 'path'"
     
-    loop = asyncio.get_event_loop()
+    chunk = args.get('chunk')
+    offset = args.get('offset')
     
     try:
-        content = await loop.run_in_executor(
-            None,
-            lambda: api.get_page(tech, path)
-        )
+        if '#' in path and chunk is None and offset is None:
+            section = await executors.run(NETWORK, api.get_page_section, tech, path)
+            if section is not None:
+                if output_format == "json":
+                    return {"tech": tech, "path": path, "content": section}
+                return truncate_text(section, max_length=50000)
+        
+        # Sin ancla (o ancla desconocida): página por fragmentos
+        result = await executors.run(NETWORK, api.get_page_chunk, tech, path, chunk=chunk, offset=offset)
     except Exception as e:
         return f"Error obteniendo {tech}/{path}: {str(e)}"
     
-    # Truncar si es muy largo
-    return truncate_text(content, max_length=50000)
+    if output_format == "json":
+        return {"tech": tech, "path": path, **result}
+    
+    content = result['content']
+    if result['chunks'] > 1:
+        content = content.rstrip('\n') + f"\n\n---\n📄 Fragmento {result['chunk'] + 1} de {result['chunks']}"
+        if result['next_offset'] is not None:
+            content += f" · Para continuar: `get_page_content` con offset={result['next_offset']}"
+    return content
 
 
-async def handle_get_documentation_index(args: dict) -> str:
+async def handle_get_documentation_index(args: dict) -> Any:
     """Obtiene estadísticas del índice"""
     tech = args.get('tech', '')
     
     if not tech:
         return "Error: Se requiere 'tech'"
     
-    loop = asyncio.get_event_loop()
-    
     try:
-        stats = await loop.run_in_executor(
-            None,
-            lambda: api.get_index_stats(tech)
-        )
+        stats = await executors.run(NETWORK, api.get_index_stats, tech)
     except Exception as e:
         return f"Error obteniendo índice de {tech}: {str(e)}"
     
+    if output_format == "json":
+        return {"tech": tech, **stats}
+    
     lines = [
         f"## Índice de {tech}\n",
         f"- **Total de entradas:** {stats['total_entries']:,}",
@@ -484,9 +1022,20 @@ async def handle_get_documentation_index(args: dict) -> str:
     return '\n'.join(lines)
 
 
-async def handle_get_cache_stats(args: dict) -> str:
+async def handle_get_cache_stats(args: dict) -> Any:
     """Obtiene estadísticas del caché"""
-    stats = cache.get_cache_stats()
+    stats = await executors.run(DISK, cache.get_cache_stats)
+    
+    if output_format == "json":
+        return {
+            **stats,
+            "query_cache": query_cache.get_stats(),
+            "negative_cache": api.missing.get_stats(),
+            "requests": api.scheduler.stats,
+            "executors": executors.get_stats(),
+            "tools": tool_limiter.get_stats(),
+            "prefetch": api.prefetcher.stats if api.prefetcher is not None else None
+        }
     
     lines = [
         "## Estadísticas del Caché\n",
@@ -495,6 +1044,8 @@ async def handle_get_cache_stats(args: dict) -> str:
         f"- **Tamaño total:** {stats['total_size_mb']:.2f} MB",
         "\n### Documentaciones cacheadas:\n"
     ]
+    if stats['bundle']:
+        lines.insert(2, f"- **Paquete offline:** `{stats['bundle']}` (solo lectura)")
     
     for tech, info in stats['technologies'].items():
         lines.append(f"- **{tech}**: {info['files']} archivos ({info['size_mb']:.2f} MB)")
@@ -502,14 +1053,60 @@ async def handle_get_cache_stats(args: dict) -> str:
     if not stats['technologies']:
         lines.append("_No hay documentaciones en caché_")
     
+    query_stats = query_cache.get_stats()
+    lines.append(
+        f"\n### Caché de búsquedas (memoria)\n\n"
+        f"- **Entradas:** {query_stats['entries']} ({query_stats['size_kb']} KB)\n"
+        f"- **Aciertos / fallos:** {query_stats['hits']} / {query_stats['misses']}"
+    )
+    
+    missing = api.missing.get_stats()
+    lines.append(
+        f"\n### Caché negativa (404/410)\n\n"
+        f"- **Entradas vigentes:** {missing['entries']} (TTL {missing['ttl']:.0f} s)\n"
+        f"- **Peticiones evitadas:** {missing['hits']}"
+    )
+    
+    requests = api.scheduler.stats
+    lines.append("\n### Peticiones HTTP por prioridad\n")
+    for name, data in requests.items():
+        average = data['wait_ms'] / data['requests'] if data['requests'] else 0
+        lines.append(f"- **{name}:** {data['requests']} (espera media {average:.0f} ms)")
+    
+    lines.append("\n### Pools de ejecución\n")
+    for kind, data in executors.get_stats().items():
+        lines.append(f"- **{kind}:** {data['in_flight']} en curso / {data['threads']} hilos")
+    busy = {tool: data for tool, data in tool_limiter.get_stats().items()
+            if data['running'] or data['waiting'] or data['rejected']}
+    for tool, data in busy.items():
+        lines.append(
+            f"- `{tool}`: {data['running']}/{data['limit']} en curso, "
+            f"{data['waiting']} en cola, {data['rejected']} rechazadas"
+        )
+    
+    if api.prefetcher is not None:
+        prefetch = api.prefetcher.stats
+        lines.append(
+            f"\n### Precarga en segundo plano\n\n"
+            f"- **Descargadas / fallidas / canceladas:** "
+            f"{prefetch['fetched']} / {prefetch['failed']} / {prefetch['cancelled']}\n"
+            f"- **Presupuesto usado:** {prefetch['requests']}/{api.prefetcher.max_requests} peticiones, "
+            f"{prefetch['bytes'] / 1024 / 1024:.1f}/{api.prefetcher.max_bytes / 1024 / 1024:.0f} MB"
+        )
+    
     return '\n'.join(lines)
 
 
-async def handle_clear_cache(args: dict) -> str:
+async def handle_clear_cache(args: dict) -> Any:
     """Limpia el caché"""
     tech = args.get('tech')
     
-    result = cache.clear_cache(tech)
+    result = await executors.run(DISK, cache.clear_cache, tech)
+    # Lo que antes daba 404 puede volver a pedirse
+    api.missing.clear()
+    
+    if output_format == "json":
+        return result
     
     if result['status'] == 'ok':
         if result['cleared'] == 'all':
@@ -524,7 +1121,7 @@ async def handle_clear_cache(args: dict) -> str:
 #                    NUEVOS HANDLERS
 # ═══════════════════════════════════════════════════════════════
 
-async def handle_get_multiple_pages(args: dict) -> str:
+async def handle_get_multiple_pages(args: dict) -> Any:
     """Obtiene múltiples páginas de documentación"""
     tech = args.get('tech', '')
     paths = args.get('paths', [])
@@ -534,14 +1131,23 @@ async def handle_get_multiple_pages(args: dict) -> str:
     if not paths:
         return "Error: Parámetro 'paths' requerido (lista de paths)"
     
-    loop = asyncio.get_event_loop()
-    results = await loop.run_in_executor(None, api.get_multiple_pages, tech, paths)
+    deadline = args.get('deadline', DEFAULT_DEADLINE)
+    results = await executors.run(NETWORK, api.get_multiple_pages, tech, paths, deadline)
+    
+    if output_format == "json":
+        return {"tech": tech, **results}
     
     lines = [f"## Múltiples páginas de {tech}\n"]
-    lines.append(f"Solicitadas: {len(paths)} | Exitosas: {results['successful']} | Fallidas: {results['failed']}\n")
+    summary = f"Solicitadas: {len(paths)} | Exitosas: {results['successful']} | Fallidas: {results['failed']}"
+    if results['pending']:
+        summary += f" | Pendientes: {results['pending']}"
+    lines.append(summary + "\n")
     
     for path, data in results['pages'].items():
-        if data.get('error'):
+        if data.get('pending'):
+            lines.append(f"\n### ⏳ {path}\n")
+            lines.append("Pendiente: sigue descargándose en segundo plano, vuelve a pedirla en unos segundos")
+        elif data.get('error'):
             lines.append(f"\n### ❌ {path}\n")
             lines.append(f"Error: {data['error']}")
         else:
@@ -552,11 +1158,16 @@ async def handle_get_multiple_pages(args: dict) -> str:
                 lines.append(content[:3000] + "\n\n... (contenido truncado)")
             else:
                 lines.append(content)
+            if len(content) > 3000 or data.get('next_offset') is not None:
+                lines.append(
+                    f"\n💡 Página completa ({data.get('chunks', 1)} fragmento(s)): "
+                    f"`get_page_content` con path=`{path.split('#')[0]}` y chunk=0"
+                )
     
     return '\n'.join(lines)
 
 
-async def handle_search_across_docs(args: dict) -> str:
+async def handle_search_across_docs(args: dict) -> Any:
     """Busca en múltiples documentaciones"""
     query = args.get('query', '')
     techs = args.get('techs')
@@ -565,31 +1176,81 @@ async def handle_search_across_docs(args: dict) -> str:
     if not query:
         return "Error: Parámetro 'query' requerido"
     
-    loop = asyncio.get_event_loop()
-    results = await loop.run_in_executor(None, api.search_across_docs, query, techs, limit_per_tech)
-    
-    lines = [f"## Búsqueda: '{query}'\n"]
-    lines.append(f"Tecnologías buscadas: {results['searched_count']} | Total resultados: {results['total_results']}\n")
-    
-    for tech, data in results['results'].items():
-        if data.get('error'):
-            lines.append(f"\n### ⚠️ {tech}: Error - {data['error']}")
-        elif data.get('entries'):
-            lines.append(f"\n### 📚 {tech} ({len(data['entries'])} resultados)")
-            for entry in data['entries'][:limit_per_tech]:
+    if args.get('mode') == 'similarity':
+        limit = limit_per_tech * len(techs) if techs else limit_per_tech * 4
+        return await _similarity_search(query, techs, limit)
+    
+    searched = techs if techs is not None else POPULAR_TECHS
+    key = ('search_across_docs', tuple(searched), query, limit_per_tech)
+    cached = query_cache.get(key, await _index_stamps(searched))
+    if cached is not None:
+        return cached
+    
+    deadline = args.get('deadline', DEFAULT_DEADLINE)
+    results = await executors.run(NETWORK, api.search_across_docs, query, techs, limit_per_tech, deadline)
+    
+    # Precarga: primero el mejor resultado de cada tecnología, luego el segundo...
+    ranked = _rank_across(results, limit_per_tech)
+    await executors.run(DISK, api.prefetch_search_results, ranked)
+    
+    result = ToolResult({"query": query, "limit_per_tech": limit_per_tech, **results},
+                        _format_across, _compact_across, ranked)
+    # No cachear resultados parciales: un error o un pendiente puede ser transitorio
+    if not any(data.get('error') or data.get('pending') for data in results['results'].values()):
+        await _remember(key, searched, result)
+    return result
+
+
+def _format_across(data: dict) -> str:
+    """Formatea el resultado de search_across_docs en Markdown"""
+    lines = [f"## Búsqueda: '{data['query']}'\n"]
+    summary = f"Tecnologías buscadas: {data['searched_count']} | Total resultados: {data['total_results']}"
+    if data['pending_count']:
+        summary += f" | Pendientes: {data['pending_count']}"
+    lines.append(summary + "\n")
+    
+    for tech, found in data['results'].items():
+        if found.get('pending'):
+            lines.append(f"\n### ⏳ {tech}: Pendiente - el índice sigue descargándose, repite la búsqueda en unos segundos")
+        elif found.get('error'):
+            lines.append(f"\n### ⚠️ {tech}: Error - {found['error']}")
+        elif found.get('entries'):
+            lines.append(f"\n### 📚 {tech} ({len(found['entries'])} resultados)")
+            for entry in found['entries'][:data['limit_per_tech']]:
                 name = entry.get('name', 'Unknown')
                 path = entry.get('path', '')
                 entry_type = entry.get('type', '')
                 type_str = f" [{entry_type}]" if entry_type else ""
                 lines.append(f"- **{name}**{type_str} → `{path}`")
     
-    if results['total_results'] == 0:
+    if data['total_results'] == 0:
         lines.append("\n_No se encontraron resultados_")
     
     return '\n'.join(lines)
 
 
-async def handle_get_type_entries(args: dict) -> str:
+def _compact_across(data: dict) -> dict:
+    payload = {key: value for key, value in data.items() if key != 'limit_per_tech'}
+    payload["results"] = {
+        tech: {**found, "entries": _table(found['entries'], 'name', 'path', 'type')}
+        if 'entries' in found else found
+        for tech, found in data['results'].items()
+    }
+    return payload
+
+
+def _rank_across(results: dict, limit_per_tech: int) -> list[dict]:
+    """Resultados de search_across_docs intercalados: el mejor de cada tecnología, luego el segundo..."""
+    return [
+        {**entry, 'tech': tech}
+        for rank in range(limit_per_tech)
+        for tech, data in results['results'].items()
+        if rank < len(data.get('entries', []))
+        for entry in [data['entries'][rank]]
+    ]
+
+
+async def handle_get_type_entries(args: dict) -> Any:
     """Obtiene entradas por tipo"""
     tech = args.get('tech', '')
     entry_type = args.get('entry_type', '')
@@ -600,14 +1261,34 @@ async def handle_get_type_entries(args: dict) -> str:
     if not entry_type:
         return "Error: Parámetro 'entry_type' requerido"
     
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, api.get_type_entries, tech, entry_type, limit)
-    
-    if result.get('error'):
-        return f"Error: {result['error']}"
-    
-    entries = result.get('entries', [])
-    available_types = result.get('available_types', [])
+    key = ('get_type_entries', tech, entry_type, limit)
+    cached = query_cache.get(key, await _index_stamps([tech]))
+    if cached is not None:
+        return cached
+    
+    found = await executors.run(NETWORK, api.get_type_entries, tech, entry_type, limit)
+    
+    if found.get('error'):
+        return f"Error: {found['error']}"
+    
+    result = ToolResult(
+        {"tech": tech, "entry_type": entry_type, "limit": limit, **found}, _format_type_entries,
+        lambda data: {
+            "tech": tech, "entry_type": entry_type,
+            "entries": _table(data['entries'], 'name', 'path', 'type'),
+            "available_types": sorted(data['available_types'])
+        },
+        [{'tech': tech, **entry} for entry in found['entries']]
+    )
+    await _remember(key, [tech], result)
+    return result
+
+
+def _format_type_entries(data: dict) -> str:
+    """Formatea el resultado de get_type_entries en Markdown"""
+    tech, entry_type, limit = data['tech'], data['entry_type'], data['limit']
+    entries = data.get('entries', [])
+    available_types = data.get('available_types', [])
     
     lines = [f"## {entry_type.title()}s en {tech}\n"]
     lines.append(f"Encontradas: {len(entries)}\n")
@@ -629,7 +1310,7 @@ async def handle_get_type_entries(args: dict) -> str:
     return '\n'.join(lines)
 
 
-async def handle_get_examples(args: dict) -> str:
+async def handle_get_examples(args: dict) -> Any:
     """Extrae ejemplos de código de una página"""
     tech = args.get('tech', '')
     path = args.get('path', '')
@@ -639,12 +1320,19 @@ async def handle_get_examples(args: dict) -> str:
     if not path:
         return "Error: Parámetro 'path' requerido"
     
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, api.get_examples_from_page, tech, path)
+    language = args.get('language')
+    section = args.get('section')
+    
+    result = await executors.run(
+        NETWORK, api.get_examples_from_page, tech, path, language=language, section=section
+    )
     
     if result.get('error'):
         return f"Error: {result['error']}"
     
+    if output_format == "json":
+        return {"tech": tech, "path": path, **result}
+    
     examples = result.get('examples', [])
     
     lines = [f"## Ejemplos de código: {path}\n"]
@@ -658,12 +1346,17 @@ async def handle_get_examples(args: dict) -> str:
         code = example.get('code', '')
         lang_str = f"```{lang}" if lang else "```"
         lines.append(f"### Ejemplo {i}")
+        if example.get('heading') or example.get('anchor'):
+            where = example.get('heading') or example['anchor']
+            if example.get('anchor'):
+                where += f" (`#{example['anchor']}`)"
+            lines.append(f"_Sección: {where}_\n")
         lines.append(f"{lang_str}\n{code}\n```\n")
     
     return '\n'.join(lines)
 
 
-async def handle_export_documentation(args: dict) -> str:
+async def handle_export_documentation(args: dict) -> Any:
     """Exporta documentación a archivos"""
     tech = args.get('tech', '')
     output_dir = args.get('output_dir', '')
@@ -674,33 +1367,42 @@ async def handle_export_documentation(args: dict) -> str:
     if not output_dir:
         return "Error: Parámetro 'output_dir' requerido"
     
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, api.export_documentation, tech, output_dir, max_pages)
-    
-    if result.get('error'):
-        return f"Error: {result['error']}"
+    async def work(job: Job) -> dict:
+        return await executors.run(
+            NETWORK, api.export_documentation, tech, output_dir, max_pages, progress=job.report
+        )
     
-    lines = [
-        f"## Exportación completada: {tech}\n",
-        f"- **Directorio:** `{result['output_dir']}`",
-        f"- **Páginas exportadas:** {result['exported']}",
-        f"- **Errores:** {result['failed']}",
-        f"- **Tamaño total:** {result['total_size_mb']:.2f} MB",
-    ]
+    def render(result: dict) -> str:
+        if result.get('error'):
+            return f"Error: {result['error']}"
+        
+        lines = [
+            f"## Exportación completada: {tech}\n",
+            f"- **Directorio:** `{result['output_dir']}`",
+            f"- **Páginas exportadas:** {result['exported']}",
+            f"- **Errores:** {result['failed']}",
+            f"- **Tamaño total:** {result['total_size_mb']:.2f} MB",
+        ]
+        
+        return '\n'.join(lines)
     
-    return '\n'.join(lines)
+    return await _run_job("export_documentation", f"Exportar {tech} a {output_dir}", work, render, args)
 
 
-async def handle_offline_mode_status(args: dict) -> str:
+async def handle_offline_mode_status(args: dict) -> Any:
     """Muestra estado del modo offline"""
-    loop = asyncio.get_event_loop()
-    status = await loop.run_in_executor(None, api.get_offline_status)
+    status = await executors.run(DISK, api.get_offline_status)
+    
+    if output_format == "json":
+        return status
     
     lines = [
         "## Estado Offline\n",
         f"- **Directorio caché:** `{status['cache_dir']}`",
         f"- **Tecnologías disponibles offline:** {status['available_offline_count']}",
         f"- **Tamaño total:** {status['total_size_mb']:.2f} MB",
+        f"- **Modo offline estricto:** {'✅ activo (sin red)' if status['strict_offline'] else '❌ inactivo'}",
+        f"- **Origen de páginas:** `{status['upstream']['page']}`",
     ]
     
     if status['technologies']:
@@ -714,13 +1416,598 @@ async def handle_offline_mode_status(args: dict) -> str:
     return '\n'.join(lines)
 
 
+async def handle_complete_symbol(args: dict) -> Any:
+    """Autocompleta nombres de símbolos"""
+    tech = args.get('tech', '')
+    prefix = args.get('prefix', '')
+    limit = args.get('limit', 10)
+    
+    if not tech:
+        return "Error: Parámetro 'tech' requerido"
+    if not prefix:
+        return "Error: Parámetro 'prefix' requerido"
+    
+    try:
+        completions = await executors.run(NETWORK, api.complete_symbol, tech, prefix, limit)
+    except Exception as e:
+        return f"Error autocompletando en {tech}: {str(e)}"
+    
+    return ToolResult(
+        {"tech": tech, "prefix": prefix, "completions": completions}, _format_completions,
+        lambda data: {**data, "completions": _table(data['completions'], 'name', 'path', 'type')},
+        [{'tech': tech, **entry} for entry in completions]
+    )
+
+
+def _format_completions(data: dict) -> str:
+    """Formatea el resultado de complete_symbol en Markdown"""
+    tech, prefix, completions = data['tech'], data['prefix'], data['completions']
+    if not completions:
+        return f"Sin coincidencias para '{prefix}' en {tech}"
+    
+    lines = [f"## Completados para '{prefix}' en {tech}\n"]
+    for entry in completions:
+        lines.append(f"- **{entry.get('name', '')}** → `{entry.get('path', '')}`")
+    
+    return '\n'.join(lines)
+
+
+async def handle_get_page_outline(args: dict) -> Any:
+    """Índice de títulos de una página"""
+    tech = args.get('tech', '')
+    path = args.get('path', '')
+    
+    if not tech or not path:
+        return "Error: Se requiere 'tech' y 'path'"
+    
+    clean_path = path.split('#')[0]
+    try:
+        outline = await executors.run(NETWORK, api.get_page_outline, tech, clean_path)
+    except Exception as e:
+        return f"Error obteniendo el índice de {tech}/{clean_path}: {str(e)}"
+    
+    if output_format == "json":
+        return {"tech": tech, "path": clean_path, "outline": outline}
+    
+    if not outline:
+        return f"La página {tech}/{clean_path} no tiene títulos"
+    
+    lines = [f"## Índice de {tech}/{clean_path}\n"]
+    top = min(entry['level'] for entry in outline)
+    for entry in outline:
+        indent = '  ' * (entry['level'] - top)
+        size = f"{entry['size'] / 1024:.1f} KB"
+        if entry['anchor']:
+            target = f"`{clean_path}#{entry['anchor']}`"
+        else:
+            target = f"offset={entry['offset']}"
+        lines.append(f"{indent}- **{entry['title']}** → {target} ({size})")
+    
+    lines.append("\n💡 Usa `get_page_content` con path#ancla para leer solo esa sección")
+    return '\n'.join(lines)
+
+
+async def handle_get_related_pages(args: dict) -> Any:
+    """Páginas relacionadas según el grafo de enlaces"""
+    tech = args.get('tech', '')
+    path = args.get('path', '')
+    limit = args.get('limit', 10)
+    
+    if not tech or not path:
+        return "Error: Se requiere 'tech' y 'path'"
+    
+    try:
+        related = await executors.run(NETWORK, api.get_related_pages, tech, path, limit)
+    except Exception as e:
+        return f"Error obteniendo páginas relacionadas de {tech}/{path}: {str(e)}"
+    
+    return ToolResult(
+        {"tech": tech, "path": path.split('#')[0], "related": related}, _format_related,
+        lambda data: data, [{'tech': tech, **page} for page in related]
+    )
+
+
+def _format_related(data: dict) -> str:
+    """Formatea el resultado de get_related_pages en Markdown"""
+    tech, path, related = data['tech'], data['path'], data['related']
+    if not related:
+        return f"No se encontraron páginas enlazadas con {tech}/{path}"
+    
+    lines = [f"## Páginas relacionadas con {tech}/{path}\n"]
+    for page in related:
+        cached = " 💾" if page['cached'] else ""
+        lines.append(
+            f"- **{page['name']}** → `{page['path']}` "
+            f"(enlaces: {page['outgoing']} salientes, {page['incoming']} entrantes){cached}"
+        )
+    lines.append("\n💾 = ya en caché")
+    return '\n'.join(lines)
+
+
+async def handle_rerender_cache(args: dict) -> Any:
+    """Reconvierte páginas cacheadas con un conversor anterior"""
+    tech = args.get('tech')
+    scope = f"'{tech}'" if tech else "todas las tecnologías"
+    
+    async def work(job: Job) -> dict:
+        return await executors.run(CPU, api.rerender_cache, tech, progress=job.report)
+    
+    def render(stats: dict) -> str:
+        lines = [f"## Reconversión del caché ({scope})\n"]
+        lines.append(f"- ✅ Reconvertidas: {stats['rerendered']}")
+        lines.append(f"- Ya al día: {stats['up_to_date']}")
+        if stats['missing_html']:
+            lines.append(f"- ⚠️ Sin HTML original (se actualizarán al volver a descargarlas): {stats['missing_html']}")
+        return '\n'.join(lines)
+    
+    return await _run_job("rerender_cache", f"Reconvertir {scope}", work, render, args)
+
+
+async def handle_update_documentation(args: dict) -> Any:
+    """Actualiza incrementalmente una documentación cacheada"""
+    tech = args.get('tech', '')
+    
+    if not tech:
+        return "Error: Parámetro 'tech' requerido"
+    
+    async def work(job: Job) -> dict:
+        return await executors.run(NETWORK, api.update_documentation, tech, progress=job.report)
+    
+    def render(stats: dict) -> str:
+        source = "db.json" if stats['source'] == "db.json" else "página a página"
+        lines = [f"## Actualización de {tech} ({source})\n"]
+        lines.append(f"- 🆕 Nuevas en el índice: {stats['added']}")
+        lines.append(f"- ✏️ Cambiadas (reconvertidas): {stats['changed']}")
+        lines.append(f"- ✅ Sin cambios: {stats['unchanged']}")
+        lines.append(f"- 🗑️ Eliminadas: {stats['removed']}")
+        if stats['kept_in_bundle']:
+            lines.append(f"- 📦 Ya no existen pero siguen en el paquete offline: {stats['kept_in_bundle']}")
+        if stats['failed']:
+            lines.append(f"- ⚠️ Fallidas (se conservan): {stats['failed']}")
+        return '\n'.join(lines)
+    
+    return await _run_job("update_documentation", f"Actualizar {tech}", work, render, args)
+
+
+async def handle_warm_cache(args: dict) -> Any:
+    """Precalienta índices (y páginas) de varias tecnologías"""
+    techs = args.get('techs') or []
+    pages = bool(args.get('pages', False))
+    
+    if not techs:
+        return "Error: Parámetro 'techs' requerido (lista de slugs)"
+    
+    async def work(job: Job) -> dict:
+        return await executors.run(NETWORK, api.warm_cache, techs, pages=pages, progress=job.report)
+    
+    def render(result: dict) -> str:
+        mb = result['bytes'] / 1024 / 1024
+        lines = [f"## Caché precalentado ({result['elapsed']:.1f} s · {mb:.1f} MB)\n"]
+        for tech, info in result['techs'].items():
+            if 'error' in info:
+                lines.append(f"- ❌ **{tech}**: {info['error']}")
+            elif pages:
+                lines.append(
+                    f"- ✅ **{tech}**: {info['entries']} entradas, {info['fetched']} páginas nuevas "
+                    f"de {info['pages']}, {info['failed']} fallidas"
+                )
+            else:
+                lines.append(f"- ✅ **{tech}**: {info['entries']} entradas")
+        return '\n'.join(lines)
+    
+    return await _run_job("warm_cache", f"Precalentar {', '.join(techs)}", work, render, args)
+
+
+async def handle_job_status(args: dict) -> Any:
+    """Estado (y resultado) de los trabajos en segundo plano"""
+    job_id = args.get('job_id')
+    
+    if not job_id:
+        listed = jobs.list()
+        if output_format == "json":
+            return {"jobs": [{**job.snapshot(), "result": None} for job in listed]}
+        if not listed:
+            return "No hay trabajos en segundo plano"
+        lines = [f"## Trabajos en segundo plano ({len(listed)})\n"]
+        for job in listed:
+            lines.append(f"- `{job.id}` {_job_line(job)}")
+        lines.append("\n💡 Usa `job_status` con job_id para ver el resultado de uno")
+        return '\n'.join(lines)
+    
+    job = jobs.get(job_id)
+    if job is None:
+        return f"Error: No existe el trabajo '{job_id}' (puede haber caducado)"
+    
+    wait = min(max(args.get('wait', 0), 0), 60)
+    finished = await _wait_job(job, wait)
+    if output_format == "json":
+        return job.snapshot()
+    if finished:
+        return _job_result(job)
+    return f"## Trabajo `{job.id}`\n\n{_job_line(job)}"
+
+
+async def handle_cancel_job(args: dict) -> Any:
+    """Cancela un trabajo en segundo plano"""
+    job_id = args.get('job_id', '')
+    
+    job = jobs.cancel(job_id)
+    if job is None:
+        return f"Error: No existe el trabajo '{job_id}' (puede haber caducado)"
+    if output_format == "json":
+        return {**job.snapshot(), "cancel_requested": job.cancelled}
+    if job.status in (DONE, FAILED, CANCELLED):
+        return f"⚠️ El trabajo `{job.id}` ya había terminado ({job.status})"
+    return f"🛑 Cancelación solicitada para `{job.id}`: se detendrá al terminar el lote en curso"
+
+
+# ═══════════════════════════════════════════════════════════════
+#                    LOTES (batch)
+# ═══════════════════════════════════════════════════════════════
+
+# "$N", "$N.campo", "$N[k]", "$N[k].campo" o "$N[*].campo" (solo dentro de listas)
+_REFERENCE = re.compile(r"^\$(\d+)(?:\[(\d+|\*)\])?(?:\.(\w+))?$")
+
+# Tools cuyos resultados (ToolResult.rows) pueden usarse como referencia
+_REFERENCEABLE = {
+    'search_documentation', 'search_across_docs', 'get_type_entries', 'complete_symbol', 'get_related_pages'
+}
+
+
+def _references(value: Any) -> set[int]:
+    """Operaciones a las que hacen referencia unos argumentos"""
+    if isinstance(value, dict):
+        return set().union(*(_references(v) for v in value.values()))
+    if isinstance(value, list):
+        return set().union(*(_references(v) for v in value))
+    if isinstance(value, str):
+        match = _REFERENCE.match(value)
+        if match:
+            return {int(match.group(1))}
+    return set()
+
+
+def _pick(entry: dict, field: Optional[str]) -> Any:
+    field = field or 'path'
+    if field not in entry:
+        raise ValueError(f"el resultado no tiene el campo '{field}'")
+    return entry[field]
+
+
+def _resolve(value: Any, data: dict[int, list[dict]]) -> Any:
+    """Sustituye las referencias por los resultados de las operaciones anteriores"""
+    if isinstance(value, dict):
+        return {key: _resolve(v, data) for key, v in value.items()}
+    if isinstance(value, list):
+        resolved = []
+        for item in value:
+            match = _REFERENCE.match(item) if isinstance(item, str) else None
+            if match and match.group(2) == '*':
+                resolved.extend(_pick(entry, match.group(3)) for entry in data[int(match.group(1))])
+            else:
+                resolved.append(_resolve(item, data))
+        return resolved
+    if isinstance(value, str):
+        match = _REFERENCE.match(value)
+        if match:
+            number = int(match.group(1))
+            if match.group(2) == '*':
+                raise ValueError(f"'{value}': [*] solo puede usarse dentro de una lista")
+            results = data[number]
+            rank = int(match.group(2) or 0)
+            if rank >= len(results):
+                raise ValueError(f"'{value}': la operación {number} tiene {len(results)} resultados")
+            return _pick(results[rank], match.group(3))
+    return value
+
+
+async def handle_batch(args: dict) -> Any:
+    """Ejecuta varias herramientas en una sola llamada"""
+    operations = args.get('operations') or []
+    
+    if not isinstance(operations, list) or not operations:
+        return "Error: Parámetro 'operations' requerido (lista de {tool, arguments})"
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return f"Error: Máximo {MAX_BATCH_OPERATIONS} operaciones por lote (recibidas {len(operations)})"
+    
+    refs = []
+    for number, op in enumerate(operations, 1):
+        if not isinstance(op, dict) or not op.get('tool'):
+            return f"Error: La operación {number} necesita 'tool'"
+        if op['tool'] == 'batch':
+            return f"Error: La operación {number} es otro batch (no se pueden anidar)"
+        deps = _references(op.get('arguments') or {})
+        if any(dep < 1 or dep >= number for dep in deps):
+            return f"Error: La operación {number} solo puede referirse a operaciones anteriores"
+        for dep in sorted(deps):
+            if operations[dep - 1]['tool'] not in _REFERENCEABLE:
+                return (f"Error: La operación {number} se refiere a la {dep} "
+                        f"('{operations[dep - 1]['tool']}'), que no devuelve resultados a los que hacer referencia")
+        refs.append(deps)
+    referenced = set().union(*refs)
+    
+    # Resultados (como datos) de las operaciones referenciadas, por número
+    data: dict[int, list[dict]] = {}
+    tasks: list[asyncio.Task] = []
+    
+    async def run(number: int, op: dict) -> tuple[dict, str]:
+        arguments = op.get('arguments') or {}
+        deps = refs[number - 1]
+        if deps:
+            await asyncio.gather(*(tasks[dep - 1] for dep in deps))
+            failed = sorted(dep for dep in deps if dep not in data)
+            if failed:
+                return arguments, f"Error: Falló la operación {failed[0]}, de la que depende"
+            try:
+                arguments = _resolve(arguments, data)
+            except ValueError as e:
+                return arguments, f"Error: {e}"
+        
+        # Una sola ejecución: lo que se muestra y las filas a las que se hace referencia
+        result = await _limited_result(op['tool'], arguments)
+        if number in referenced and isinstance(result, ToolResult):
+            data[number] = result.rows
+        return arguments, _present(result)
+    
+    started = time.monotonic()
+    # Las independientes corren a la vez; las que tienen referencias esperan a las suyas
+    for number, op in enumerate(operations, 1):
+        tasks.append(asyncio.ensure_future(run(number, op)))
+    results = await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+    
+    if output_format == "json":
+        return {"elapsed": round(elapsed, 3), "operations": [
+            {"tool": op['tool'], **({"arguments": arguments} if refs[number - 1] else {}),
+             "result": _payload(result)}
+            for number, (op, (arguments, result)) in enumerate(zip(operations, results), 1)
+        ]}
+    
+    lines = [f"## Lote: {len(operations)} operaciones ({elapsed:.1f} s)"]
+    for number, (op, (arguments, text)) in enumerate(zip(operations, results), 1):
+        lines.append(f"\n---\n\n### {number} · `{op['tool']}`\n")
+        if refs[number - 1]:
+            lines.append(f"_Argumentos: `{json.dumps(arguments, ensure_ascii=False)}`_\n")
+        lines.append(text)
+    return '\n'.join(lines)
+
+
+# ═══════════════════════════════════════════════════════════════
+#                    TRABAJOS EN SEGUNDO PLANO
+# ═══════════════════════════════════════════════════════════════
+
+def _progress_listener() -> Optional[Callable[[int, Optional[int], str], None]]:
+    """
+    Callback que reenvía el progreso de un trabajo como notificaciones MCP
+    a la petición actual, si el cliente envió un progressToken.
+    """
+    try:
+        ctx = server.request_context
+    except LookupError:
+        return None
+    token = ctx.meta.progressToken if ctx.meta is not None else None
+    if token is None:
+        return None
+    loop = asyncio.get_running_loop()
+    
+    def send(progress: int, total: Optional[int], message: str) -> None:
+        # Se llama desde los hilos de trabajo
+        asyncio.run_coroutine_threadsafe(
+            ctx.session.send_progress_notification(
+                token, progress, total, message, related_request_id=str(ctx.request_id)
+            ),
+            loop
+        )
+    return send
+
+
+async def _wait_job(job: Job, timeout: float) -> bool:
+    """Espera a que termine un trabajo, con notificaciones de progreso mientras tanto"""
+    listener = _progress_listener()
+    if listener is not None:
+        job.add_listener(listener)
+    try:
+        return await jobs.wait(job, timeout)
+    finally:
+        if listener is not None:
+            job.remove_listener(listener)
+
+
+async def _run_job(tool: str, description: str, work: Callable[[Job], Awaitable[dict]],
+                   render: Callable[[dict], str], args: dict) -> Any:
+    """
+    Lanza una operación larga como trabajo. Si termina antes de
+    DEFAULT_DEADLINE se responde como siempre; si no (o con background=true)
+    se devuelve el id para seguirlo con job_status.
+    """
+    job = jobs.start(tool, description, work, render)
+    timeout = 0 if args.get('background') else DEFAULT_DEADLINE
+    finished = await _wait_job(job, timeout)
+    if output_format == "json":
+        return job.snapshot()
+    if finished:
+        return _job_result(job)
+    return (
+        f"⏳ {description}: sigue en segundo plano como trabajo `{job.id}` ({_job_line(job)})\n\n"
+        f"💡 Usa `job_status` con job_id=`{job.id}` para ver el avance y el resultado, "
+        f"o `cancel_job` para detenerlo"
+    )
+
+
+def _job_line(job: Job) -> str:
+    """Resumen de una línea del estado de un trabajo"""
+    info = job.snapshot()
+    line = f"**{info['status']}** · {job.description} · {info['elapsed']:.0f} s"
+    if job.total:
+        line += f" · {job.message} ({job.progress / job.total:.0%})"
+    return line
+
+
+def _job_result(job: Job) -> str:
+    """Respuesta de un trabajo terminado"""
+    if job.status == DONE:
+        return job.rendered()
+    if job.status == FAILED:
+        return f"Error en el trabajo `{job.id}` ({job.description}): {job.error}"
+    return f"🛑 Trabajo `{job.id}` cancelado ({job.description}). Lo ya procesado se conserva"
+
+
 # ═══════════════════════════════════════════════════════════════
 #                         MAIN
 # ═══════════════════════════════════════════════════════════════
 
-def main():
+def _build_parser() -> argparse.ArgumentParser:
+    """Subcomandos de la línea de comandos (sin subcomando: servidor MCP)"""
+    parser = argparse.ArgumentParser(prog="devdocs-mcp", description="Servidor MCP de DevDocs")
+    commands = parser.add_subparsers(dest="command")
+    serve_cmd = commands.add_parser("serve", help="Servidor MCP (por defecto: stdio)")
+    serve_cmd.add_argument("--transport", choices=["stdio", "http"], default="stdio",
+                           help="stdio (un proceso por cliente) o http (un servidor compartido)")
+    serve_cmd.add_argument("--host", default=os.environ.get("DEVDOCS_HTTP_HOST", "127.0.0.1"))
+    serve_cmd.add_argument("--port", type=int, default=int(os.environ.get("DEVDOCS_HTTP_PORT", 8000)))
+    serve_cmd.add_argument("--token", default=os.environ.get("DEVDOCS_HTTP_TOKEN") or None,
+                           help="Token que los clientes http envían como 'Authorization: Bearer ...'")
+    serve_cmd.add_argument("--client-concurrency", type=int,
+                           default=int(os.environ.get("DEVDOCS_CLIENT_CONCURRENCY", 4)),
+                           help="Llamadas simultáneas por cliente en modo http")
+    serve_cmd.add_argument("--output-format", choices=["markdown", "json"], default=output_format,
+                           help="markdown (para leer) o json (compacto, con structuredContent)")
+    
+    pack_cmd = commands.add_parser("pack", help="Empaqueta el caché en un único archivo")
+    pack_cmd.add_argument("output", type=Path, help="Archivo de paquete a crear")
+    pack_cmd.add_argument("techs", nargs="*", help="Tecnologías a incluir (default: todas)")
+    pack_cmd.add_argument("--no-html", action="store_true",
+                          help="No incluir el HTML original (paquete más pequeño)")
+    pack_cmd.add_argument("--cache-dir", type=Path, default=cache.cache_dir)
+    
+    warm_cmd = commands.add_parser("warm", help="Precalienta el caché (catálogo, índices y páginas)")
+    warm_cmd.add_argument("techs", nargs="+", help="Tecnologías a precalentar (ej: python~3.12 react)")
+    warm_cmd.add_argument("--pages", action="store_true",
+                          help="Descargar también todas las páginas de cada tecnología")
+    
+    unpack_cmd = commands.add_parser("unpack", help="Extrae un paquete en el caché")
+    unpack_cmd.add_argument("bundle", type=Path, help="Paquete creado con pack")
+    unpack_cmd.add_argument("techs", nargs="*", help="Tecnologías a extraer (default: todas)")
+    unpack_cmd.add_argument("--overwrite", action="store_true",
+                            help="Sobrescribir archivos existentes")
+    unpack_cmd.add_argument("--cache-dir", type=Path, default=cache.cache_dir)
+    return parser
+
+
+def _warm(techs: list[str], pages: bool) -> None:
+    """Subcomando warm: precalienta el caché mostrando progreso y rendimiento"""
+    started = time.monotonic()
+    
+    def progress(tech: str, done: int, total: int) -> None:
+        elapsed = max(time.monotonic() - started, 1e-6)
+        print(f"  {tech}: {done}/{total} páginas ({done / total:.0%}) · {elapsed:.0f} s", flush=True)
+    
+    print(f"🔥 Precalentando {len(techs)} tecnologías{' con páginas' if pages else ''}...", flush=True)
+    result = api.warm_cache(techs, pages=pages, progress=progress)
+    
+    failed = 0
+    for tech, info in result['techs'].items():
+        if 'error' in info:
+            failed += 1
+            print(f"❌ {tech}: {info['error']}")
+        elif pages:
+            print(f"✅ {tech}: {info['entries']} entradas, {info['fetched']} páginas nuevas "
+                  f"de {info['pages']}, {info['failed']} fallidas")
+        else:
+            print(f"✅ {tech}: {info['entries']} entradas")
+    
+    elapsed = max(result['elapsed'], 1e-6)
+    mb = result['bytes'] / 1024 / 1024
+    print(f"⏱  {elapsed:.1f} s · {mb:.1f} MB · {mb / elapsed:.2f} MB/s")
+    if failed:
+        raise SystemExit(1)
+
+
+def _is_loopback(host: str) -> bool:
+    """Indica si una interfaz de escucha solo es accesible desde la propia máquina"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # Nombre de host o "" (todas las interfaces)
+
+
+def _authorized(scope: dict, token: Optional[str]) -> bool:
+    """Comprueba la cabecera 'Authorization: Bearer <token>' de una petición ASGI"""
+    if token is None:
+        return True
+    header = dict(scope.get("headers") or ()).get(b"authorization", b"")
+    return hmac.compare_digest(header, f"Bearer {token}".encode())
+
+
+def _run_http(host: str, port: int, token: Optional[str] = None) -> None:
+    """
+    Servidor MCP compartido sobre Streamable HTTP (endpoint /mcp).
+    
+    Todas las sesiones comparten el mismo proceso: índices parseados,
+    cachés de búsqueda, cliente HTTP y planificador se calientan una vez.
+    Con token, las peticiones sin 'Authorization: Bearer <token>' reciben 401.
+    """
+    import contextlib
+    
+    import uvicorn
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+    
+    manager = StreamableHTTPSessionManager(app=server)
+    
+    class MCPEndpoint:
+        """Endpoint ASGI que entrega cada petición al gestor de sesiones"""
+        async def __call__(self, scope, receive, send):
+            if not _authorized(scope, token):
+                response = PlainTextResponse("Unauthorized", status_code=401,
+                                             headers={"WWW-Authenticate": "Bearer"})
+                await response(scope, receive, send)
+                return
+            await manager.handle_request(scope, receive, send)
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with manager.run():
+            yield
+    
+    app = Starlette(routes=[Route("/mcp", endpoint=MCPEndpoint())], lifespan=lifespan)
+    uvicorn.run(app, host=host, port=port)
+
+
+def main(argv: list[str] = None):
     """Punto de entrada principal"""
-    import sys
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.command == "pack":
+        result = pack(args.cache_dir, args.output, args.techs or None, include_html=not args.no_html)
+        print(f"📦 {result['output']}: {result['files']} archivos, "
+              f"{len(result['techs'])} tecnologías, {result['size_mb']:.2f} MB")
+        return
+    if args.command == "warm":
+        _warm(args.techs, args.pages)
+        return
+    if args.command == "unpack":
+        result = unpack(args.bundle, args.cache_dir, args.techs or None, overwrite=args.overwrite)
+        print(f"📂 {args.cache_dir}: {result['extracted']} archivos extraídos, "
+              f"{result['skipped']} ya existían")
+        return
+    if args.command == "serve":
+        global output_format
+        output_format = args.output_format
+    if args.command == "serve" and args.transport == "http":
+        global client_concurrency
+        client_concurrency = max(1, args.client_concurrency)
+        # Sin token, cualquiera que alcance el puerto podría exportar a cualquier
+        # ruta del servidor o borrar el caché: fuera de loopback hace falta uno
+        if args.token is None and not _is_loopback(args.host):
+            parser.error(f"--host {args.host!r} no es loopback: configura --token o DEVDOCS_HTTP_TOKEN")
+        _run_http(args.host, args.port, args.token)
+        return
     
     async def run():
         async with stdio_server() as (read_stream, write_stream):
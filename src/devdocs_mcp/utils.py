@@ -2,104 +2,1119 @@
 Utilidades para DevDocs MCP
 Conversión HTML a Markdown y otras funciones auxiliares
 """
+import multiprocessing
+import os
 import re
+from concurrent.futures import Future, ProcessPoolExecutor
+from html import unescape
+from itertools import accumulate
+from typing import Optional
+
+
+# Atributos de una etiqueta: las comillas solo cuentan tras "=", así un ">"
+# dentro de un valor (title="a>b") no cierra la etiqueta. Fuera de las
+# comillas un "<" corta el intento: una etiqueta sin cerrar ("<a <a <a...")
+# falla al llegar a la siguiente en vez de recorrer el resto de la página
+# en cada una (tiempo cuadrático)
+_ATTRS = r'''[^<>"'=]*(?:(?:=\s*"[^"]*"|=\s*'[^']*'|=(?!\s*["'])|["'])[^<>"'=]*)*'''
+
+def _any_case(name: str) -> str:
+    """Patrón de un nombre de etiqueta en cualquier combinación de mayúsculas"""
+    return ''.join(f'[{c}{c.upper()}]' for c in name)
+
+
+# Celda sencilla: texto con código, énfasis y enlaces sin anidar (salvo código
+# dentro de un enlace), saltos (<p>, <br>) y etiquetas que solo aportan su
+# texto (<span>...). Sin espacio en los bordes ni entidades dentro de las
+# marcas: así, sustituirlas y colapsar los espacios da lo mismo que recorrer
+# la celda etiqueta a etiqueta (ver _simple_cell)
+_NAME_END = r'(?![a-zA-Z0-9-])'
+_CELL_NOOP = rf'/?(?:span|abbr|sub|sup|small|var|wbr){_NAME_END}{_ATTRS}>'
+_CELL_TEXT = rf'(?:<{_CELL_NOOP})*[^<\s&](?:[^<&]*(?:<{_CELL_NOOP}[^<&]*)*[^<\s&])?(?:<{_CELL_NOOP})*'
+_CELL_EMPHASIS = ('strong', 'b', 'em', 'i')
+# Todas las etiquetas que puede tener
+_CELL_TAGS = frozenset((
+    'td', 'th', 'code', 'kbd', 'samp', 'tt', 'a', 'p', 'br', *_CELL_EMPHASIS,
+    'span', 'abbr', 'sub', 'sup', 'small', 'var', 'wbr'
+))
+
+
+def _cell_markup(group: str) -> str:
+    """
+    Marcas de una celda sencilla, tras el "<". Con group='(' captura (código 1,
+    énfasis 2-5, enlace 6-8, salto 9); con '(?:' es la del tokenizador.
+    """
+    code = rf'(?:code|kbd|samp|tt){_NAME_END}{_ATTRS}>{group}{_CELL_TEXT})</(?:code|kbd|samp|tt)\s*>'
+    return (
+        code
+        + ''.join(rf'|{name}{_NAME_END}{_ATTRS}>{group}{_CELL_TEXT})</{name}\s*>' for name in _CELL_EMPHASIS)
+        + rf'|a{_NAME_END}{group}{_ATTRS})>(?:{group}{_CELL_TEXT})|<{code})</a\s*>'
+        + rf'|{group}(?:p|br){_NAME_END}{_ATTRS}>|/p\s*>)|{_CELL_NOOP}'
+    )
+
+
+# Tokenizador: una sola expresión que separa en C comentarios, declaraciones,
+# bloques <pre> y de contenido descartado (hasta su cierre), celdas de tabla
+# sencillas (hasta su cierre) y etiquetas.
+# Con split() deja [texto, pre_atributos, pre_contenido, d/h (de <td>/<th>),
+# celda_atributos, celda_contenido, "/", tag, atributos, texto...]
+# Sin re.IGNORECASE y con los nombres escritos como clases ([pP][rR][eE]):
+# cada alternativa empieza por un literal o una clase y el motor la descarta
+# mirando un solo carácter, en vez de probarlas todas en cada etiqueta
+_TOKEN_RE = re.compile(
+    r'<(?:!--(?:>|->|.*?(?:-->|\Z))'
+    r'|[!?][^<>]*>'
+    rf'|{_any_case("pre")}{_NAME_END}({_ATTRS})>'
+    rf'([^<]*(?:<(?!/{_any_case("pre")}\s*>)[^<]*)*)(?:</{_any_case("pre")}\s*>)?'
+    + ''.join(
+        rf'|{_any_case(name)}{_NAME_END}{_ATTRS}>'
+        rf'[^<]*(?:<(?!/{_any_case(name)}\s*>)[^<]*)*(?:</{_any_case(name)}\s*>)?'
+        for name in ('script', 'style', 'template', 'noscript', 'title')
+    ) +
+    rf'|[tT]([dDhH]){_NAME_END}({_ATTRS})>([^<]*(?:<(?:{_cell_markup("(?:")})[^<]*)*)</[tT][dDhH]\s*>'
+    rf'|(/?)([a-zA-Z][a-zA-Z0-9-]*)({_ATTRS})>)',
+    re.DOTALL
+)
+_ATTR_RE = re.compile(r'([^\s=/>]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+)))?')
+_CELL_BREAK_RE = re.compile(r'\s*\n\s*')
+
+_CELL_MARKUP_RE = re.compile(f"<(?:{_cell_markup('(')})")
+_CELL_NOOP_RE = re.compile(f'<{_CELL_NOOP}')
+# Quitar esas etiquetas no puede unir dos trozos de una entidad ("&amp<sup>;")
+_CELL_ENTITY_CUT_RE = re.compile(rf'&[^\s<&;]*</?(?:span|abbr|sub|sup|small|var|wbr){_NAME_END}')
+
+# Contenido de <pre>: se procesa de una vez (ver _TOKEN_RE)
+_CODE_CLASS_RE = re.compile(r'''<code[^<>]*\sclass\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.IGNORECASE)
+_BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_STRIP_TAGS_RE = re.compile(r'<!--.*?-->|<[^<>]*>', re.DOTALL)
+
+# Enlaces dentro de un título: "[Syntax](#syntax)" → "Syntax"
+_LINK_TEXT_RE = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+
+
+# Etiquetas que separan bloques (párrafos)
+_BLOCK_TAGS = frozenset((
+    'p', 'div', 'section', 'article', 'header', 'footer', 'main', 'nav', 'aside',
+    'figure', 'figcaption', 'dl', 'dt', 'dd', 'details', 'summary', 'address',
+    'form', 'fieldset', 'center'
+))
+_HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_EMPHASIS = {'strong': '**', 'b': '**', 'em': '*', 'i': '*'}
+_CODE_TAGS = frozenset(('code', 'kbd', 'samp', 'tt'))
+
+# Atributos de una etiqueta que no tiene ninguno
+_NO_ATTRS: dict = {}
+
+# Versión de la salida del conversor (Markdown y sidecars). Subirla cuando
+# cambie el resultado para que las páginas cacheadas se reconviertan
+CONVERTER_VERSION = 3
+
+# Tamaño objetivo (caracteres) de los fragmentos en que se lee una página
+CHUNK_SIZE = 20000
+
+# Etiquetas sin cierre: un id en ellas marca un punto, no un elemento
+_VOID_TAGS = frozenset((
+    'area', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'source', 'track', 'wbr'
+))
 
 
 def html_to_markdown(html_content: str) -> str:
     """
-    Convierte HTML a Markdown de forma simple pero efectiva.
+    Convierte HTML a Markdown en una sola pasada.
     Optimizado para el formato de documentación de DevDocs.
     """
     if not html_content:
         return ""
+    return MarkdownConverter().markdown(html_content)
+
+
+def convert_page(html_content: str) -> dict:
+    """
+    Convierte una página HTML y devuelve el Markdown junto con los datos
+    estructurales que se guardan con ella en caché:
     
-    # Remover scripts y estilos
-    html_content = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<style[^>]*>.*?</style>', '', html_content, flags=re.DOTALL)
-    
-    # Convertir headings
-    html_content = re.sub(r'<h1[^>]*>(.*?)</h1>', r'\n# \1\n', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<h2[^>]*>(.*?)</h2>', r'\n## \1\n', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<h3[^>]*>(.*?)</h3>', r'\n### \1\n', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<h4[^>]*>(.*?)</h4>', r'\n#### \1\n', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<h5[^>]*>(.*?)</h5>', r'\n##### \1\n', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<h6[^>]*>(.*?)</h6>', r'\n###### \1\n', html_content, flags=re.DOTALL)
-    
-    # Convertir bloques de código (pre antes que code para evitar conflictos)
-    html_content = re.sub(
-        r'<pre[^>]*><code[^>]*class="([^"]*)"[^>]*>(.*?)</code></pre>',
-        lambda m: f'\n```{extract_language(m.group(1))}\n{m.group(2)}\n```\n',
-        html_content,
-        flags=re.DOTALL
-    )
-    html_content = re.sub(r'<pre[^>]*>(.*?)</pre>', r'\n```\n\1\n```\n', html_content, flags=re.DOTALL)
-    
-    # Convertir código inline
-    html_content = re.sub(r'<code[^>]*>(.*?)</code>', r'`\1`', html_content, flags=re.DOTALL)
-    
-    # Convertir listas
-    html_content = re.sub(r'<ul[^>]*>', '\n', html_content)
-    html_content = re.sub(r'</ul>', '\n', html_content)
-    html_content = re.sub(r'<ol[^>]*>', '\n', html_content)
-    html_content = re.sub(r'</ol>', '\n', html_content)
-    html_content = re.sub(r'<li[^>]*>(.*?)</li>', r'- \1\n', html_content, flags=re.DOTALL)
-    
-    # Convertir párrafos
-    html_content = re.sub(r'<p[^>]*>(.*?)</p>', r'\1\n\n', html_content, flags=re.DOTALL)
-    
-    # Convertir enlaces
-    html_content = re.sub(r'<a[^>]*href="([^"]*)"[^>]*>(.*?)</a>', r'[\2](\1)', html_content, flags=re.DOTALL)
-    
-    # Convertir negrita y cursiva
-    html_content = re.sub(r'<strong[^>]*>(.*?)</strong>', r'**\1**', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<b[^>]*>(.*?)</b>', r'**\1**', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<em[^>]*>(.*?)</em>', r'*\1*', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<i[^>]*>(.*?)</i>', r'*\1*', html_content, flags=re.DOTALL)
-    
-    # Convertir blockquotes
-    html_content = re.sub(r'<blockquote[^>]*>(.*?)</blockquote>', r'> \1\n', html_content, flags=re.DOTALL)
-    
-    # Convertir líneas horizontales
-    html_content = re.sub(r'<hr[^>]*/?>', '\n---\n', html_content)
-    
-    # Convertir saltos de línea
-    html_content = re.sub(r'<br[^>]*/?>', '\n', html_content)
-    
-    # Convertir tablas (básico)
-    html_content = re.sub(r'<table[^>]*>', '\n', html_content)
-    html_content = re.sub(r'</table>', '\n', html_content)
-    html_content = re.sub(r'<tr[^>]*>', '', html_content)
-    html_content = re.sub(r'</tr>', ' |\n', html_content)
-    html_content = re.sub(r'<th[^>]*>(.*?)</th>', r'| **\1** ', html_content, flags=re.DOTALL)
-    html_content = re.sub(r'<td[^>]*>(.*?)</td>', r'| \1 ', html_content, flags=re.DOTALL)
-    
-    # Remover divs y spans
-    html_content = re.sub(r'<div[^>]*>', '\n', html_content)
-    html_content = re.sub(r'</div>', '\n', html_content)
-    html_content = re.sub(r'<span[^>]*>(.*?)</span>', r'\1', html_content, flags=re.DOTALL)
-    
-    # Remover todas las demás etiquetas HTML
-    html_content = re.sub(r'<[^>]+>', '', html_content)
-    
-    # Decodificar entidades HTML comunes
-    html_content = html_content.replace('&lt;', '<')
-    html_content = html_content.replace('&gt;', '>')
-    html_content = html_content.replace('&amp;', '&')
-    html_content = html_content.replace('&quot;', '"')
-    html_content = html_content.replace('&#39;', "'")
-    html_content = html_content.replace('&nbsp;', ' ')
-    html_content = html_content.replace('&ndash;', '–')
-    html_content = html_content.replace('&mdash;', '—')
-    html_content = html_content.replace('&copy;', '©')
-    html_content = html_content.replace('&reg;', '®')
-    
-    # Limpiar múltiples líneas vacías
-    html_content = re.sub(r'\n{3,}', '\n\n', html_content)
-    
-    # Limpiar espacios al inicio de líneas
-    html_content = re.sub(r'\n[ \t]+', '\n', html_content)
-    
-    return html_content.strip()
+    - markdown: el texto convertido
+    - sections: ancla → [inicio, fin) en caracteres del Markdown
+    - chunks: fragmentos [inicio, fin) para leer la página por partes
+    - outline: títulos {level, title, anchor, start, end} de la página
+    - examples: bloques de código {language, code, heading, anchor}
+    - links: destinos (href) de los enlaces de la página, sin los "#ancla" internos
+    """
+    converter = MarkdownConverter()
+    markdown = converter.convert(html_content) if html_content else ""
+    return {
+        "markdown": markdown,
+        "sections": converter.sections,
+        "chunks": chunk_ranges(markdown, converter.breaks),
+        "outline": converter.outline,
+        "examples": converter.examples,
+        "links": converter.links
+    }
+
+
+def chunk_ranges(text: str, breaks: list, size: int = CHUNK_SIZE) -> list[list[int]]:
+    """
+    Parte un texto en fragmentos de como mucho ~size caracteres.
+    
+    Se corta en límites de bloque (breaks: lista ordenada de
+    (posición, nivel de título o 0)), prefiriendo un título si cae en la
+    segunda mitad del fragmento. Si ningún límite cabe, se corta en un
+    salto de línea.
+    """
+    chunks = []
+    start = 0
+    length = len(text)
+    i = 0
+    while length - start > size:
+        limit = start + size
+        paragraph = heading = None
+        while i < len(breaks) and breaks[i][0] <= limit:
+            position, level = breaks[i]
+            i += 1
+            if position <= start:
+                continue
+            paragraph = position
+            if level and position - start >= size // 2:
+                heading = position
+        
+        cut = heading or paragraph
+        if cut is None:
+            newline = text.rfind('\n', start + 1, limit)
+            cut = newline + 1 if newline > start else limit
+        chunks.append([start, cut])
+        start = cut
+    chunks.append([start, length])
+    return chunks
+
+
+def convert_batch(html_pages: list[str]) -> list[dict]:
+    """
+    Convierte un lote de páginas HTML (ver convert_page).
+    Función de módulo para poder ejecutarse en otro proceso.
+    """
+    return [convert_page(html) for html in html_pages]
+
+
+def char_to_byte_offsets(text: str, offsets) -> dict[int, int]:
+    """
+    Traduce posiciones en caracteres de un texto a posiciones en bytes
+    de su codificación UTF-8, recorriéndolo una sola vez.
+    """
+    result = {}
+    previous = 0
+    position = 0
+    for offset in sorted(set(offsets)):
+        position += len(text[previous:offset].encode('utf-8'))
+        result[offset] = position
+        previous = offset
+    return result
+
+
+class ConversionPool:
+    """
+    Etapa de conversión HTML → Markdown para operaciones masivas.
+    
+    La conversión es Python puro (limitada por el GIL), así que para
+    usar varios núcleos los lotes se envían a un ProcessPoolExecutor.
+    Se agrupan varias páginas por envío para amortizar el coste de
+    serializar argumentos y resultados. Con 1 worker convierte en el
+    propio proceso.
+    
+    Configuración: DEVDOCS_CONVERT_WORKERS (por defecto, núcleos disponibles).
+    """
+    
+    def __init__(self, workers: Optional[int] = None, batch_size: int = 8):
+        if workers is None:
+            workers = int(os.environ.get("DEVDOCS_CONVERT_WORKERS", 0)) or os.cpu_count() or 1
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def submit(self, html_pages: list[str]) -> Future:
+        """Envía un lote a convertir; devuelve un Future con la lista de páginas"""
+        if self.workers == 1:
+            future = Future()
+            try:
+                future.set_result(convert_batch(html_pages))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        
+        if self._executor is None:
+            # "spawn": no hereda hilos ni sockets del proceso del servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor.submit(convert_batch, html_pages)
+    
+    def convert_many(self, html_pages: list[str]) -> list[dict]:
+        """Convierte varias páginas repartiendo lotes entre los workers"""
+        if self.workers == 1 or len(html_pages) <= self.batch_size:
+            return convert_batch(html_pages)
+        
+        futures = [
+            self.submit(html_pages[i:i + self.batch_size])
+            for i in range(0, len(html_pages), self.batch_size)
+        ]
+        return [page for future in futures for page in future.result()]
+    
+    def shutdown(self) -> None:
+        """Detiene los procesos worker"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _parse_attrs(raw: str) -> dict:
+    """Parsea los atributos de una etiqueta"""
+    attrs = {}
+    # Los grupos que no participan salen como ''; solo uno de los tres puede tener valor
+    for name, double, single, bare in _ATTR_RE.findall(raw):
+        value = double or single or bare
+        attrs[name.lower()] = unescape(value) if '&' in value else value
+    return attrs
+
+
+class _Section:
+    """Rango de una sección con ancla, en posiciones del buffer de salida"""
+    __slots__ = ('anchor', 'start', 'end', 'follow', 'in_table')
+    
+    def __init__(self, anchor: Optional[str], in_table: bool):
+        self.anchor = anchor
+        self.start: Optional[int] = None   # None: aún sin contenido
+        self.end: Optional[int] = None     # None: abierta; -1: termina con la tabla
+        self.follow: Optional['_Section'] = None  # Ancla vacía: toma el rango de otra
+        self.in_table = in_table
+
+
+class MarkdownConverter:
+    """
+    Conversor HTML → Markdown de una sola pasada.
+    
+    Recorre el documento con un tokenizador de etiquetas y escribe el
+    Markdown en un único buffer. Los saltos de línea y espacios se difieren
+    hasta que llega contenido, así no quedan líneas vacías sobrantes ni
+    espacios colgando, y cada línea recibe el prefijo de cita/lista que le toca.
+    
+    Durante el recorrido también anota el rango de cada elemento con id
+    (self.sections), para poder servir una sección sin releer la página:
+    
+    - Un título llega hasta el siguiente título de su nivel o superior.
+    - Un <dt> (firma de función en Sphinx) llega hasta el cierre de su <dl>.
+    - Cualquier otro elemento llega hasta su cierre.
+    - Un ancla vacía (<a id="x"></a>, <span id="x">) toma el rango de la
+      siguiente sección que empiece.
+    """
+    
+    def __init__(self):
+        self._out: list[str] = []
+        self._pending = 0            # Saltos de línea pedidos y aún no escritos
+        self._pending_quote = 0      # Nivel de cita de las líneas en blanco pendientes
+        self._space = False          # Espacio pendiente entre palabras
+        self._has_content = False    # Si el buffer actual ya tiene contenido
+        self._marker = None          # Marcador de <li> pendiente de escribir
+        self._lists: list[list] = [] # [ordenada, contador, ancho del marcador]
+        self._quote = 0
+        self._code = 0
+        self._hidden = 0             # Dentro de contenido que se descarta (¶)
+        self._heading = 0
+        self._inline: list[list] = []  # [tag, marcador, posición en el buffer, extra]
+        self._code_end = -1          # Posición tras el último cierre de `código`
+        self._tables: list[dict] = []
+        self._structure = True       # Anotar secciones, títulos y ejemplos (ver markdown)
+        # Secciones con ancla
+        self.sections: dict[str, list[int]] = {}
+        self._anchors: dict[str, _Section] = {}
+        self._waiting: list[_Section] = []       # Esperando su primer contenido
+        self._empty: list[_Section] = []         # Anclas vacías que siguen a la próxima
+        self._table_sections: list[_Section] = []  # Se resuelven al cerrar la tabla
+        self._headings: list[tuple] = []         # (nivel, sección) de títulos abiertos
+        self._dls: list[list[_Section]] = []     # <dt> con id de cada <dl> abierto
+        self._elements: list[tuple] = []         # (tag, profundidad, sección)
+        self._depth: dict[str, int] = {}         # Anidamiento de tags con id abierto
+        # Límites de bloque donde se puede partir la página
+        self.breaks: list[tuple[int, int]] = []  # (posición, nivel de título o 0)
+        self._breaks: list[tuple[int, int]] = []
+        self._break_level = 0
+        # Títulos de la página
+        self.outline: list[dict] = []
+        self._outline: list[list] = []           # [nivel, ancla, sección, inicio, fin del texto]
+        # Bloques de código, con el título y el ancla bajo los que aparecen
+        self.examples: list[dict] = []
+        # Enlaces a otras páginas
+        self.links: list[str] = []
+    
+    # ─────────────────────────────────────────────────────────
+    # Recorrido del documento
+    # ─────────────────────────────────────────────────────────
+    
+    def convert(self, html_content: str) -> str:
+        """Convierte un documento HTML completo"""
+        output = self._render(html_content)
+        markdown = output.strip()
+        
+        # Posiciones del buffer → caracteres del Markdown final
+        positions = [0, *accumulate(map(len, self._out))]
+        lead = len(output) - len(output.lstrip())
+        size = len(markdown)
+        self.sections = self._section_ranges(positions, lead, size)
+        self.outline = self._outline_entries(positions, lead, size)
+        self.breaks = [
+            (positions[index] - lead, level)
+            for index, level in self._breaks
+            if 0 < positions[index] - lead < size
+        ]
+        return markdown
+    
+    def markdown(self, html_content: str) -> str:
+        """Solo el Markdown: no anota secciones, títulos ni ejemplos"""
+        self._structure = False
+        return self._render(html_content).strip()
+    
+    def _render(self, html_content: str) -> str:
+        """Recorre el documento y devuelve el buffer de salida sin recortar"""
+        self._walk(_TOKEN_RE.split(html_content))
+        while self._tables:
+            self._end_table()
+        return ''.join(self._out)
+    
+    def _walk(self, parts: list) -> None:
+        """Procesa las piezas de _TOKEN_RE.split()"""
+        text = self._text
+        depth = self._depth
+        structure = self._structure
+        starts, ends = self._STARTS, self._ENDS
+        tokens = iter(parts)
+        
+        for segment, pre_raw, pre_body, cell, cell_raw, cell_body, closing, tag, raw in zip(*[tokens] * 9):
+            if segment:
+                if not segment.isspace():
+                    text(segment)
+                elif self._has_content:
+                    self._space = True
+            
+            if tag is None:
+                if cell is not None:
+                    self._text_cell('td' if cell in 'dD' else 'th', cell_raw, cell_body)
+                elif pre_body is not None:
+                    self._pre_tag(pre_raw, pre_body)
+                # Si no: comentario, <!DOCTYPE ...>, <?xml ...?> o <script>...</script>
+                continue
+            
+            tag = tag.lower()
+            if closing:
+                handler = ends.get(tag)
+                if handler is not None:
+                    handler(self, tag)
+                if tag in depth:
+                    self._close_element(tag)
+                continue
+            
+            if structure:
+                if tag in depth:
+                    depth[tag] += 1
+                if raw and 'id=' in raw:
+                    self._open_section(tag, raw)
+                elif tag in _HEADING_LEVELS:
+                    self._heading_section(_HEADING_LEVELS[tag], None)
+            
+            handler = starts.get(tag)
+            if handler is not None:
+                handler(self, tag, raw)
+            # El resto (<span>, <abbr>...) solo aporta su texto
+        
+        last = parts[-1]
+        if last and not last.isspace():
+            text(last)
+    
+    # ─────────────────────────────────────────────────────────
+    # Escritura en el buffer
+    # ─────────────────────────────────────────────────────────
+    
+    def _position(self) -> int:
+        """Posición actual en el buffer principal (-1 dentro de una tabla)"""
+        return -1 if self._tables else len(self._out)
+    
+    def _block(self, newlines: int = 2) -> None:
+        """Pide una separación de bloque antes del próximo contenido"""
+        if self._lists and not self._tables:
+            newlines = 1
+        if not self._pending:
+            self._pending_quote = self._quote
+        elif self._quote < self._pending_quote:
+            self._pending_quote = self._quote
+        if newlines > self._pending:
+            self._pending = newlines
+    
+    def _prefix(self) -> str:
+        """Prefijo de línea según citas y listas abiertas"""
+        prefix = '> ' * self._quote
+        if self._lists:
+            widths = [level[2] for level in self._lists]
+            if self._marker is not None:
+                widths = widths[:-1]
+            prefix += ' ' * sum(widths)
+        return prefix
+    
+    def _flush(self) -> None:
+        """Escribe los saltos de línea, prefijos y espacios pendientes"""
+        out = self._out
+        if self._pending or not self._has_content:
+            if self._has_content:
+                quote = min(self._quote, self._pending_quote)
+                if quote and self._pending > 1:
+                    # Las líneas en blanco dentro de una cita conservan el ">"
+                    quote_line = '\n' + ('> ' * quote).rstrip()
+                    out.append(quote_line * (self._pending - 1) + '\n')
+                else:
+                    out.append('\n' * self._pending)
+                if self._pending > 1 and not self._tables:
+                    self._breaks.append((len(out), self._break_level))
+            if self._waiting and not self._tables:
+                self._start_sections()
+            if self._quote or self._lists:
+                prefix = self._prefix()
+                if prefix:
+                    out.append(prefix)
+            if self._marker is not None:
+                out.append(self._marker)
+                self._marker = None
+        else:
+            if self._space:
+                out.append(' ')
+            if self._waiting and not self._tables:
+                self._start_sections()
+        self._pending = 0
+        self._space = False
+        self._has_content = True
+        self._break_level = 0
+    
+    def _emit(self, text: str) -> None:
+        """Escribe contenido (texto o marcador de apertura)"""
+        if self._pending or not self._has_content or self._waiting:
+            self._flush()
+        elif self._space:
+            # Lo habitual: contenido a continuación de contenido en la misma línea
+            self._out.append(' ')
+            self._space = False
+        self._out.append(text)
+    
+    def _text(self, text: str) -> None:
+        """Procesa un segmento de texto entre etiquetas (que no es solo espacio)"""
+        if self._hidden or (self._tables and self._tables[-1]['cell'] is None):
+            return
+        if '&' in text:
+            text = unescape(text)
+            if not text or text.isspace():
+                # Solo entidades de espacio (&nbsp;) o que no dejan nada (&#6;)
+                if text and self._has_content:
+                    self._space = True
+                return
+        
+        if text[0].isspace():
+            # Sin espacio justo después de un marcador de apertura ("** texto")
+            just_opened = self._inline and self._inline[-1][2] == len(self._out)
+            self._space = self._has_content and not just_opened
+        trailing = text[-1].isspace()
+        # Como _emit
+        if self._pending or not self._has_content or self._waiting:
+            self._flush()
+        elif self._space:
+            self._out.append(' ')
+        # split/join colapsa los espacios bastante más rápido que una regex
+        self._out.append(' '.join(text.split()))
+        self._space = trailing
+    
+    # ─────────────────────────────────────────────────────────
+    # Etiquetas (despachadas por nombre, ver _STARTS y _ENDS)
+    # ─────────────────────────────────────────────────────────
+    
+    def _start_block(self, tag: str, raw: str) -> None:
+        self._block()
+    
+    def _start_dl(self, tag: str, raw: str) -> None:
+        self._block()
+        self._dls.append([])
+    
+    def _start_heading(self, tag: str, raw: str) -> None:
+        level = _HEADING_LEVELS[tag]
+        self._block()
+        self._break_level = level
+        self._emit('#' * level)
+        if self._outline and self._outline[-1][3] is None:
+            self._outline[-1][3] = len(self._out)
+        self._space = True
+        self._heading += 1
+    
+    def _start_br(self, tag: str, raw: str) -> None:
+        if self._heading or self._tables:
+            self._space = self._has_content
+        else:
+            self._block(1)
+            self._pending = max(self._pending, 1)
+    
+    def _start_hr(self, tag: str, raw: str) -> None:
+        self._block()
+        self._emit('---')
+        self._block()
+    
+    def _start_code(self, tag: str, raw: str) -> None:
+        if not self._code:
+            if (self._code_end == len(self._out) and not self._space
+                    and not self._pending):
+                # Código pegado al anterior: `asyncio.``gather` → `asyncio.gather`
+                self._out.pop()
+                self._inline.append(['code', '`', len(self._out), None])
+            else:
+                self._open_inline('code', '`')
+        self._code += 1
+    
+    def _start_emphasis(self, tag: str, raw: str) -> None:
+        if not self._code:
+            self._open_inline(tag, _EMPHASIS[tag])
+    
+    def _start_a(self, tag: str, raw: str) -> None:
+        attrs = _parse_attrs(raw) if raw else _NO_ATTRS
+        href = attrs.get('href')
+        if href and href[0] != '#':
+            self.links.append(href)
+        if 'headerlink' in attrs.get('class', ''):
+            # Enlaces "¶" junto a los títulos: no aportan nada
+            self._hidden += 1
+            self._inline.append(['a', None, -1, 'hidden'])
+        elif href and not self._code:
+            self._open_inline('a', '[', href)
+        else:
+            self._inline.append(['a', None, -1, None])
+    
+    def _start_list(self, tag: str, raw: str) -> None:
+        self._block(1 if self._lists else 2)
+        start = (_parse_attrs(raw) if raw and tag == 'ol' else _NO_ATTRS).get('start', '1')
+        counter = int(start) - 1 if start.isdigit() else 0
+        self._lists.append([tag == 'ol', counter, 2])
+    
+    def _start_li(self, tag: str, raw: str) -> None:
+        if self._lists:
+            level = self._lists[-1]
+            level[1] += 1
+            self._marker = f"{level[1]}. " if level[0] else "- "
+            level[2] = len(self._marker)
+        self._block(1)
+    
+    def _start_blockquote(self, tag: str, raw: str) -> None:
+        self._block()
+        self._quote += 1
+    
+    def _start_tr(self, tag: str, raw: str) -> None:
+        if self._tables:
+            table = self._tables[-1]
+            if table['cell'] is not None:
+                self._end_cell()
+            table['rows'].append([])
+    
+    def _end_block(self, tag: str) -> None:
+        self._block()
+    
+    def _end_dl(self, tag: str) -> None:
+        self._block()
+        if self._dls:
+            for section in self._dls.pop():
+                self._end_section(section)
+    
+    def _end_heading(self, tag: str) -> None:
+        if self._heading:
+            self._heading -= 1
+        if self._outline and self._outline[-1][4] is None and not self._tables:
+            self._outline[-1][4] = len(self._out)
+        self._block()
+    
+    def _end_code(self, tag: str) -> None:
+        if self._code:
+            self._code -= 1
+            if not self._code:
+                self._close_inline('code')
+    
+    def _end_emphasis(self, tag: str) -> None:
+        if not self._code:
+            self._close_inline(tag)
+    
+    def _end_a(self, tag: str) -> None:
+        self._close_inline('a')
+    
+    def _end_list(self, tag: str) -> None:
+        if self._lists:
+            self._lists.pop()
+            self._marker = None
+        self._block(1 if self._lists else 2)
+    
+    def _end_li(self, tag: str) -> None:
+        # Un <li> vacío no deja marcador colgando ni consume número
+        if self._marker is not None and self._lists:
+            self._lists[-1][1] -= 1
+        self._marker = None
+    
+    def _end_blockquote(self, tag: str) -> None:
+        if self._quote:
+            self._quote -= 1
+        self._block()
+    
+    # ─────────────────────────────────────────────────────────
+    # Marcadores en línea (código, énfasis, enlaces)
+    # ─────────────────────────────────────────────────────────
+    
+    def _open_inline(self, tag: str, marker: str, extra=None) -> None:
+        self._emit(marker)
+        self._inline.append([tag, marker, len(self._out), extra])
+    
+    def _close_inline(self, tag: str) -> None:
+        inline = self._inline
+        if inline and inline[-1][0] == tag:
+            i = -1
+        else:
+            # Buscar la apertura correspondiente (tolerando HTML mal anidado)
+            for i in range(len(inline) - 1, -1, -1):
+                if inline[i][0] == tag:
+                    break
+            else:
+                return
+        
+        _, marker, position, extra = inline.pop(i)
+        if marker is None:
+            if extra == 'hidden':
+                self._hidden -= 1
+            return
+        
+        if len(self._out) == position and self._out[-1] == marker:
+            # Nada escrito desde la apertura: quitar el marcador
+            self._out.pop()
+            return
+        
+        # El cierre va pegado al contenido anterior, sin espacio ni salto pendiente
+        if tag == 'a':
+            self._out.append(f"]({extra})")
+        else:
+            self._out.append(marker)
+            if tag == 'code':
+                self._code_end = len(self._out)
+    
+    # ─────────────────────────────────────────────────────────
+    # Bloques de código
+    # ─────────────────────────────────────────────────────────
+    
+    def _pre_tag(self, raw: str, inner: str) -> None:
+        """<pre> completo: el tokenizador ya lo separó hasta su cierre"""
+        if 'pre' in self._depth:
+            self._depth['pre'] += 1
+        if self._structure and 'id=' in raw:
+            self._open_section('pre', raw)
+        self._pre_block(raw, inner)
+        if 'pre' in self._depth:
+            self._close_element('pre')  # Su cierre ya se consumió
+    
+    def _pre_block(self, raw: str, inner: str) -> None:
+        """
+        Convierte el contenido de un <pre> en un bloque de código cercado.
+        El resaltado de sintaxis (<span>...) se elimina con una sola sustitución.
+        """
+        attrs = _parse_attrs(raw) if raw else {}
+        lang = attrs.get('data-language') or extract_language(attrs.get('class', ''))
+        if not lang:
+            code_tag = _CODE_CLASS_RE.search(inner)
+            if code_tag:
+                lang = extract_language(code_tag.group(1) or code_tag.group(2) or '')
+        
+        code = _STRIP_TAGS_RE.sub('', _BR_RE.sub('\n', inner))
+        if '&' in code:
+            code = unescape(code)
+        self._code_block(code.strip('\n'), lang)
+    
+    def _code_block(self, code: str, lang: str) -> None:
+        """Escribe un bloque de código cercado"""
+        if self._structure and code.strip():
+            self._record_example(code, lang)
+        self._block()
+        fence = '```'
+        while fence in code:
+            fence += '`'
+        
+        self._emit(fence + lang)
+        # Las líneas del bloque, con su prefijo de cita/lista, van en una sola escritura
+        newline = '\n' + self._prefix()
+        lines = [line.rstrip() for line in code.split('\n')]
+        lines.append(fence)
+        self._out.append(newline + newline.join(lines))
+        self._block()
+    
+    def _record_example(self, code: str, lang: str) -> None:
+        """Anota un bloque de código con el título y el ancla que lo contienen"""
+        heading = anchor = None
+        if self._outline:
+            _, anchor, _, title_start, title_end = self._outline[-1]
+            if title_start is not None and title_end is not None:
+                heading = self._title(title_start, title_end) or None
+        # Dentro de una definición (<dl><dt id=...>), el ancla es la de la firma
+        for sections in reversed(self._dls):
+            if sections:
+                anchor = sections[-1].anchor
+                break
+        self.examples.append({
+            'language': lang or 'text', 'code': code, 'heading': heading, 'anchor': anchor
+        })
+    
+    def _title(self, start: int, end: int) -> str:
+        """Texto de un título a partir de su rango en el buffer principal"""
+        out = self._out
+        for table in self._tables:
+            if table['saved'] is not None:
+                out = table['saved'][0]
+                break
+        return _LINK_TEXT_RE.sub(r'\1', ''.join(out[start:end])).strip()
+    
+    # ─────────────────────────────────────────────────────────
+    # Tablas
+    # ─────────────────────────────────────────────────────────
+    
+    def _start_table(self, tag: str = 'table', raw: str = '') -> None:
+        self._tables.append({
+            'rows': [],
+            'caption': None,
+            'cell': None,
+            'header': False,
+            'saved': None
+        })
+    
+    def _start_cell(self, tag: str, raw: str = '') -> None:
+        if not self._tables:
+            return
+        table = self._tables[-1]
+        if table['cell'] is not None:
+            self._end_cell()
+        if tag != 'caption' and not table['rows']:
+            table['rows'].append([])
+        
+        # Redirigir la escritura a un buffer propio de la celda
+        table['cell'] = tag
+        table['saved'] = (self._out, self._pending, self._pending_quote, self._space, self._has_content,
+                          self._marker, self._lists, self._quote, self._inline, self._code_end)
+        self._out = []
+        self._pending = 0
+        self._space = False
+        self._has_content = False
+        self._marker = None
+        self._lists = []
+        self._quote = 0
+        self._inline = []
+        self._code_end = -1
+    
+    def _text_cell(self, tag: str, raw: str, content: str) -> None:
+        """<td>/<th> sencillo: el tokenizador ya lo separó hasta su cierre"""
+        tables = self._tables
+        text = None
+        if (tables and not (self._hidden or self._code or 'headerlink' in content)
+                and not (self._structure and ('id=' in raw or 'id=' in content
+                                              or not self._depth.keys().isdisjoint(_CELL_TAGS)))):
+            text = self._simple_cell(content)
+        if text is None:
+            # Apertura, contenido y cierre por separado, como el resto del documento
+            self._walk(['', None, None, None, None, None, '', tag, raw, *_TOKEN_RE.split(content),
+                        None, None, None, None, None, '/', tag, '', ''])
+            return
+        
+        # Lo mismo que _start_cell + contenido + _end_cell, sin redirigir la escritura
+        table = tables[-1]
+        if table['cell'] is not None:
+            self._end_cell()
+        rows = table['rows']
+        if not rows:
+            rows.append([])
+        rows[-1].append(text)
+        if tag == 'th' and len(rows) == 1:
+            table['header'] = True
+    
+    def _simple_cell(self, content: str) -> Optional[str]:
+        """Texto de una celda sencilla (ver _CELL_TEXT); None si hay que recorrerla"""
+        if '<' not in content:
+            if '&' in content:
+                content = unescape(content)
+            text = ' '.join(content.split())
+            return text.replace('|', '\\|') if '|' in text else text
+        if ('&' in content and _CELL_ENTITY_CUT_RE.search(content)
+                or '\x00' in content or '\x01' in content or '\x02' in content):
+            return None
+        
+        # Los destinos de los enlaces se reservan con \x00: no se desescapan
+        # ni se colapsan sus espacios con el resto. El código va entre \x01
+        # y \x02 para unir el que queda pegado, como en _start_code
+        hrefs = []
+        
+        def markup(match: re.Match) -> str:
+            index = match.lastindex
+            if index is None:
+                return ''   # <span>, <abbr>...
+            if index == 9:
+                return ' '  # <p> o <br>: en una celda, un espacio
+            text = match[index]
+            if '<' in text:
+                text = _CELL_NOOP_RE.sub('', text)
+            if index == 1:
+                return f'\x01{text}\x02'
+            if index < 6:
+                marker = _EMPHASIS[_CELL_EMPHASIS[index - 2]]
+                return f'{marker}{text}{marker}'
+            
+            raw = match[6]
+            href = (_parse_attrs(raw) if raw else _NO_ATTRS).get('href')
+            if href and href[0] != '#':
+                self.links.append(href)
+            if index == 8:
+                text = f'\x01{text}\x02'
+            if not href:
+                return text
+            if '\n' in href:
+                href = _CELL_BREAK_RE.sub(' ', href)
+            hrefs.append(href.replace('|', '\\|'))
+            return f'[{text}](\x00)'
+        
+        text = _CELL_MARKUP_RE.sub(markup, content)
+        if '&' in text:
+            text = unescape(text)
+        if '\x01' in text:
+            text = text.replace('\x02\x01', '').replace('\x01', '`').replace('\x02', '`')
+        text = ' '.join(text.split())
+        if '|' in text:
+            text = text.replace('|', '\\|')
+        if hrefs:
+            first, *rest = text.split('\x00')
+            text = first + ''.join(href + piece for href, piece in zip(hrefs, rest))
+        return text
+    
+    def _end_cell(self, tag: str = '') -> None:
+        if not self._tables:
+            return
+        table = self._tables[-1]
+        cell = table['cell']
+        if cell is None:
+            return
+        # Cerrar marcadores que el HTML dejó abiertos dentro de la celda
+        while self._inline:
+            self._close_inline(self._inline[-1][0])
+        
+        text = ''.join(self._out).strip()
+        if '\n' in text:
+            text = _CELL_BREAK_RE.sub(' ', text)
+        if '|' in text:
+            text = text.replace('|', '\\|')
+        (self._out, self._pending, self._pending_quote, self._space, self._has_content,
+         self._marker, self._lists, self._quote, self._inline, self._code_end) = table['saved']
+        
+        if cell == 'caption':
+            table['caption'] = text
+        else:
+            rows = table['rows']
+            rows[-1].append(text)
+            if cell == 'th' and len(rows) == 1:
+                table['header'] = True
+        table['cell'] = None
+        table['saved'] = None
+    
+    def _end_table(self, tag: str = 'table') -> None:
+        if not self._tables:
+            return
+        self._end_cell()
+        table = self._tables.pop()
+        rows = [row for row in table['rows'] if row]
+        
+        sections = None
+        if not self._tables and self._table_sections:
+            # Las secciones abiertas o cerradas dentro de la tabla cubren la tabla entera
+            sections, self._table_sections = self._table_sections, []
+            self._waiting.extend(s for s in sections if s.in_table and s.start is None)
+        
+        self._block()
+        if table['caption']:
+            self._emit(f"**{table['caption']}**")
+            self._block()
+        
+        if rows and self._tables:
+            # Tabla anidada dentro de una celda: se aplana en una sola línea
+            self._emit('; '.join(', '.join(filter(None, row)) for row in rows))
+        elif rows:
+            width = max(map(len, rows))
+            rows = [row if len(row) == width else row + [''] * (width - len(row)) for row in rows]
+            if not table['header']:
+                # Markdown exige cabecera: usar una vacía
+                rows.insert(0, [''] * width)
+            rows.insert(1, ['---'] * width)
+            
+            # La primera fila pasa por _emit (saltos, secciones); el resto va en una sola escritura
+            lines = ['| ' + ' | '.join(row) + ' |' for row in rows]
+            self._emit(lines[0])
+            newline = '\n' + self._prefix()
+            self._out.append(newline + newline.join(lines[1:]))
+            self._block(1)
+        
+        if sections:
+            for section in sections:
+                if section.end == -1:
+                    section.end = len(self._out)
+        self._block()
+    
+    # ─────────────────────────────────────────────────────────
+    # Secciones con ancla
+    # ─────────────────────────────────────────────────────────
+    
+    def _new_section(self, anchor: Optional[str]) -> _Section:
+        """Crea una sección que empieza con el próximo contenido"""
+        section = _Section(anchor, bool(self._tables))
+        if anchor:
+            self._anchors[anchor] = section
+        for empty in self._empty:
+            empty.follow = section
+        self._empty.clear()
+        if section.in_table:
+            self._table_sections.append(section)
+        else:
+            self._waiting.append(section)
+        return section
+    
+    def _start_sections(self) -> None:
+        """Las secciones pendientes empiezan en la posición actual"""
+        for section in self._waiting:
+            section.start = len(self._out)
+        self._waiting.clear()
+    
+    def _end_section(self, section: _Section) -> None:
+        """Cierra una sección en la posición actual"""
+        if self._tables:
+            section.end = -1
+            if not section.in_table:
+                self._table_sections.append(section)
+        elif section.start is None and section in self._waiting:
+            # Sin contenido propio: tomará el rango de la siguiente sección
+            self._waiting.remove(section)
+            self._empty.append(section)
+        else:
+            section.end = len(self._out)
+    
+    def _open_section(self, tag: str, raw: str) -> None:
+        """Registra un elemento con id según su tipo"""
+        anchor = _parse_attrs(raw).get('id')
+        if tag in _HEADING_LEVELS:
+            self._heading_section(_HEADING_LEVELS[tag], anchor)
+            return
+        if not anchor or anchor in self._anchors:
+            return
+        
+        section = self._new_section(anchor)
+        if tag in _VOID_TAGS:
+            self._end_section(section)
+        elif tag == 'dt' and self._dls:
+            self._dls[-1].append(section)
+        else:
+            if tag not in self._depth:
+                self._depth[tag] = 1
+            self._elements.append((tag, self._depth[tag], section))
+    
+    def _heading_section(self, level: int, anchor: Optional[str]) -> None:
+        """Un título cierra los títulos abiertos de su nivel o inferior"""
+        while self._headings and self._headings[-1][0] >= level:
+            self._end_section(self._headings.pop()[1])
+        if anchor in self._anchors:
+            anchor = None
+        
+        # Sin id propio, el título se enlaza con el del elemento que lo envuelve
+        # (<section id="..."><h2>) o con un ancla vacía justo antes
+        target = anchor
+        if target is None and self._waiting:
+            target = self._waiting[-1].anchor
+        if target is None and self._empty:
+            target = self._empty[-1].anchor
+        
+        section = self._new_section(anchor)
+        self._headings.append((level, section))
+        if not self._tables:
+            self._outline.append([level, target, section, None, None])
+    
+    def _close_element(self, tag: str) -> None:
+        """Cierre de una etiqueta con algún elemento con id abierto"""
+        depth = self._depth[tag]
+        for i in range(len(self._elements) - 1, -1, -1):
+            element_tag, element_depth, section = self._elements[i]
+            if element_tag == tag and element_depth >= depth:
+                del self._elements[i]
+                self._end_section(section)
+        if depth > 1:
+            self._depth[tag] = depth - 1
+        else:
+            del self._depth[tag]
+    
+    def _outline_entries(self, positions: list[int], lead: int, size: int) -> list[dict]:
+        """Títulos de la página con su texto y el rango de su sección"""
+        last = len(self._out)
+        
+        def offset(index: int) -> int:
+            return min(max(positions[min(index, last)] - lead, 0), size)
+        
+        entries = []
+        for level, anchor, section, title_start, title_end in self._outline:
+            if title_start is None or section.start is None:
+                continue
+            if title_end is None:
+                title_end = last
+            title = self._title(title_start, title_end)
+            if not title:
+                continue
+            start = offset(section.start)
+            end = size if section.end is None or section.end < 0 else max(start, offset(section.end))
+            entries.append({
+                'level': level, 'title': title, 'anchor': anchor, 'start': start, 'end': end
+            })
+        return entries
+    
+    def _section_ranges(self, positions: list[int], lead: int, size: int) -> dict[str, list[int]]:
+        """Traduce las secciones a rangos [inicio, fin) en caracteres del Markdown"""
+        if not self._anchors:
+            return {}
+        last = len(self._out)
+        
+        def offset(index: Optional[int], default: int) -> int:
+            if index is None or index < 0:
+                return default
+            return min(max(positions[min(index, last)] - lead, 0), size)
+        
+        ranges = {}
+        for anchor, section in self._anchors.items():
+            while section.start is None and section.follow is not None:
+                section = section.follow
+            start = offset(section.start, size)
+            ranges[anchor] = [start, max(start, offset(section.end, size))]
+        return ranges
+    
+    # ─────────────────────────────────────────────────────────
+    # Despacho por etiqueta
+    # ─────────────────────────────────────────────────────────
+    
+    # Manejadores de apertura y cierre por etiqueta; el resto solo aporta su texto
+    _STARTS = {
+        **dict.fromkeys(_BLOCK_TAGS, _start_block), 'dl': _start_dl,
+        **dict.fromkeys(_HEADING_LEVELS, _start_heading),
+        **dict.fromkeys(_CODE_TAGS, _start_code),
+        **dict.fromkeys(_EMPHASIS, _start_emphasis),
+        'br': _start_br, 'hr': _start_hr, 'a': _start_a, 'ul': _start_list, 'ol': _start_list,
+        'li': _start_li, 'blockquote': _start_blockquote, 'table': _start_table,
+        'td': _start_cell, 'th': _start_cell, 'caption': _start_cell, 'tr': _start_tr,
+    }
+    _ENDS = {
+        **dict.fromkeys(_BLOCK_TAGS, _end_block), 'dl': _end_dl,
+        **dict.fromkeys(_HEADING_LEVELS, _end_heading),
+        **dict.fromkeys(_CODE_TAGS, _end_code),
+        **dict.fromkeys(_EMPHASIS, _end_emphasis),
+        'a': _end_a, 'ul': _end_list, 'ol': _end_list, 'li': _end_li,
+        'blockquote': _end_blockquote, 'td': _end_cell, 'th': _end_cell,
+        'caption': _end_cell, 'table': _end_table,
+    }
 
 
 def extract_language(class_name: str) -> str:
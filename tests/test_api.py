@@ -0,0 +1,497 @@
+"""Tests del cliente DevDocsAPI sin red (las descargas se simulan)"""
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from devdocs_mcp.api import CacheMissError, DevDocsAPI
+from devdocs_mcp.cache import DevDocsCache
+from devdocs_mcp.scheduler import BULK, INTERACTIVE
+
+
+PAGES = {
+    "library/asyncio": "<h1>asyncio</h1><p>Asynchronous I/O.</p>",
+    "library/asyncio-task": "<h1>Tasks</h1><pre data-language=\"python\">await x</pre>",
+    "library/json": "<h1>json</h1><p>JSON encoder.</p>",
+    "library/asyncio-sync": (
+        "<h1 id=\"sync\">Sincronización</h1><p>Primitivas — introducción.</p>"
+        "<dl><dt id=\"asyncio.Lock\">class Lock</dt><dd><p>Cerrojo «mutex».</p></dd></dl>"
+        "<h2 id=\"event\">Event</h2><p>Evento.</p>"
+        "<pre data-language=\"python\">event = asyncio.Event()</pre>"
+        "<dl><dt id=\"asyncio.Event.wait\">wait()</dt>"
+        "<dd><pre class=\"language-python\">await event.wait()</pre><pre>$ run</pre></dd></dl>"
+    ),
+    "library/asyncio-stream": (
+        "<h1>Streams</h1><p>See <a href=\"asyncio-task#asyncio.gather\">gather</a>, "
+        "<a href=\"asyncio-task\">tasks</a>, <a href=\"../glossary\">glossary</a>, "
+        "<a href=\"/python~3.12/library/json\">json</a>, <a href=\"#top\">top</a> "
+        "and <a href=\"https://example.com\">fuera</a>.</p>"
+    ),
+    "library/big": "<h1>Big</h1>" + "".join(
+        f"<h2 id=\"s{i}\">Sección {i}</h2><p>{'ñandú ' * 150}</p>" for i in range(60)
+    ),
+}
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    api = DevDocsAPI(DevDocsCache(tmp_path), convert_workers=1)
+    fetched = []
+    
+    def fake_fetch(tech, clean_path, priority=0):
+        fetched.append(clean_path)
+        if clean_path not in PAGES:
+            request = httpx.Request("GET", f"https://documents.devdocs.io/{tech}/{clean_path}.html")
+            raise httpx.HTTPStatusError("404 Not Found", request=request,
+                                        response=httpx.Response(404, request=request))
+        return PAGES[clean_path]
+    
+    monkeypatch.setattr(api, "_fetch_page_html", fake_fetch)
+    api.fetched = fetched
+    return api
+
+
+def test_fetch_pages_converts_and_caches_in_bulk(api):
+    errors = api.fetch_pages("python~3.12", [
+        "library/asyncio", "library/asyncio-task#asyncio.gather",
+        "library/asyncio-task", "library/missing"
+    ])
+    
+    assert list(errors) == ["library/missing"]
+    assert sorted(api.fetched) == ["library/asyncio", "library/asyncio-task", "library/missing"]
+    assert "```python\nawait x\n```" in api.cache.get_page("python~3.12", "library/asyncio-task")
+    
+    # Lo ya cacheado no se vuelve a descargar
+    api.fetched.clear()
+    api.fetch_pages("python~3.12", ["library/asyncio"])
+    assert api.fetched == []
+
+
+def test_fetch_pages_releases_each_marker_once_stored(api, monkeypatch):
+    api.converter.batch_size = 1
+    api.download_workers = 2
+    release = threading.Event()
+    original = api._fetch_page_html
+    
+    def fetch(tech, clean_path, priority=0):
+        if clean_path == "library/big":
+            release.wait(5)
+        return original(tech, clean_path, priority)
+    
+    monkeypatch.setattr(api, "_fetch_page_html", fetch)
+    done = threading.Thread(target=api.fetch_pages, args=("python~3.12", ["library/json", "library/big"]))
+    done.start()
+    
+    # json ya está guardada y libre mientras big sigue descargándose
+    deadline = time.time() + 5
+    while not api.cache.page_exists("python~3.12", "library/json") and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    markers = sorted(p.name for p in api.cache.cache_dir.glob("python~3.12/*.fetching"))
+    assert markers == ["library_big.fetching"]
+    release.set()
+    done.join(5)
+    assert not list(api.cache.cache_dir.glob("python~3.12/*.fetching"))
+
+
+def test_get_multiple_pages_reports_failures(api):
+    result = api.get_multiple_pages("python~3.12", ["library/json", "library/missing"])
+    
+    assert result['successful'] == 1
+    assert result['failed'] == 1
+    assert "JSON encoder." in result['pages']["library/json"]['content']
+    assert "404" in result['pages']["library/missing"]['error']
+
+
+def test_get_page_section_reads_only_the_anchor_range(api):
+    section = api.get_page_section("python~3.12", "library/asyncio-sync#asyncio.Lock")
+    
+    assert section.startswith("# library/asyncio-sync#asyncio.Lock\n")
+    assert section.endswith("class Lock\n\nCerrojo «mutex».\n")
+    assert "Event" not in section
+    
+    # Sin ancla o con un ancla desconocida no hay sección
+    assert api.get_page_section("python~3.12", "library/asyncio-sync") is None
+    assert api.get_page_section("python~3.12", "library/asyncio-sync#nope") is None
+    assert api.fetched == ["library/asyncio-sync"]
+
+
+def test_get_page_chunk_walks_the_page_by_offsets(api):
+    first = api.get_page_chunk("python~3.12", "library/big")
+    assert first['chunk'] == 0 and first['chunks'] > 1
+    
+    parts = [first['content']]
+    offset = first['next_offset']
+    while offset is not None:
+        result = api.get_page_chunk("python~3.12", "library/big", offset=offset)
+        parts.append(result['content'])
+        offset = result['next_offset']
+    
+    assert len(parts) == first['chunks']
+    assert "".join(parts) == api.cache.get_page("python~3.12", "library/big")
+    # Los cortes caen antes de un título
+    assert all(part.startswith("## Sección") for part in parts[1:])
+    
+    with pytest.raises(ValueError):
+        api.get_page_chunk("python~3.12", "library/big", chunk=first['chunks'])
+
+
+def test_get_page_outline_from_sidecar_and_legacy_pages(api):
+    outline = api.get_page_outline("python~3.12", "library/asyncio-sync")
+    
+    assert [(e['level'], e['title'], e['anchor']) for e in outline] == [
+        (1, "Sincronización", "sync"), (2, "Event", "event")
+    ]
+    event = outline[1]
+    assert api.cache.read_page_range(
+        "python~3.12", "library/asyncio-sync", event['offset'], event['offset'] + event['size']
+    ).startswith("## Event\n\nEvento.\n\n```python")
+    
+    # Página cacheada sin sidecar: se deduce de los títulos Markdown
+    api.cache.save_page("python~3.12", "legacy", "# legacy\n\n## Uno\n\n```\n# no\n```\n\n### Dos\n")
+    legacy = api.get_page_outline("python~3.12", "legacy")
+    assert [(e['level'], e['title'], e['size']) for e in legacy] == [(2, "Uno", 30), (3, "Dos", 8)]
+
+
+def test_get_examples_from_sidecar_with_filters(api):
+    result = api.get_examples_from_page("python~3.12", "library/asyncio-sync")
+    assert [(e['language'], e['heading'], e['anchor']) for e in result['examples']] == [
+        ("python", "Event", "event"),
+        ("python", "Event", "asyncio.Event.wait"),
+        ("text", "Event", "asyncio.Event.wait"),
+    ]
+    
+    only_python = api.get_examples_from_page("python~3.12", "library/asyncio-sync", language="Python")
+    assert [e['code'] for e in only_python['examples']] == [
+        "event = asyncio.Event()", "await event.wait()"
+    ]
+    
+    by_anchor = api.get_examples_from_page("python~3.12", "library/asyncio-sync#asyncio.Event.wait")
+    assert [e['code'] for e in by_anchor['examples']] == ["await event.wait()", "$ run"]
+
+
+def test_stale_pages_are_rerendered_from_cached_html(api, monkeypatch):
+    api.get_page("python~3.12", "library/json")
+    api.get_page("python~3.12", "library/asyncio")
+    assert api.get_page_raw_html("python~3.12", "library/json") == PAGES["library/json"]
+    
+    # Nueva versión del conversor: se reconvierte sin red
+    monkeypatch.setattr("devdocs_mcp.api.CONVERTER_VERSION", 99)
+    api.fetched.clear()
+    assert "JSON encoder." in api.get_page("python~3.12", "library/json")
+    assert api.cache.get_page_sidecar("python~3.12", "library/json", "meta")["converter"] == 99
+    
+    assert api.rerender_cache("python~3.12") == {"rerendered": 1, "up_to_date": 1, "missing_html": 0}
+    assert api.fetched == []
+
+
+def test_related_pages_from_link_graph_and_prefetch(api):
+    api.cache.save_index("python~3.12", json.dumps({"entries": [
+        {"name": "asyncio-stream", "path": "library/asyncio-stream", "type": "asyncio"},
+        {"name": "asyncio.gather()", "path": "library/asyncio-task#asyncio.gather", "type": "asyncio"},
+        {"name": "json", "path": "library/json", "type": "json"},
+    ], "types": []}))
+    api.prefetch_links = 1
+    
+    api.get_page("python~3.12", "library/asyncio-stream")
+    api.prefetcher.shutdown(wait=True)
+    # El vecino más enlazado ya está en caché
+    assert api.cache.page_exists("python~3.12", "library/asyncio-task")
+    assert not api.cache.page_exists("python~3.12", "library/json")
+    
+    related = api.get_related_pages("python~3.12", "library/asyncio-stream")
+    assert [(r['path'], r['score'], r['cached']) for r in related] == [
+        ("library/asyncio-task", 4, True), ("library/json", 2, False)
+    ]
+    # glossary no está en el índice; la relación también se ve desde el destino
+    assert api.get_related_pages("python~3.12", "library/asyncio-task")[0]['incoming'] == 2
+    
+    # Sin páginas nuevas no se vuelven a listar los sidecars
+    api._links.clear()
+    api.cache.list_page_sidecars = lambda tech, kind: pytest.fail("relistado")
+    assert api.get_related_pages("python~3.12", "library/asyncio-stream") == related
+
+
+def test_search_prefetch_respects_budget_and_staleness(api):
+    api.prefetch_search = 2
+    prefetcher = api._get_prefetcher()
+    prefetcher.max_requests = 2
+    prefetcher._executor._max_workers = 1
+    started, release = threading.Event(), threading.Event()
+    original = api.fetch_pages
+    
+    def slow_fetch(tech, paths, priority):
+        started.set()
+        release.wait(5)
+        return original(tech, paths, priority)
+    
+    api.fetch_pages = slow_fetch
+    results = [{"path": "library/json#json.dumps"}, {"path": "library/json#json.loads"},
+               {"path": "library/asyncio"}, {"path": "library/big"}]
+    assert api.prefetch_search_results(results, "python~3.12") == 2
+    assert started.wait(5)
+    
+    # Búsqueda nueva: lo que no empezó de la anterior se cancela; el presupuesto limita
+    assert api.prefetch_search_results([
+        {"path": "library/big", "tech": "python~3.12"},
+        {"path": "library/asyncio-sync", "tech": "python~3.12"}
+    ]) == 1
+    release.set()
+    prefetcher.shutdown(wait=True)
+    
+    assert api.cache.page_exists("python~3.12", "library/json")
+    assert not api.cache.page_exists("python~3.12", "library/asyncio")
+    assert api.cache.page_exists("python~3.12", "library/big")
+    assert prefetcher.stats["cancelled"] == 1
+    assert prefetcher.stats["requests"] == 2
+
+
+def test_fan_out_tools_return_partial_results_at_deadline(api, monkeypatch):
+    release = threading.Event()
+    original = api._fetch_page_html
+    
+    def slow_fetch(tech, clean_path, priority=0):
+        if clean_path == "library/big":
+            release.wait(5)
+        return original(tech, clean_path, priority)
+    
+    monkeypatch.setattr(api, "_fetch_page_html", slow_fetch)
+    result = api.get_multiple_pages("python~3.12", ["library/json", "library/big"], deadline=0.2)
+    
+    assert result['successful'] == 1
+    assert result['pending'] == 1
+    assert result['pages']["library/big"] == {'pending': True}
+    # Lo pendiente sigue llenando la caché tras responder
+    release.set()
+    api._background.shutdown(wait=True)
+    assert api.cache.page_exists("python~3.12", "library/big")
+    
+    slow = threading.Event()
+    api._background = type(api._background)(max_workers=2)
+    
+    def fake_search(tech, query, limit=20):
+        if tech == "slow":
+            slow.wait(5)
+        return [{"name": query, "path": "x"}]
+    
+    monkeypatch.setattr(api, "search_in_index", fake_search)
+    found = api.search_across_docs("q", ["fast", "slow"], deadline=0.2)
+    slow.set()
+    
+    assert found['results']["fast"]['entries'][0]['name'] == "q"
+    assert found['results']["slow"] == {'pending': True}
+    assert found['pending_count'] == 1
+
+
+def test_missing_resources_and_unknown_slugs_skip_the_network(tmp_path):
+    api = DevDocsAPI(DevDocsCache(tmp_path), convert_workers=1)
+    calls = []
+    
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(404, request=request)
+    
+    api.client = httpx.Client(transport=httpx.MockTransport(handler))
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError, match="404"):
+            api.get_page("python~3.12", "library/gone")
+    assert len(calls) == 1
+    assert api.missing.get_stats()["hits"] == 1
+    
+    # Con el catálogo en caché, un slug desconocido no llega a la red
+    api.cache.save_docs_list(json.dumps([{"name": "Python", "slug": "python~3.12"}]))
+    with pytest.raises(ValueError, match="pyhton"):
+        api.get_index("pyhton")
+    with pytest.raises(ValueError, match="pyhton"):
+        api.get_page("pyhton", "library/json")
+    assert len(calls) == 1
+
+
+def test_strict_offline_fails_fast_and_file_mirror_serves_pages(tmp_path, monkeypatch):
+    mirror = tmp_path / "mirror"
+    (mirror / "python~3.12" / "library").mkdir(parents=True)
+    (mirror / "python~3.12" / "library" / "json.html").write_text(PAGES["library/json"])
+    monkeypatch.setenv("DEVDOCS_PAGE_URL", mirror.as_uri() + "/{tech}/{path}.html")
+    
+    api = DevDocsAPI(DevDocsCache(tmp_path / "cache"), convert_workers=1, offline=True)
+    def no_network(request):
+        raise AssertionError(f"petición de red en modo offline: {request.url}")
+    
+    api.client = httpx.Client(transport=httpx.MockTransport(no_network))
+    
+    # El mirror local no es red: se puede usar también en modo estricto
+    assert "JSON encoder." in api.get_page("python~3.12", "library/json")
+    with pytest.raises(httpx.HTTPStatusError, match="404"):
+        api.get_page("python~3.12", "library/missing")
+    
+    with pytest.raises(CacheMissError, match="índice de 'python~3.12'"):
+        api.get_index("python~3.12")
+    with pytest.raises(CacheMissError, match="docs.json"):
+        api.get_docs_list()
+
+
+def test_warm_cache_fetches_missing_pages_with_progress(api):
+    api.cache.save_docs_list(json.dumps([{"name": "Python", "slug": "python~3.12"}]))
+    api.cache.save_index("python~3.12", json.dumps({"entries": [
+        {"name": "json", "path": "library/json#module-json", "type": "json"},
+        {"name": "asyncio", "path": "library/asyncio", "type": "asyncio"},
+        {"name": "gone", "path": "library/missing", "type": "misc"},
+    ], "types": []}))
+    api.get_page("python~3.12", "library/asyncio")
+    api.fetched.clear()
+    
+    calls = []
+    result = api.warm_cache(["python~3.12", "pyhton"], pages=True,
+                            progress=lambda *args: calls.append(args))
+    
+    assert sorted(api.fetched) == ["library/json", "library/missing"]
+    assert result["techs"]["python~3.12"] == {"entries": 3, "pages": 3, "fetched": 1, "failed": 1}
+    assert "desconocida" in result["techs"]["pyhton"]["error"]
+    assert calls == [("python~3.12", 3, 3)]
+    assert result["bytes"] > 0
+
+
+def test_warm_cache_fetches_indexes_as_bulk(api, monkeypatch):
+    api.cache.save_docs_list(json.dumps([{"name": "Python", "slug": "python~3.12"}]))
+    priorities = []
+    
+    def http_get(url, priority=INTERACTIVE, miss=None):
+        priorities.append(priority)
+        return httpx.Response(200, json={"entries": [], "types": []}, request=httpx.Request("GET", url))
+    
+    monkeypatch.setattr(api, "_http_get", http_get)
+    assert api.warm_cache(["python~3.12"])["techs"]["python~3.12"]["entries"] == 0
+    assert priorities == [BULK]
+
+
+def test_update_documentation_rewrites_only_changed_pages(api, monkeypatch):
+    tech = "python~3.12"
+    entries = [{"name": p, "path": p, "type": "x"} for p in
+               ("library/asyncio", "library/json", "library/asyncio-task")]
+    api.cache.save_index(tech, json.dumps({"entries": entries, "types": []}))
+    for path in ("library/asyncio", "library/json", "library/asyncio-task"):
+        api.get_page(tech, path)
+    
+    new_index = {"entries": entries[:2] + [{"name": "new", "path": "library/new", "type": "x"}], "types": []}
+    db = {"library/asyncio": PAGES["library/asyncio"], "library/json": "<h1>json</h1><p>JSON v2.</p>"}
+    
+    def fake_get(url, priority=0, miss=None):
+        request = httpx.Request("GET", url)
+        if url.endswith("index.json"):
+            return httpx.Response(200, json=new_index, request=request)
+        return httpx.Response(200, json=db, request=request)
+    
+    monkeypatch.setattr(api, "_http_get", fake_get)
+    stats = api.update_documentation(tech)
+    
+    assert stats == {"added": 1, "changed": 1, "unchanged": 1, "removed": 1,
+                     "kept_in_bundle": 0, "failed": 0, "source": "db.json"}
+    assert "JSON v2." in api.cache.get_page(tech, "library/json")
+    assert not api.cache.page_exists(tech, "library/asyncio-task")
+    assert api.cache.get_page_sidecar(tech, "library/asyncio-task", "sections") is None
+    
+    # Sin db.json en el origen: página a página, y ya no hay nada que cambiar
+    def no_db(url, priority=0, miss=None):
+        request = httpx.Request("GET", url)
+        if url.endswith("db.json"):
+            raise httpx.HTTPStatusError("404", request=request, response=httpx.Response(404, request=request))
+        return fake_get(url, priority, miss)
+    
+    PAGES_V2 = {**PAGES, "library/json": db["library/json"]}
+    monkeypatch.setattr(api, "_http_get", no_db)
+    monkeypatch.setattr(api, "_fetch_page_html", lambda tech, path, priority=0: PAGES_V2[path])
+    stats = api.update_documentation(tech)
+    assert (stats["source"], stats["changed"], stats["unchanged"], stats["removed"]) == ("pages", 0, 2, 0)
+
+
+def test_update_documentation_handles_legacy_pages_and_malformed_db(api, monkeypatch):
+    tech = "python~3.12"
+    entries = [{"name": "json", "path": "library/json", "type": "x"}]
+    api.cache.save_index(tech, json.dumps({"entries": entries, "types": []}))
+    # Páginas de antes de los sidecars: solo el .md con su cabecera
+    api.cache.save_page(tech, "library/json", "# library/json\n\nviejo")
+    api.cache.save_page(tech, "library/gone", "# library/gone\n\nviejo")
+    
+    def broken_db(url, priority=0, miss=None):
+        request = httpx.Request("GET", url)
+        if url.endswith("index.json"):
+            return httpx.Response(200, json={"entries": entries, "types": []}, request=request)
+        return httpx.Response(200, content=b"<html>no es json", request=request)
+    
+    monkeypatch.setattr(api, "_http_get", broken_db)
+    stats = api.update_documentation(tech)
+    
+    assert (stats["source"], stats["changed"], stats["removed"]) == ("pages", 1, 1)
+    assert "JSON encoder." in api.cache.get_page(tech, "library/json")
+    assert api.cache.get_page_sidecar(tech, "library/json", "meta")["hash"]
+    assert not api.cache.page_exists(tech, "library/gone")
+
+
+def test_processes_sharing_a_cache_download_each_page_once(tmp_path):
+    # Dos instancias sobre el mismo directorio simulan dos procesos
+    fetched = []
+    started = threading.Event()
+    
+    def slow_fetch(tech, clean_path, priority=0):
+        fetched.append(clean_path)
+        started.set()
+        time.sleep(0.2)
+        return PAGES[clean_path]
+    
+    apis = [DevDocsAPI(DevDocsCache(tmp_path), convert_workers=1) for _ in range(2)]
+    for instance in apis:
+        instance._fetch_page_html = slow_fetch
+    
+    first = threading.Thread(target=apis[0].get_page, args=("python~3.12", "library/json"))
+    first.start()
+    assert started.wait(5)
+    assert "JSON encoder." in apis[1].get_page("python~3.12", "library/json")
+    assert apis[1].fetch_pages("python~3.12", ["library/json", "library/asyncio"]) == {}
+    first.join(5)
+    
+    assert sorted(fetched) == ["library/asyncio", "library/json"]
+    assert not list(tmp_path.glob("python~3.12/*.fetching"))
+
+
+def test_similarity_index_follows_page_changes_and_survives_corrupt_meta(api):
+    tech = "python~3.12"
+    api.cache.save_index(tech, json.dumps({"entries": [
+        {"name": "json", "path": "library/json", "type": "json"},
+    ], "types": []}))
+    api.fetch_pages(tech, ["library/json"])
+    assert [r['path'] for r in api.similarity_search("encoder", [tech])][:1] == ["library/json"]
+    
+    # Sin cambios no se vuelven a listar las páginas
+    api.cache.list_pages = lambda tech: pytest.fail("relistado")
+    api.similarity_search("encoder", [tech])
+    del api.cache.list_pages
+    
+    # Una página nueva cambia la firma
+    api.fetch_pages(tech, ["library/asyncio-sync"])
+    assert "library/asyncio-sync" in [r['path'] for r in api.similarity_search("primitivas cerrojo", [tech])]
+    
+    # Metadatos truncados: se reconstruye en lugar de fallar
+    (api.cache.cache_dir / tech / "vectors.json").write_text('{"signature": [')
+    api._vectors.clear()
+    assert "library/asyncio-sync" in [r['path'] for r in api.similarity_search("primitivas cerrojo", [tech])]
+    assert json.loads((api.cache.cache_dir / tech / "vectors.json").read_text())['rows']
+
+
+def test_similarity_rebuild_only_rereads_changed_pages(api):
+    tech = "python~3.12"
+    api.cache.save_index(tech, json.dumps({"entries": [
+        {"name": "json", "path": "library/json", "type": "json"},
+    ], "types": []}))
+    api.fetch_pages(tech, ["library/json", "library/asyncio-sync"])
+    api.similarity_search("encoder", [tech])
+    
+    api.fetch_pages(tech, ["library/asyncio"])
+    read = []
+    read_file = api.cache.read_file
+    api.cache.read_file = lambda path: read.append(path.name) or read_file(path)
+    results = api.similarity_search("primitivas cerrojo", [tech])
+    
+    assert [name for name in read if name.endswith(".md")] == [api.cache._get_page_path(tech, "library/asyncio").name]
+    assert "library/asyncio-sync" in [r['path'] for r in results]
@@ -0,0 +1,110 @@
+"""Tests de los paquetes offline (pack, unpack y servir vía mmap)"""
+import json
+
+import httpx
+import pytest
+
+from devdocs_mcp.api import DevDocsAPI
+from devdocs_mcp.bundle import Bundle, pack, unpack
+from devdocs_mcp.cache import DevDocsCache
+
+
+PAGES = {
+    "library/asyncio": "<h1>asyncio</h1><p>Asynchronous I/O.</p>",
+    "library/asyncio-sync": (
+        "<h1 id=\"sync\">Sincronización</h1><p>Primitivas.</p>"
+        "<h2 id=\"event\">Event</h2><p>Evento «ñ».</p>"
+    ),
+}
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Caché de origen con catálogo, índice, páginas y sidecars"""
+    cache = DevDocsCache(tmp_path / "source")
+    api = DevDocsAPI(cache, convert_workers=1)
+    api._fetch_page_html = lambda tech, clean_path, priority=0: PAGES[clean_path]
+    cache.save_docs_list(json.dumps([{"name": "Python", "slug": "python~3.12"}]))
+    cache.save_index("python~3.12", json.dumps({
+        "entries": [{"name": "asyncio", "path": "library/asyncio", "type": "asyncio"}],
+        "types": []
+    }))
+    for path in PAGES:
+        api.get_page("python~3.12", path)
+    return cache
+
+
+def test_bundle_serves_pages_without_extracting(source, tmp_path):
+    bundle_path = tmp_path / "docs.ddb"
+    result = pack(source.cache_dir, bundle_path)
+    assert result["techs"] == ["python~3.12"]
+
+    cache = DevDocsCache(tmp_path / "empty", bundle=bundle_path)
+    api = DevDocsAPI(cache, convert_workers=1, offline=True)
+
+    assert cache.list_techs() == ["python~3.12"]
+    assert cache.index_stamp("python~3.12") == source.index_stamp("python~3.12")
+    assert api.search_in_index("python~3.12", "asyncio")[0]["path"] == "library/asyncio"
+    assert "Asynchronous I/O." in api.get_page("python~3.12", "library/asyncio")
+    assert "Evento «ñ»." in api.get_page_section("python~3.12", "library/asyncio-sync#event")
+    assert cache.get_page_html("python~3.12", "library/asyncio") == PAGES["library/asyncio"]
+    # Nada se extrajo al disco
+    assert not (tmp_path / "empty" / "python~3.12").exists()
+
+    # Lo escrito en disco tiene prioridad sobre el paquete
+    cache.save_page("python~3.12", "library/asyncio", "# local")
+    assert cache.get_page("python~3.12", "library/asyncio") == "# local"
+    cache.bundle.close()
+
+
+def test_similarity_search_on_a_bundle_only_tech(source, tmp_path):
+    pytest.importorskip("scipy")
+    bundle_path = tmp_path / "docs.ddb"
+    pack(source.cache_dir, bundle_path)
+    # El paquete no lleva matriz: se construye y se guarda en un directorio que aún no existe
+    assert not list(source.cache_dir.glob("python~3.12/vectors.*"))
+
+    cache = DevDocsCache(tmp_path / "empty", bundle=bundle_path)
+    api = DevDocsAPI(cache, convert_workers=1, offline=True)
+    results = api.similarity_search("primitivas evento", ["python~3.12"])
+    assert results[0]["path"] == "library/asyncio-sync"
+    assert (tmp_path / "empty" / "python~3.12" / "vectors.npz").exists()
+    cache.bundle.close()
+
+
+def test_update_keeps_pages_that_only_the_bundle_has(source, tmp_path):
+    bundle_path = tmp_path / "docs.ddb"
+    pack(source.cache_dir, bundle_path)
+    cache = DevDocsCache(tmp_path / "empty", bundle=bundle_path)
+    api = DevDocsAPI(cache, convert_workers=1)
+    new_index = {"entries": [{"name": "asyncio", "path": "library/asyncio", "type": "asyncio"}], "types": []}
+    db = {"library/asyncio": "<h1>asyncio</h1><p>v2.</p>"}
+    api._http_get = lambda url, priority=0, miss=None: httpx.Response(
+        200, json=new_index if url.endswith("index.json") else db, request=httpx.Request("GET", url)
+    )
+
+    stats = api.update_documentation("python~3.12")
+    # asyncio-sync desapareció pero el paquete la sigue sirviendo: no cuenta como borrada
+    assert (stats["changed"], stats["removed"], stats["kept_in_bundle"]) == (1, 0, 1)
+    assert cache.page_exists("python~3.12", "library/asyncio-sync")
+    assert "v2." in cache.get_page("python~3.12", "library/asyncio")
+    cache.bundle.close()
+
+
+def test_unpack_keeps_mtimes_and_selection(source, tmp_path):
+    bundle_path = tmp_path / "docs.ddb"
+    pack(source.cache_dir, bundle_path, include_html=False)
+    assert not any(name.endswith(".html.gz") for name in Bundle(bundle_path).names())
+
+    target = DevDocsCache(tmp_path / "target")
+    assert unpack(bundle_path, target.cache_dir, ["python~3.12"])["extracted"] > 0
+    assert target.index_stamp("python~3.12") == source.index_stamp("python~3.12")
+    assert target.get_page("python~3.12", "library/asyncio") == source.get_page("python~3.12", "library/asyncio")
+    assert unpack(bundle_path, target.cache_dir)["extracted"] == 0
+
+
+def test_rejects_files_that_are_not_bundles(tmp_path):
+    path = tmp_path / "bogus.ddb"
+    path.write_bytes(b"not a bundle at all, just some bytes")
+    with pytest.raises(ValueError):
+        Bundle(path)
@@ -0,0 +1,111 @@
+"""Tests del sistema de caché (sin red)"""
+import os
+import threading
+import time
+
+from devdocs_mcp import cache as cache_module
+from devdocs_mcp.cache import FETCH_MARKER_TTL, DevDocsCache, QueryResultCache
+
+
+def test_index_stamp_changes_with_index(tmp_path):
+    cache = DevDocsCache(tmp_path)
+    assert cache.index_stamp("python~3.12") is None
+    
+    cache.save_index("python~3.12", '{"entries": [], "types": []}')
+    stamp = cache.index_stamp("python~3.12")
+    assert stamp is not None
+    
+    cache.clear_cache("python~3.12")
+    assert cache.index_stamp("python~3.12") is None
+
+
+def test_query_cache_hit_and_stale_stamp():
+    results = QueryResultCache()
+    key = ('search_documentation', 'python~3.12', 'gather', 20)
+    
+    results.put(key, (1,), "resultado")
+    assert results.get(key, (1,)) == "resultado"
+    
+    # Si el índice cambia, la entrada deja de ser válida
+    assert results.get(key, (2,)) is None
+    assert results.get(key, (1,)) is None
+    assert results.get_stats()['hits'] == 1
+
+
+def test_query_cache_respects_budgets():
+    results = QueryResultCache(max_entries=2, max_bytes=10)
+    
+    results.put('a', (), "aaaa")
+    results.put('b', (), "bbbb")
+    results.get('a', ())
+    results.put('c', (), "cccc")
+    
+    # 'b' es el menos usado y se desaloja por el límite de entradas
+    assert results.get('b', ()) is None
+    assert results.get('a', ()) == "aaaa"
+    
+    results.put('d', (), "dddddddd")
+    assert results.get_stats()['size_kb'] * 1024 <= 10
+    
+    # Resultados más grandes que el presupuesto no se guardan
+    results.put('e', (), "x" * 11)
+    assert results.get('e', ()) is None
+
+
+def test_writes_are_atomic_and_clears_rename_first(tmp_path):
+    cache = DevDocsCache(tmp_path)
+    cache.save_index("python~3.12", '{"entries": []}')
+    cache.save_page("python~3.12", "library/json", "# json\r\n")
+    cache.save_page("python~3.12", "library/json", "# json v2\r\n")
+    
+    # Sin temporales a la vista y sin traducir saltos de línea
+    assert sorted(p.name for p in (tmp_path / "python~3.12").iterdir()) == ["index.json", "library_json.md", "pages.stamp"]
+    assert (tmp_path / "python~3.12" / "library_json.md").read_bytes() == b"# json v2\r\n"
+    
+    # Un lector con el archivo abierto sigue leyéndolo tras la limpieza
+    with open(tmp_path / "python~3.12" / "index.json") as reader:
+        assert cache.clear_cache()["status"] == "ok"
+        assert reader.read() == '{"entries": []}'
+    assert [p.name for p in tmp_path.iterdir()] in ([], [".lock"])
+    assert cache.list_techs() == []
+
+
+def test_fetch_markers_coordinate_downloads(tmp_path):
+    cache = DevDocsCache(tmp_path)
+    assert cache.claim_fetch("python~3.12", "library/json")
+    assert not cache.claim_fetch("python~3.12", "library/json")
+    
+    def finish():
+        time.sleep(0.1)
+        cache.save_page("python~3.12", "library/json", "# json")
+        cache.release_fetch("python~3.12", "library/json")
+    
+    threading.Thread(target=finish).start()
+    assert cache.wait_for_fetch("python~3.12", "library/json")
+    
+    # Una marca abandonada (proceso muerto) se puede reclamar
+    assert cache.claim_fetch("python~3.12", "library/gone")
+    marker = tmp_path / "python~3.12" / "library_gone.fetching"
+    old = time.time() - FETCH_MARKER_TTL - 1
+    os.utime(marker, (old, old))
+    assert not cache.wait_for_fetch("python~3.12", "library/gone")
+    assert cache.claim_fetch("python~3.12", "library/gone")
+
+
+def test_fetch_markers_are_refreshed_while_held(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "FETCH_MARKER_REFRESH", 0.02)
+    cache = DevDocsCache(tmp_path)
+    assert cache.claim_fetch("python~3.12", "library/slow")
+    marker = tmp_path / "python~3.12" / "library_slow.fetching"
+    old = time.time() - FETCH_MARKER_TTL - 1
+    os.utime(marker, (old, old))
+    time.sleep(0.1)
+    
+    # Una descarga larga sigue siendo suya: nadie más la reclama
+    other = DevDocsCache(tmp_path)
+    assert time.time() - marker.stat().st_mtime < FETCH_MARKER_TTL
+    assert not other.claim_fetch("python~3.12", "library/slow")
+    
+    cache.release_fetch("python~3.12", "library/slow")
+    time.sleep(0.1)
+    assert cache._heartbeat is None
@@ -0,0 +1,57 @@
+"""Tests de los pools por clase de trabajo y del límite por tool"""
+import asyncio
+import threading
+
+import pytest
+
+from devdocs_mcp.executors import CPU, DISK, NETWORK, Executors, Overloaded, ToolLimiter
+
+
+def test_pools_are_separate():
+    executors = Executors(network=1, disk=1, cpu=1)
+    release = threading.Event()
+
+    async def main():
+        # La red ocupada no impide que el disco responda
+        blocked = asyncio.ensure_future(executors.run(NETWORK, release.wait, 5))
+        await asyncio.sleep(0.01)
+        name = await asyncio.wait_for(executors.run(DISK, lambda: threading.current_thread().name), 1)
+        assert executors.get_stats()[NETWORK]["in_flight"] == 1
+        release.set()
+        await blocked
+        return name
+
+    assert asyncio.run(main()).startswith("devdocs-disk")
+    assert executors.get_stats()[CPU] == {"threads": 1, "in_flight": 0}
+    executors.shutdown()
+
+
+def test_limiter_queues_then_rejects():
+    limiter = ToolLimiter(default_limit=1, max_queue=1, limits={})
+
+    async def main():
+        gate = asyncio.Event()
+        order = []
+
+        async def call(n):
+            async with limiter.slot("export_documentation"):
+                order.append(n)
+                await gate.wait()
+
+        first = asyncio.ensure_future(call(1))
+        queued = asyncio.ensure_future(call(2))
+        await asyncio.sleep(0.01)
+        assert limiter.get_stats()["export_documentation"]["waiting"] == 1
+
+        # Una en curso y la cola llena: la tercera se rechaza al momento
+        with pytest.raises(Overloaded, match="Servidor ocupado"):
+            await call(3)
+
+        gate.set()
+        await asyncio.gather(first, queued)
+        return order
+
+    assert asyncio.run(main()) == [1, 2]
+    assert limiter.get_stats()["export_documentation"] == {
+        "limit": 1, "running": 0, "waiting": 0, "rejected": 1
+    }
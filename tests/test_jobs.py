@@ -0,0 +1,78 @@
+"""Tests de los trabajos en segundo plano (progreso, cancelación y cola)"""
+import asyncio
+import threading
+
+from devdocs_mcp import server
+from devdocs_mcp.jobs import CANCELLED, DONE, QUEUED, RUNNING, JobManager
+
+
+def test_job_reports_progress_and_result():
+    manager = JobManager(max_running=1)
+    seen = []
+
+    def export(progress):
+        for done in (10, 20):
+            progress("python~3.12", done, 20)
+        return "ok"
+
+    async def main():
+        async def work(job):
+            job.add_listener(lambda done, total, message: seen.append(message))
+            return await asyncio.to_thread(export, job.report)
+
+        job = manager.start("export_documentation", "Exportar", work)
+        assert await manager.wait(job, 5)
+        return job
+
+    job = asyncio.run(main())
+    assert job.status == DONE and job.result == "ok"
+    assert (job.progress, job.total) == (20, 20)
+    assert seen == ["python~3.12: 10/20", "python~3.12: 20/20"]
+
+
+def test_cancel_running_and_queued_jobs():
+    manager = JobManager(max_running=1)
+    started = threading.Event()
+    batches = []
+
+    def warm(progress):
+        started.set()
+        for done in range(1, 100):
+            progress("node", done, 100)
+            batches.append(done)
+            threading.Event().wait(0.01)
+
+    async def main():
+        running = manager.start("warm_cache", "Precalentar", lambda job: asyncio.to_thread(warm, job.report))
+        queued = manager.start("warm_cache", "Precalentar", lambda job: asyncio.to_thread(warm, job.report))
+        await asyncio.to_thread(started.wait, 5)
+        assert (running.status, queued.status) == (RUNNING, QUEUED)
+
+        manager.cancel(queued.id)
+        manager.cancel(running.id)
+        await asyncio.gather(running.task, queued.task)
+        return running, queued
+
+    running, queued = asyncio.run(main())
+    assert running.status == CANCELLED and queued.status == CANCELLED
+    # El trabajo en curso se detuvo pronto y el de la cola no llegó a empezar
+    assert len(batches) < 99
+
+
+def test_long_tool_call_returns_job_id(monkeypatch):
+    monkeypatch.setattr(server, "jobs", JobManager())
+    release = threading.Event()
+
+    def rerender_cache(tech, progress=None):
+        release.wait(5)
+        return {"rerendered": 3, "up_to_date": 0, "missing_html": 0}
+
+    monkeypatch.setattr(server.api, "rerender_cache", rerender_cache)
+
+    async def main():
+        first = await server.handle_rerender_cache({"background": True})
+        assert "job-1" in first
+        release.set()
+        return await server.handle_job_status({"job_id": "job-1", "wait": 5})
+
+    assert "Reconvertidas: 3" in asyncio.run(main())
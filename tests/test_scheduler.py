@@ -0,0 +1,104 @@
+"""Tests del planificador de peticiones"""
+import threading
+import time
+
+from devdocs_mcp.scheduler import BULK, INTERACTIVE, PREFETCH, FetchScheduler
+
+
+URL = "https://documents.devdocs.io/python~3.12/library/asyncio.html"
+
+
+def _hold(scheduler, priority, entered, release):
+    with scheduler.slot(URL, priority):
+        entered.set()
+        release.wait(5)
+
+
+def test_interactive_requests_skip_the_queue():
+    scheduler = FetchScheduler(max_concurrency=1, host_rate=0, reserved=0)
+    entered, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold, args=(scheduler, BULK, entered, release))
+    holder.start()
+    assert entered.wait(5)
+
+    order = []
+
+    def request(priority):
+        with scheduler.slot(URL, priority):
+            order.append(priority)
+
+    waiting = [threading.Thread(target=request, args=(p,)) for p in (BULK, PREFETCH, INTERACTIVE)]
+    for thread in waiting:
+        thread.start()
+        time.sleep(0.02)
+    release.set()
+    for thread in [holder, *waiting]:
+        thread.join(5)
+
+    assert order == [INTERACTIVE, PREFETCH, BULK]
+
+
+def test_reserved_slot_keeps_interactive_unblocked():
+    scheduler = FetchScheduler(max_concurrency=2, host_rate=0, reserved=1)
+    entered, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold, args=(scheduler, BULK, entered, release))
+    holder.start()
+    assert entered.wait(5)
+
+    second_bulk = threading.Event()
+    bulk = threading.Thread(target=_hold, args=(scheduler, BULK, second_bulk, release))
+    bulk.start()
+    # La segunda masiva espera, pero la interactiva entra en el hueco reservado
+    assert not second_bulk.wait(0.1)
+    with scheduler.slot(URL, INTERACTIVE):
+        pass
+
+    release.set()
+    for thread in (holder, bulk):
+        thread.join(5)
+    assert second_bulk.is_set()
+    assert scheduler.stats["interactive"]["requests"] == 1
+
+
+def test_host_rate_spaces_request_starts():
+    scheduler = FetchScheduler(max_concurrency=4, host_rate=20)
+    start = time.monotonic()
+    for _ in range(3):
+        with scheduler.slot(URL):
+            pass
+    assert time.monotonic() - start >= 0.09
+
+
+def test_rate_blocked_host_does_not_hold_back_other_hosts():
+    scheduler = FetchScheduler(max_concurrency=4, host_rate=2, bulk_rate=0)
+    with scheduler.slot(URL):
+        pass
+
+    order = []
+
+    def request(url, priority):
+        with scheduler.slot(url, priority):
+            order.append(url)
+
+    # La interactiva al mismo host espera ~0.5 s por el ritmo; la masiva a otro host no
+    same_host = threading.Thread(target=request, args=(URL, INTERACTIVE))
+    same_host.start()
+    time.sleep(0.02)
+    start = time.monotonic()
+    request("https://mirror.example/python~3.12/db.json", BULK)
+    assert time.monotonic() - start < 0.2
+    same_host.join(5)
+    assert order == ["https://mirror.example/python~3.12/db.json", URL]
+
+
+def test_bulk_requests_use_their_own_rate():
+    scheduler = FetchScheduler(max_concurrency=4, host_rate=2, bulk_rate=0)
+    start = time.monotonic()
+    for _ in range(5):
+        with scheduler.slot(URL, BULK):
+            pass
+    assert time.monotonic() - start < 0.2
+    # Las masivas no gastan el ritmo de las interactivas
+    with scheduler.slot(URL, INTERACTIVE):
+        pass
+    assert time.monotonic() - start < 0.2
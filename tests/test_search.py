@@ -0,0 +1,68 @@
+"""Tests de las estructuras de búsqueda en memoria"""
+import pytest
+
+from devdocs_mcp.search import CompletionIndex, tokenize
+
+
+ENTRIES = [
+    {"name": "asyncio.gather()", "path": "library/asyncio-task#asyncio.gather"},
+    {"name": "asyncio.Future", "path": "library/asyncio-future#asyncio.Future"},
+    {"name": "asyncio.get_event_loop()", "path": "library/asyncio-eventloop#asyncio.get_event_loop"},
+    {"name": "asyncio", "path": "library/asyncio"},
+    {"name": "json", "path": "library/json"},
+]
+
+
+def test_complete_prefix_is_case_insensitive():
+    index = CompletionIndex(ENTRIES)
+    
+    names = [e['name'] for e in index.complete("ASYNCIO.G")]
+    assert names == ["asyncio.gather()", "asyncio.get_event_loop()"]
+    
+    assert [e['name'] for e in index.complete("asyncio.ga")] == ["asyncio.gather()"]
+
+
+def test_complete_limit_and_no_match():
+    index = CompletionIndex(ENTRIES)
+    
+    assert len(index.complete("asyncio", limit=2)) == 2
+    assert index.complete("zzz") == []
+    assert len(index) == len(ENTRIES)
+
+
+def test_tokenize_stems_inflections_to_one_term():
+    assert tokenize("cancelled cancels cancelling") == ["cancel"] * 3
+    assert tokenize("call called calls calling") == [tokenize("call")[0]] * 4
+    assert tokenize("How to use the API") == ["api"]
+
+
+def test_tfidf_ranks_natural_language_question():
+    pytest.importorskip("scipy")
+    from devdocs_mcp.search import TfidfIndex
+    
+    documents = [
+        "asyncio.Task.cancel() Request the Task to be cancelled",
+        "asyncio.gather() Run awaitable objects concurrently",
+        "json.dumps() Serialize obj to a JSON formatted str",
+    ]
+    index = TfidfIndex.build(documents)
+    
+    best_row, score = index.top("how do I cancel a running task", limit=1)[0]
+    assert best_row == 0
+    assert score > 0
+    
+    # Varias consultas se resuelven en un solo producto matricial
+    scores = index.query(["cancel task", "json"])
+    assert scores.shape == (3, 2)
+    assert scores[:, 1].argmax() == 2
+
+
+def test_tfidf_roundtrip(tmp_path):
+    pytest.importorskip("scipy")
+    from devdocs_mcp.search import TfidfIndex
+    
+    index = TfidfIndex.build(["gather awaitables", "cancel task"])
+    index.save(tmp_path / "vectors.npz")
+    loaded = TfidfIndex.load(tmp_path / "vectors.npz")
+    
+    assert loaded.top("cancel", limit=1)[0][0] == 1
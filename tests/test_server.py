@@ -0,0 +1,244 @@
+"""Tests del servidor (límite de llamadas por cliente y lotes)"""
+import asyncio
+import json
+import re
+import threading
+
+import pytest
+from mcp.server.lowlevel.server import request_ctx
+from mcp.shared.context import RequestContext
+
+from devdocs_mcp import server
+from devdocs_mcp.api import DevDocsAPI
+from devdocs_mcp.cache import DevDocsCache, QueryResultCache
+
+
+PAGES = {
+    "library/asyncio-task": (
+        "<h1>Coroutines and Tasks</h1>"
+        "<h2 id=\"asyncio.gather\">gather</h2><p>Gathers awaitables.</p>"
+        "<h2 id=\"asyncio.sleep\">sleep</h2><pre data-language=\"python\">await asyncio.sleep(1)</pre>"
+    ),
+}
+
+
+class FakeSession:
+    pass
+
+
+def test_client_concurrency_is_limited_per_session(monkeypatch):
+    monkeypatch.setattr(server, "client_concurrency", 1)
+    running = {}
+    peak = {}
+
+    async def slow_tool(name, arguments):
+        client = arguments["client"]
+        running[client] = running.get(client, 0) + 1
+        peak[client] = max(peak.get(client, 0), running[client])
+        await asyncio.sleep(0.05)
+        running[client] -= 1
+        return []
+
+    monkeypatch.setattr(server, "_call_tool", slow_tool)
+    sessions = {"a": FakeSession(), "b": FakeSession()}
+
+    async def call(client):
+        request_ctx.set(RequestContext(request_id=1, meta=None, session=sessions[client],
+                                       lifespan_context=None))
+        await server.call_tool("get_cache_stats", {"client": client})
+
+    async def main():
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(call(client) for client in ("a", "a", "a", "b", "b", "b")))
+        return asyncio.get_running_loop().time() - start
+
+    elapsed = asyncio.run(main())
+    # Cada cliente de uno en uno, pero los dos clientes a la vez
+    assert peak == {"a": 1, "b": 1}
+    assert 0.15 <= elapsed < 0.3
+
+
+def _local_server(monkeypatch, tmp_path):
+    """El servidor sobre un caché local con el índice de PAGES"""
+    cache = DevDocsCache(tmp_path)
+    api = DevDocsAPI(cache, convert_workers=1)
+    api._fetch_page_html = lambda tech, clean_path, priority=0: PAGES[clean_path]
+    cache.save_index("python~3.12", json.dumps({
+        "entries": [
+            {"name": "asyncio.gather", "path": "library/asyncio-task#asyncio.gather", "type": "asyncio"},
+            {"name": "asyncio.sleep", "path": "library/asyncio-task#asyncio.sleep", "type": "asyncio"},
+        ],
+        "types": []
+    }))
+    monkeypatch.setattr(server, "cache", cache)
+    monkeypatch.setattr(server, "api", api)
+    monkeypatch.setattr(server, "query_cache", QueryResultCache())
+
+
+def test_batch_resolves_references(monkeypatch, tmp_path):
+    _local_server(monkeypatch, tmp_path)
+
+    result = asyncio.run(server.handle_batch({"operations": [
+        {"tool": "search_documentation", "arguments": {"tech": "python~3.12", "query": "asyncio"}},
+        {"tool": "get_page_content", "arguments": {"tech": "python~3.12", "path": "$1"}},
+        {"tool": "get_examples", "arguments": {"tech": "python~3.12", "path": "$1[1].path"}},
+        {"tool": "get_page_content", "arguments": {"tech": "python~3.12", "path": "$1[5]"}},
+    ]}))
+
+    sections = re.split(r"\n### \d · ", result)
+    assert sections[1].startswith("`search_documentation`")
+    assert '"path": "library/asyncio-task#asyncio.gather"' in sections[2]
+    assert "Gathers awaitables." in sections[2]
+    assert "asyncio.sleep(1)" in sections[3]
+    assert "la operación 1 tiene 2 resultados" in sections[4]
+
+
+def test_batch_runs_referenced_operations_once(monkeypatch, tmp_path):
+    _local_server(monkeypatch, tmp_path)
+    calls = []
+    complete = server.api.complete_symbol
+
+    def counted(*args):
+        calls.append(args)
+        return complete(*args)
+
+    monkeypatch.setattr(server.api, "complete_symbol", counted)
+    result = asyncio.run(server.handle_batch({"operations": [
+        {"tool": "complete_symbol", "arguments": {"tech": "python~3.12", "prefix": "asyncio.g"}},
+        {"tool": "get_examples", "arguments": {"tech": "python~3.12", "path": "$1"}},
+    ]}))
+    assert len(calls) == 1
+    assert "Completados para 'asyncio.g'" in result
+    assert '"path": "library/asyncio-task#asyncio.gather"' in result
+
+    result = asyncio.run(server.handle_batch({"operations": [
+        {"tool": "get_page_outline", "arguments": {"tech": "python~3.12", "path": "library/asyncio-task"}},
+        {"tool": "get_page_content", "arguments": {"tech": "python~3.12", "path": "$1"}},
+    ]}))
+    assert "no devuelve resultados a los que hacer referencia" in result
+
+
+def test_batch_rejects_forward_references():
+    result = asyncio.run(server.handle_batch({"operations": [
+        {"tool": "get_page_content", "arguments": {"tech": "python~3.12", "path": "$2"}},
+        {"tool": "search_documentation", "arguments": {"tech": "python~3.12", "query": "x"}},
+    ]}))
+    assert result.startswith("Error: La operación 1 solo puede referirse a operaciones anteriores")
+
+
+def test_json_output_is_compact_and_structured(monkeypatch, tmp_path):
+    _local_server(monkeypatch, tmp_path)
+    server.cache.save_index("node", json.dumps({"entries": [
+        {"name": f"fs.readFile{i}()", "path": f"fs#fs_fs_readfile{i}", "type": "File system"}
+        for i in range(20)
+    ], "types": []}))
+    search = {"tech": "node", "query": "readfile", "limit": 20}
+    markdown = asyncio.run(server._call_tool("search_documentation", search))[0].text
+
+    monkeypatch.setattr(server, "output_format", "json")
+    content, payload = asyncio.run(server._call_tool("search_documentation", search))
+    assert json.loads(content[0].text) == payload
+    assert len(payload["results"]["rows"]) == 20
+    assert len(content[0].text) < len(markdown) * 0.6
+
+    args = {"tech": "python~3.12", "query": "asyncio"}
+    _, payload = asyncio.run(server._call_tool("search_documentation", args))
+    assert payload["results"] == {
+        "columns": ["name", "path"],
+        "rows": [
+            ["asyncio.gather", "library/asyncio-task#asyncio.gather"],
+            ["asyncio.sleep", "library/asyncio-task#asyncio.sleep"],
+        ],
+        "common": {"type": "asyncio"}
+    }
+
+    _, payload = asyncio.run(server._call_tool("get_page_content", {"tech": "python~3.12"}))
+    assert payload == {"error": "Se requiere 'tech' y 'path'"}
+
+    _, payload = asyncio.run(server._call_tool("batch", {"operations": [
+        {"tool": "complete_symbol", "arguments": {"tech": "python~3.12", "prefix": "asyncio.sl"}},
+        {"tool": "get_examples", "arguments": {"tech": "python~3.12", "path": "$1"}},
+    ]}))
+    first, second = payload["operations"]
+    assert first["result"]["completions"]["rows"][0][0] == "asyncio.sleep"
+    assert second["arguments"]["path"] == "library/asyncio-task#asyncio.sleep"
+    assert second["result"]["examples"][0]["code"] == "await asyncio.sleep(1)"
+
+
+def test_search_cache_echoes_each_callers_query(monkeypatch, tmp_path):
+    _local_server(monkeypatch, tmp_path)
+    def search(query):
+        return asyncio.run(server._call_tool("search_documentation", {"tech": "python~3.12", "query": query}))[0].text
+
+    first = search("asyncio")
+    again = search("asyncio")
+    other = search("ASYNCIO")
+    assert again == first
+    assert server.query_cache.hits == 1
+    assert "Resultados para 'ASYNCIO'" in other
+
+
+def test_json_searches_use_the_query_cache(monkeypatch, tmp_path):
+    _local_server(monkeypatch, tmp_path)
+    monkeypatch.setattr(server, "output_format", "json")
+    calls = []
+    search = server.api.search_in_index
+
+    def counted(*args):
+        calls.append(args)
+        return search(*args)
+
+    monkeypatch.setattr(server.api, "search_in_index", counted)
+    args = {"tech": "python~3.12", "query": "asyncio"}
+    _, first = asyncio.run(server._call_tool("search_documentation", args))
+    _, again = asyncio.run(server._call_tool("search_documentation", args))
+    assert again == first
+    assert len(calls) == 1
+    assert server.query_cache.hits == 1
+
+    # La misma entrada sirve también en Markdown
+    monkeypatch.setattr(server, "output_format", "markdown")
+    text = asyncio.run(server._call_tool("search_documentation", args))[0].text
+    assert "Resultados para 'asyncio' en python~3.12" in text
+    assert len(calls) == 1
+
+
+def test_query_cache_stamps_are_read_off_the_event_loop(monkeypatch, tmp_path):
+    _local_server(monkeypatch, tmp_path)
+    threads = []
+    index_stamp = server.cache.index_stamp
+
+    def stamp(tech):
+        threads.append(threading.current_thread().name)
+        return index_stamp(tech)
+
+    monkeypatch.setattr(server.cache, "index_stamp", stamp)
+    args = {"tech": "python~3.12", "query": "asyncio"}
+    asyncio.run(server._call_tool("search_documentation", args))
+    asyncio.run(server._call_tool("search_documentation", args))
+    assert server.query_cache.hits == 1
+    # El loop corre en el hilo principal: ningún stat se hace desde él
+    assert threads and threading.main_thread().name not in threads
+
+
+def test_http_outside_loopback_requires_token(monkeypatch):
+    started = []
+    monkeypatch.setattr(server, "_run_http", lambda *args: started.append(args))
+    monkeypatch.setattr(server, "client_concurrency", server.client_concurrency)
+    monkeypatch.delenv("DEVDOCS_HTTP_TOKEN", raising=False)
+
+    with pytest.raises(SystemExit):
+        server.main(["serve", "--transport", "http", "--host", "0.0.0.0"])
+    assert started == []
+
+    server.main(["serve", "--transport", "http", "--host", "::1"])
+    server.main(["serve", "--transport", "http", "--host", "0.0.0.0", "--token", "s3cret"])
+    assert started == [("::1", 8000, None), ("0.0.0.0", 8000, "s3cret")]
+
+
+def test_http_token_is_checked_per_request():
+    scope = {"headers": [(b"authorization", b"Bearer s3cret")]}
+    assert server._authorized(scope, "s3cret")
+    assert not server._authorized(scope, "other")
+    assert not server._authorized({"headers": []}, "s3cret")
+    assert server._authorized({"headers": []}, None)
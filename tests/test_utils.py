@@ -0,0 +1,113 @@
+"""Tests del conversor HTML → Markdown contra el corpus golden"""
+import time
+from pathlib import Path
+
+import pytest
+
+from devdocs_mcp.utils import chunk_ranges, convert_page, html_to_markdown
+
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+GOLDEN_CASES = sorted(p.stem for p in GOLDEN_DIR.glob("*.html"))
+
+
+@pytest.mark.parametrize("name", GOLDEN_CASES)
+def test_html_to_markdown_golden(name):
+    html = (GOLDEN_DIR / f"{name}.html").read_text(encoding='utf-8')
+    expected = (GOLDEN_DIR / f"{name}.md").read_text(encoding='utf-8')
+    
+    assert html_to_markdown(html) + "\n" == expected
+
+
+def test_html_to_markdown_empty():
+    assert html_to_markdown("") == ""
+    assert html_to_markdown("<div>  </div>") == ""
+
+
+def test_unclosed_tags_do_not_swallow_document():
+    # Con la cadena de regex anterior, cada <br>/<img> buscaba su cierre hasta el final
+    html = "<p>a<br>b<img src='x.png'>c</p>" * 2000
+    markdown = html_to_markdown(html)
+    
+    assert markdown.count("a\nb") == 2000
+
+
+@pytest.mark.parametrize("html", [
+    "<a " * 20000,
+    "<a x=" * 20000,
+    '<a "' * 20000,
+    "<a " + "=" * 100000,
+    "<a " + '"' * 80000,
+    "<!" * 20000,
+    "<pre " * 20000,
+    "<script " * 20000,
+    "<pre>" + "<code " * 20000,
+    "<td>" + "<code><span>" * 20000,
+], ids=["tags", "equals", "quotes", "equals-run", "quote-run", "declarations", "pre", "script", "pre-body", "cell"])
+def test_unclosed_tags_convert_in_linear_time(html):
+    # Cada intento de etiqueta sin cerrar se corta en el siguiente "<"
+    started = time.perf_counter()
+    html_to_markdown(html)
+    assert time.perf_counter() - started < 2
+
+
+def test_quoted_attributes_do_not_leak_into_text():
+    # Un ">" dentro de un valor entre comillas no cierra la etiqueta
+    assert html_to_markdown('<p>See <a title="a>b" href="x.html">the docs</a></p>') == "See [the docs](x.html)"
+    assert html_to_markdown("<p><a href='y' title='1 > 0'>one</a></p>") == "[one](y)"
+    # Las comillas sueltas de un valor sin comillas no abren nada
+    assert html_to_markdown("<p>it's <img alt=don't src=x> ok</p>") == "it's ok"
+
+
+def test_simple_table_cells():
+    html = (
+        '<table><tr><th>Name</th><th>Use</th></tr>'
+        '<tr><td><a href="f.html"><code>f()</code></a></td><td>Calls <em>f</em> &amp; <b>g</b><br>twice</td></tr></table>'
+    )
+    assert html_to_markdown(html) == "| Name | Use |\n| --- | --- |\n| [`f()`](f.html) | Calls *f* & **g** twice |"
+    # El código de dos celdas seguidas no se une
+    html = "<table><tr><th>h</th><th>i</th></tr><tr><td><code>x</code></td><td><code>b</code></td></tr></table>"
+    assert html_to_markdown(html) == "| h | i |\n| --- | --- |\n| `x` | `b` |"
+
+
+def test_table_inside_blockquote_keeps_quote_markers():
+    html = "<blockquote><p>a</p><table><tr><th>x</th></tr><tr><td>1</td></tr></table><p>b</p></blockquote>"
+    assert html_to_markdown(html) == "> a\n>\n> | x |\n> | --- |\n> | 1 |\n>\n> b"
+
+
+def test_entities_that_unescape_to_nothing():
+    assert html_to_markdown("<p>a &#6; b</p><p>&#6;</p>") == "a b"
+
+
+def test_code_class_with_single_quotes():
+    html = "<pre><code class='language-rust'>fn main() {}</code></pre>"
+    assert html_to_markdown(html) == "```rust\nfn main() {}\n```"
+
+
+def test_convert_page_section_ranges():
+    html = (
+        '<h1 id="top">Title</h1><p>Intro</p>'
+        '<a id="legacy"></a><h2 id="a">A</h2><p>Text <code id="fn">fn</code></p>'
+        '<dl><dt id="sig">sig()</dt><dd>Body</dd></dl><h3>Sub</h3><p>More</p>'
+        '<h2 id="b">B</h2><p>End</p>'
+    )
+    page = convert_page(html)
+    markdown = page["markdown"]
+    section = {anchor: markdown[start:end] for anchor, (start, end) in page["sections"].items()}
+    
+    assert section["a"] == "## A\n\nText `fn`\n\nsig()\n\nBody\n\n### Sub\n\nMore"
+    assert section["legacy"] == section["a"]
+    assert section["fn"] == "`fn`"
+    assert section["sig"] == "sig()\n\nBody"
+    assert section["b"] == "## B\n\nEnd"
+    assert section["top"] == markdown
+
+
+def test_chunk_ranges_cut_on_block_boundaries():
+    text = "aaaa\n\nbbbb\n\n# cc\n\ndddd"
+    breaks = [(6, 0), (12, 1), (18, 0)]
+    
+    assert chunk_ranges(text, breaks, size=14) == [[0, 12], [12, 22]]
+    # Sin límites de bloque: corte en salto de línea
+    assert chunk_ranges("aaaa\nbbbb\ncccc", [], size=8) == [[0, 5], [5, 10], [10, 14]]
+    assert chunk_ranges("", [], size=14) == [[0, 0]]